@@ -49,6 +49,9 @@ export default function ArtifactDetailPage() {
     const response = await artifacts.get(artifactId);
     if (!response.error && response.data) {
       const art = response.data as any;
+      if (art.content === null) {
+        art.content = (await artifacts.content(artifactId)) ?? '';
+      }
       setArtifact(art);
       setTitle(art.title);
       setDescription(art.description || '');
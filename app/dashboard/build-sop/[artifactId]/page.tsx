@@ -39,8 +39,12 @@ export default function BuildSOPPage() {
   const loadArtifact = async () => {
     const response = await artifacts.get(artifactId);
     if (!response.error && response.data) {
-      const art = response.data as Artifact;
-      setArtifact(art);
+      const art = response.data as any;
+      // Left out of the JSON for very large artifacts
+      if (art.content === null) {
+        art.content = (await artifacts.content(artifactId)) ?? '';
+      }
+      setArtifact(art as Artifact);
       setSopTitle(`SOP: ${art.title}`);
     }
     setLoading(false);
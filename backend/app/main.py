@@ -1,13 +1,59 @@
-from fastapi import FastAPI
+import logging
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from app.models import Base
-from app.database import engine
-from app.routes import auth, artifacts, sops, templates
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import SQLAlchemyError
+from app import database, migrations
+from app.config import settings
+from app.middleware.auth import require_ops_access
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.query_stats import (
+    QUERY_COUNT_HEADER,
+    QUERY_REPEATED_HEADER,
+    QUERY_TIME_HEADER,
+    QueryStatsMiddleware,
+)
+from app.routes import auth, artifacts, sops, templates, search, sanitization, changes
+from app.services import metrics, pool_stats
+from app.services.auth_service import password_hasher
+from app.services.blobs import blob_cache
+from app.services.change_feed import change_feed
+from app.services.diffing import diff_cache
+from app.services.gallery_cache import popular_templates, promoted_templates
+from app.services.import_counts import import_counter
+from app.services.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from app.services.principal_cache import principal_cache
+from app.services.sanitization import scanner
+from app.services.versioning import version_cache
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Importing the app never touches the database; the schema is checked here
+    check = migrations.upgrade if settings.DB_AUTO_MIGRATE else migrations.current_version
+    try:
+        version = await database.run_on_connection(check)
+    except (SQLAlchemyError, OSError):
+        logger.exception("Database unavailable at startup")
+    else:
+        if version != migrations.HEAD:
+            logger.error(
+                "Database schema is at version %s, expected %s; run python -m scripts.migrate",
+                version, migrations.HEAD,
+            )
+    import_counter.start()
+    yield
+    await import_counter.stop()
+    password_hasher.shutdown()
+    scanner.shutdown()
+    await database.dispose()
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Second Brain OS", version="1.0.0")
+app = FastAPI(title="Second Brain OS", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -16,15 +62,82 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "ETag",
+        NEXT_CURSOR_HEADER,
+        TOTAL_COUNT_HEADER,
+        QUERY_COUNT_HEADER,
+        QUERY_TIME_HEADER,
+        QUERY_REPEATED_HEADER,
+    ],
 )
+if settings.RESPONSE_COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.RESPONSE_COMPRESSION_MIN_BYTES,
+        level=settings.RESPONSE_COMPRESSION_LEVEL,
+    )
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+app.add_middleware(QueryStatsMiddleware)
 
 # Include routes
 app.include_router(auth.router)
 app.include_router(artifacts.router)
 app.include_router(sops.router)
 app.include_router(templates.router)
+app.include_router(search.router)
+app.include_router(sanitization.router)
+app.include_router(changes.router)
 
 
 @app.get("/health")
 async def health_check():
+    """Liveness: the process is serving. Never touches the database."""
     return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: the database answers and its schema is current."""
+    try:
+        version = await database.run_on_connection(migrations.current_version)
+    except (SQLAlchemyError, OSError):
+        version = None
+    if version != migrations.HEAD:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "unavailable", "schema_version": version, "expected": migrations.HEAD},
+        )
+    return {"status": "ready", "schema_version": version}
+
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_ops_access)])
+    async def prometheus_metrics():
+        return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/health/changes", dependencies=[Depends(require_ops_access)])
+async def change_feed_stats():
+    return change_feed.stats()
+
+
+@app.get("/health/pool", dependencies=[Depends(require_ops_access)])
+async def pool_health():
+    return pool_stats.stats()
+
+
+@app.get("/health/cache", dependencies=[Depends(require_ops_access)])
+async def cache_stats():
+    return {
+        "principals": principal_cache.stats(),
+        "artifact_versions": version_cache.stats(),
+        "artifact_diffs": diff_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "promoted_templates": promoted_templates.stats(),
+        "popular_templates": popular_templates.stats(),
+        "import_counts": import_counter.stats(),
+        "blobs": blob_cache.stats(),
+        "sanitization": scanner.stats(),
+    }
@@ -1,38 +1,137 @@
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthCredentials
-from sqlalchemy.orm import Session
+import hmac
+from contextlib import asynccontextmanager
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import database
+from app.config import settings
 from app.database import get_db
 from app.models import User
 from app.services.auth_service import verify_token
+from app.services.principal_cache import Principal, deactivated_users, principal_cache
+from app.services.read_routing import read_router
 
 security = HTTPBearer()
+ops_security = HTTPBearer(auto_error=False)
+LOOPBACK_HOSTS = frozenset({"127.0.0.1", "::1", "localhost"})
 
 
-async def get_current_user(
-    credentials: HTTPAuthCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
-    token = credentials.credentials
-    payload = verify_token(token)
-    
-    if payload is None:
+def _token_payload(credentials: HTTPAuthorizationCredentials) -> dict:
+    payload = verify_token(credentials.credentials)
+    # Refresh tokens outlive deactivation checks on claim-trusting routes, so they only refresh
+    if payload is None or payload.get("sub") is None or payload.get("type") == "refresh":
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
         )
-    
-    user_id: int = payload.get("sub")
-    if user_id is None:
+    return payload
+
+
+def _ensure_active(principal: Principal) -> Principal:
+    if not principal.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
+            detail="Inactive user",
         )
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
+    return principal
+
+
+async def _load_principal(db: AsyncSession, user_id: int) -> Principal:
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        user = await db.scalar(select(User).where(User.id == user_id))
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+            )
+        principal = Principal.from_user(user)
+        principal_cache.set(user_id, principal)
+    return _ensure_active(principal)
+
+
+def _authenticated(request: Request, principal: Principal) -> Principal:
+    # Read routing keys read-your-writes windows on this, never on unverified claims
+    request.state.principal = principal
+    if database.DATABASE_REPLICA_URL:
+        read_router.authenticated(request.method, principal)
+    return principal
+
+
+async def _principal(db: AsyncSession, payload: dict) -> Principal:
+    user_id = int(payload["sub"])
+    organization_id = payload.get("org")
+    if not settings.TOKEN_EMBED_ORGANIZATION or organization_id is None:
+        return await _load_principal(db, user_id)
+
+    cached = principal_cache.get(user_id)
+    if cached is not None:
+        return _ensure_active(cached)
+    return _ensure_active(Principal(
+        id=user_id, organization_id=organization_id, is_active=user_id not in deactivated_users,
+    ))
+
+
+async def get_current_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db),
+) -> Principal:
+    payload = _token_payload(credentials)
+    return _authenticated(request, await _load_principal(db, int(payload["sub"])))
+
+
+async def get_current_principal(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db),
+) -> Principal:
+    """Like ``get_current_user`` but trusts the token's organization claim.
+
+    Only ``id`` and ``organization_id`` are guaranteed to be set, which is all
+    tenant-scoped routes need.
+    """
+    return _authenticated(request, await _principal(db, _token_payload(credentials)))
+
+
+async def get_streaming_principal(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> Principal:
+    """``get_current_principal`` for long-lived responses.
+
+    A request-scoped ``get_db`` session would keep its pooled connection
+    until the stream ends, so the user is looked up in a session of its own
+    that is closed before the response starts.
+    """
+    payload = _token_payload(credentials)
+    async with asynccontextmanager(get_db)() as db:
+        return _authenticated(request, await _principal(db, payload))
+
+
+async def require_ops_access(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(ops_security),
+) -> None:
+    """Guard for operational endpoints, which expose other tenants' traffic.
+
+    With ``OPS_TOKEN`` set the request must carry it as a bearer token.
+    Without it only loopback clients are served; behind a reverse proxy on
+    the same host every client looks like loopback, so set the token there.
+    """
+    if settings.OPS_TOKEN:
+        if credentials is None or not hmac.compare_digest(
+            credentials.credentials.encode(), settings.OPS_TOKEN.encode()
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid ops token",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return
+    if request.client is None or request.client.host not in LOOPBACK_HOSTS:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only served to loopback clients unless OPS_TOKEN is set",
         )
-    
-    return user
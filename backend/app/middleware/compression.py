@@ -0,0 +1,81 @@
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from app.services import compression
+from app.services.bulk import NDJSON_MEDIA_TYPE
+
+COMPRESSIBLE_MEDIA_TYPES = {"application/json", NDJSON_MEDIA_TYPE}
+
+
+class CompressionMiddleware:
+    """gzip JSON and NDJSON responses for clients that accept it.
+
+    Other media types pass through untouched: ``/content`` negotiates its own
+    encoding, and the change feed's events must not sit in a compressor's
+    buffer. Streamed responses are flushed chunk by chunk so each chunk
+    still reaches the client as soon as it is produced. A compressed
+    response's ETag is made weak, since the bytes differ from the identity
+    representation; ``etag.matches`` accepts either form.
+    """
+
+    def __init__(self, app, minimum_size: int, level: int):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accepted = compression.accepts(Headers(scope=scope).get("accept-encoding"), compression.GZIP)
+        start = None
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                media_type = headers.get("content-type", "").partition(";")[0].strip()
+                if media_type not in COMPRESSIBLE_MEDIA_TYPES or "content-encoding" in headers:
+                    await send(message)
+                    return
+                MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+                if not accepted:
+                    await send(message)
+                    return
+                # Held back until the first body shows whether compressing is worthwhile
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+
+            body, more_body = message.get("body", b""), message.get("more_body", False)
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    await send(start)
+                    await send(message)
+                    start = None
+                    return
+                compressor = compression.compressor(self.level)
+                headers = MutableHeaders(raw=start["headers"])
+                headers["Content-Encoding"] = compression.GZIP
+                if "etag" in headers and not headers["etag"].startswith("W/"):
+                    headers["ETag"] = f"W/{headers['etag']}"
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = compressor.compress(body) + compressor.flush()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({**message, "body": body})
+                    return
+                await send(start)
+
+            if more_body:
+                body = compressor.compress(body) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            else:
+                body = compressor.compress(body) + compressor.flush()
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,59 @@
+import time
+from app.services import query_stats
+from app.services.metrics import registry
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """Record latency, body sizes, status and SQL time per route template.
+
+    Must sit inside ``QueryStatsMiddleware`` so the request's SQL statements
+    are being tracked when the handler runs.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_bytes = 0
+        response_bytes = 0
+        status = 500
+
+        async def receive_counting():
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_counting(message):
+            nonlocal response_bytes, status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive_counting, send_counting)
+        finally:
+            seconds = time.perf_counter() - start
+            # The router stores the matched route on the scope
+            route = scope.get("route")
+            stats = query_stats.current()
+            registry.record(
+                scope["method"],
+                route.path if route is not None else UNMATCHED_ROUTE,
+                status,
+                seconds,
+                request_bytes,
+                response_bytes,
+                stats.seconds if stats is not None else 0.0,
+                stats.count if stats is not None else 0,
+            )
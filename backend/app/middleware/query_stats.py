@@ -0,0 +1,43 @@
+import logging
+from app.config import settings
+from app.services import query_stats
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Query-Time-Ms"
+QUERY_REPEATED_HEADER = "X-DB-Repeated-Queries"
+
+
+class QueryStatsMiddleware:
+    """Track SQL statements per request.
+
+    With ``DEBUG`` on, the counts are added as response headers and requests
+    that repeat one statement ``SQL_REPEAT_WARN_THRESHOLD`` times or more
+    (the usual N+1 shape) are logged.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with query_stats.track(f"{scope['method']} {scope['path']}") as stats:
+            async def send_with_stats(message):
+                if message["type"] == "http.response.start" and settings.DEBUG:
+                    headers = list(message.get("headers", []))
+                    headers += [
+                        (QUERY_COUNT_HEADER.lower().encode(), str(stats.count).encode()),
+                        (QUERY_TIME_HEADER.lower().encode(), f"{stats.seconds * 1000:.2f}".encode()),
+                        (QUERY_REPEATED_HEADER.lower().encode(), str(stats.repeated).encode()),
+                    ]
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_stats)
+
+        if settings.DEBUG and stats.most_repeated(settings.SQL_REPEAT_WARN_THRESHOLD):
+            logger.warning("Repeated SQL statements (possible N+1)\n%s", stats.summary())
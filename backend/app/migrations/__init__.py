@@ -0,0 +1,78 @@
+"""Versioned schema migrations.
+
+Each migration is a module in this package with an ``upgrade(connection)``
+function, listed in order in ``MIGRATIONS``; its position is its version.
+The applied version is kept in the one-row ``schema_version`` table, so
+checking it at startup is a table lookup and a primary-key read.
+
+Migrations are idempotent: they create tables and indexes with
+``checkfirst`` and add columns only when missing, so databases created by
+the old import-time ``create_all`` upgrade cleanly from version 0. Each one
+spells out the tables, columns and indexes of its own version instead of
+reading ``app.models``, which describes the schema at ``HEAD``.
+
+Apply them with ``python -m scripts.migrate`` (or ``DB_AUTO_MIGRATE=true``
+for local development).
+"""
+from typing import Optional
+from sqlalchemy import Column, Integer, MetaData, Table, inspect, select
+from sqlalchemy.engine import Connection
+from app.migrations import (
+    m0001_baseline,
+    m0002_blobs,
+    m0003_blob_files,
+    m0004_sanitization_patterns,
+    m0005_template_import_counts,
+    m0006_blob_compression,
+    m0007_artifact_version_deltas,
+    m0008_artifact_ids_autoincrement,
+)
+
+MIGRATIONS = [
+    m0001_baseline,
+    m0002_blobs,
+    m0003_blob_files,
+    m0004_sanitization_patterns,
+    m0005_template_import_counts,
+    m0006_blob_compression,
+    m0007_artifact_version_deltas,
+    m0008_artifact_ids_autoincrement,
+]
+HEAD = len(MIGRATIONS)
+
+# Kept out of ``Base.metadata`` so model-level ``create_all`` never touches it
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("version", Integer, nullable=False),
+)
+
+# Arbitrary key for pg_advisory_xact_lock, shared by all workers
+_LOCK_KEY = 740_017
+
+
+def current_version(connection: Connection) -> Optional[int]:
+    """The applied version, or ``None`` when the database was never migrated."""
+    if not inspect(connection).has_table(schema_version.name):
+        return None
+    return connection.scalar(select(schema_version.c.version).where(schema_version.c.id == 1))
+
+
+def upgrade(connection: Connection, target: int = HEAD) -> int:
+    """Apply pending migrations up to ``target`` in one transaction. Returns the new version."""
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SELECT pg_advisory_xact_lock({_LOCK_KEY})")
+
+    if not inspect(connection).has_table(schema_version.name):
+        schema_version.create(connection)
+    version = connection.scalar(select(schema_version.c.version).where(schema_version.c.id == 1))
+    if version is None:
+        connection.execute(schema_version.insert().values(id=1, version=0))
+        version = 0
+
+    for number in range(version + 1, target + 1):
+        MIGRATIONS[number - 1].upgrade(connection)
+    if target > version:
+        connection.execute(schema_version.update().where(schema_version.c.id == 1).values(version=target))
+    return max(version, target)
@@ -0,0 +1,171 @@
+"""Baseline: the tables and indexes as they were when migrations were introduced.
+
+The schema is spelled out here rather than read from ``app.models``, so it
+stays the same however the models change; later migrations alter it from
+there. Databases created by the old import-time ``create_all`` already have
+the tables but may miss indexes added since, which ``create_all`` never
+adds to existing tables. Indexes on columns such a table does not have yet
+are left to the migration that adds the column.
+
+``artifact_versions.is_snapshot`` and ``content_size`` are added by
+migration 0007, since databases created before them lack them too.
+"""
+from sqlalchemy import (
+    DDL, JSON, Boolean, Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, Text, event, inspect,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+organizations = Table(
+    "organizations", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(255), nullable=False),
+    Column("slug", String(100), unique=True, nullable=False, index=True),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+users = Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String(255), unique=True, nullable=False, index=True),
+    Column("password_hash", String(255), nullable=False),
+    Column("full_name", String(255), nullable=False),
+    Column("organization_id", Integer, ForeignKey("organizations.id"), nullable=False),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+projects = Table(
+    "projects", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(255), nullable=False),
+    Column("description", Text),
+    Column("organization_id", Integer, ForeignKey("organizations.id"), nullable=False),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+artifacts = Table(
+    "artifacts", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("title", String(255), nullable=False),
+    Column("description", Text),
+    Column("content", Text, nullable=False),
+    Column("organization_id", Integer, ForeignKey("organizations.id"), nullable=False),
+    Column("project_id", Integer, ForeignKey("projects.id")),
+    Column("creator_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("version", Integer),
+    Column("is_promoted_to_template", Boolean),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    Index("ix_artifacts_org_updated_id", "organization_id", "updated_at", "id"),
+)
+
+artifact_versions = Table(
+    "artifact_versions", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("artifact_id", Integer, ForeignKey("artifacts.id"), nullable=False),
+    Column("version_number", Integer, nullable=False),
+    Column("content", Text, nullable=False),
+    Column("change_summary", Text),
+    Column("created_at", DateTime),
+    Index("ix_artifact_versions_artifact_number", "artifact_id", "version_number", unique=True),
+)
+
+templates = Table(
+    "templates", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(255), nullable=False),
+    Column("description", Text),
+    Column("content", Text, nullable=False),
+    Column("category", String(100)),
+    Column("organization_id", Integer, ForeignKey("organizations.id"), nullable=False),
+    Column("source_artifact_id", Integer, ForeignKey("artifacts.id")),
+    Column("sanitization_checklist", JSON),
+    Column("is_promoted", Boolean),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    Index("ix_templates_org_updated_id", "organization_id", "updated_at", "id"),
+    Index("ix_templates_promoted_updated", "is_promoted", "updated_at"),
+)
+
+template_imports = Table(
+    "template_imports", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("template_id", Integer, ForeignKey("templates.id"), nullable=False),
+    Column("importing_org_id", Integer, ForeignKey("organizations.id"), nullable=False),
+    Column("imported_as_artifact_id", Integer, ForeignKey("artifacts.id")),
+    Column("created_at", DateTime),
+)
+
+sops = Table(
+    "sops", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("title", String(255), nullable=False),
+    Column("description", Text),
+    Column("organization_id", Integer, ForeignKey("organizations.id"), nullable=False),
+    Column("project_id", Integer, ForeignKey("projects.id")),
+    Column("creator_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("version", Integer),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    Index("ix_sops_org_updated_id", "organization_id", "updated_at", "id"),
+)
+
+sop_steps = Table(
+    "sop_steps", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("sop_id", Integer, ForeignKey("sops.id"), nullable=False),
+    Column("step_number", Integer, nullable=False),
+    Column("title", String(255), nullable=False),
+    Column("description", Text),
+    Column("source_artifact_id", Integer, ForeignKey("artifacts.id")),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    Index("ix_sop_steps_sop_number", "sop_id", "step_number"),
+)
+
+search_documents = Table(
+    "search_documents", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("organization_id", Integer, ForeignKey("organizations.id"), nullable=False),
+    Column("doc_type", String(20), nullable=False),
+    Column("doc_id", Integer, nullable=False),
+    Column("title", String(255), nullable=False),
+    Column("body", Text, nullable=False),
+    Column("is_promoted", Boolean, nullable=False),
+    Column("search_vector", Text().with_variant(TSVECTOR(), "postgresql")),
+    Column("updated_at", DateTime),
+    Index("ix_search_documents_doc", "doc_type", "doc_id", unique=True),
+    Index("ix_search_documents_org", "organization_id"),
+    Index("ix_search_documents_vector", "search_vector", postgresql_using="gin").ddl_if(dialect="postgresql"),
+)
+
+for _statement in (
+    "CREATE VIRTUAL TABLE search_documents_fts USING fts5("
+    "title, body, content='search_documents', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER search_documents_ai AFTER INSERT ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    "CREATE TRIGGER search_documents_ad AFTER DELETE ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(search_documents_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); END",
+    "CREATE TRIGGER search_documents_au AFTER UPDATE ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(search_documents_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); "
+    "INSERT INTO search_documents_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+):
+    event.listen(search_documents, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+
+
+def upgrade(connection: Connection) -> None:
+    metadata.create_all(connection)
+    inspector = inspect(connection)
+    for table in metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for index in table.indexes:
+            if all(column.name in existing for column in index.columns):
+                index.create(connection, checkfirst=True)
@@ -0,0 +1,94 @@
+"""Move artifact, version and template text into the shared ``blobs`` table.
+
+Each table with an inline ``content`` column gets a ``content_blob_id``,
+backfilled in batches so identical texts collapse into one blob, and then
+loses ``content``. SQLite cannot add a ``NOT NULL`` constraint to an existing
+column, so there it is only enforced for tables created from the models.
+
+The ``blobs`` table and the indexes are spelled out as they were at this
+version; later migrations add to them.
+"""
+import hashlib
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import (
+    Column, DateTime, Index, Integer, MetaData, String, Table, Text, bindparam, column, inspect, select, table, update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+
+BATCH_SIZE = 500
+TABLES = ("artifacts", "artifact_versions", "templates")
+
+metadata = MetaData()
+
+blobs = Table(
+    "blobs", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("hash", String(64), nullable=False, unique=True),
+    Column("content", Text, nullable=False),
+    Column("size", Integer, nullable=False),
+    Column("ref_count", Integer, nullable=False),
+    Column("created_at", DateTime),
+    sqlite_autoincrement=True,
+)
+
+
+# Only for the indexes; the tables themselves exist already
+INDEXES = {
+    name: Index(f"ix_{name}_content_blob_id", Table(name, metadata, Column("content_blob_id", Integer)).c[0])
+    for name in TABLES
+}
+
+
+def _put_many(connection: Connection, texts: list) -> list:
+    digests = [hashlib.sha256(text.encode()).hexdigest() for text in texts]
+    counts = Counter(digests)
+    now = datetime.utcnow()
+    insert = pg_insert if connection.dialect.name == "postgresql" else sqlite_insert
+    statement = insert(blobs).values([
+        {"hash": digest, "content": text, "size": len(text.encode()), "ref_count": counts[digest], "created_at": now}
+        for digest, text in dict(zip(digests, texts)).items()
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=["hash"],
+        set_={"ref_count": blobs.c.ref_count + statement.excluded.ref_count},
+    ).returning(blobs.c.id, blobs.c.hash)
+    by_hash = {row.hash: row.id for row in connection.execute(statement)}
+    return [by_hash[digest] for digest in digests]
+
+
+def _backfill(connection: Connection, name: str) -> None:
+    rows = table(name, column("id"), column("content"), column("content_blob_id"))
+    last_id = 0
+    while True:
+        batch = connection.execute(
+            select(rows.c.id, rows.c.content)
+            .where(rows.c.id > last_id, rows.c.content_blob_id.is_(None))
+            .order_by(rows.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not batch:
+            return
+        blob_ids = _put_many(connection, [row.content or "" for row in batch])
+        connection.execute(
+            update(rows).where(rows.c.id == bindparam("row_id")).values(content_blob_id=bindparam("blob_id")),
+            [{"row_id": row.id, "blob_id": blob_id} for row, blob_id in zip(batch, blob_ids)],
+        )
+        last_id = batch[-1].id
+
+
+def upgrade(connection: Connection) -> None:
+    blobs.create(connection, checkfirst=True)
+    for name in TABLES:
+        existing = {column["name"] for column in inspect(connection).get_columns(name)}
+        if "content" in existing:
+            if "content_blob_id" not in existing:
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {name} ADD COLUMN content_blob_id INTEGER REFERENCES blobs(id)"
+                )
+            _backfill(connection, name)
+            connection.exec_driver_sql(f"ALTER TABLE {name} DROP COLUMN content")
+            if connection.dialect.name == "postgresql":
+                connection.exec_driver_sql(f"ALTER TABLE {name} ALTER COLUMN content_blob_id SET NOT NULL")
+        INDEXES[name].create(connection, checkfirst=True)
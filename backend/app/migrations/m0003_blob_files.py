@@ -0,0 +1,9 @@
+"""Let large blobs live in files: add ``blobs.in_file``."""
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+
+
+def upgrade(connection: Connection) -> None:
+    existing = {column["name"] for column in inspect(connection).get_columns("blobs")}
+    if "in_file" not in existing:
+        connection.exec_driver_sql("ALTER TABLE blobs ADD COLUMN in_file BOOLEAN NOT NULL DEFAULT FALSE")
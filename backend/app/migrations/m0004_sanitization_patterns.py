@@ -0,0 +1,24 @@
+"""Per-organization patterns for the sanitization scanner."""
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table, Text
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+# Only so the foreign key resolves; the table exists already
+Table("organizations", metadata, Column("id", Integer, primary_key=True))
+
+sanitization_patterns = Table(
+    "sanitization_patterns", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("organization_id", Integer, ForeignKey("organizations.id"), nullable=False, index=True),
+    Column("category", String(20), nullable=False),
+    Column("name", String(100), nullable=False),
+    Column("pattern", Text, nullable=False),
+    Column("created_at", DateTime),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    sanitization_patterns.create(connection, checkfirst=True)
+    for index in sanitization_patterns.indexes:
+        index.create(connection, checkfirst=True)
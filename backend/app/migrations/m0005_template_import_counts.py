@@ -0,0 +1,26 @@
+"""Denormalized ``templates.import_count``, backfilled from ``template_imports``."""
+from sqlalchemy import Boolean, Column, Index, Integer, MetaData, String, Table, inspect
+from sqlalchemy.engine import Connection
+
+# Only for the index; the table exists already
+templates = Table(
+    "templates", MetaData(),
+    Column("is_promoted", Boolean),
+    Column("category", String(100)),
+    Column("import_count", Integer),
+)
+index = Index(
+    "ix_templates_promoted_category_imports",
+    templates.c.is_promoted, templates.c.category, templates.c.import_count,
+)
+
+
+def upgrade(connection: Connection) -> None:
+    existing = {column["name"] for column in inspect(connection).get_columns("templates")}
+    if "import_count" not in existing:
+        connection.exec_driver_sql("ALTER TABLE templates ADD COLUMN import_count INTEGER NOT NULL DEFAULT 0")
+    index.create(connection, checkfirst=True)
+    connection.exec_driver_sql(
+        "UPDATE templates SET import_count = "
+        "(SELECT COUNT(*) FROM template_imports WHERE template_imports.template_id = templates.id)"
+    )
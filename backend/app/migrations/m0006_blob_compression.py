@@ -0,0 +1,15 @@
+"""Compress large blobs at rest: add ``blobs.encoding`` and ``blobs.compressed``.
+
+Existing blobs stay plain; only blobs written from now on are compressed.
+"""
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+
+
+def upgrade(connection: Connection) -> None:
+    existing = {column["name"] for column in inspect(connection).get_columns("blobs")}
+    if "encoding" not in existing:
+        connection.exec_driver_sql("ALTER TABLE blobs ADD COLUMN encoding VARCHAR(16)")
+    if "compressed" not in existing:
+        binary = "BYTEA" if connection.dialect.name == "postgresql" else "BLOB"
+        connection.exec_driver_sql(f"ALTER TABLE blobs ADD COLUMN compressed {binary}")
@@ -0,0 +1,26 @@
+"""Delta storage columns on ``artifact_versions``: ``is_snapshot`` and ``content_size``.
+
+Rows written before delta storage are full copies, so they become snapshots
+and their size is the size of their blob. ``python -m
+scripts.migrate_version_deltas`` can convert such histories to deltas later.
+"""
+from sqlalchemy import column, inspect, select, table, update
+from sqlalchemy.engine import Connection
+
+versions = table("artifact_versions", column("content_blob_id"), column("content_size"))
+blobs = table("blobs", column("id"), column("size"))
+
+
+def upgrade(connection: Connection) -> None:
+    existing = {column["name"] for column in inspect(connection).get_columns("artifact_versions")}
+    if "is_snapshot" not in existing:
+        connection.exec_driver_sql(
+            "ALTER TABLE artifact_versions ADD COLUMN is_snapshot BOOLEAN NOT NULL DEFAULT TRUE"
+        )
+    if "content_size" not in existing:
+        connection.exec_driver_sql("ALTER TABLE artifact_versions ADD COLUMN content_size INTEGER")
+    connection.execute(
+        update(versions)
+        .where(versions.c.content_size.is_(None))
+        .values(content_size=select(blobs.c.size).where(blobs.c.id == versions.c.content_blob_id).scalar_subquery())
+    )
@@ -0,0 +1,83 @@
+"""Never reuse artifact ids on SQLite: rebuild ``artifacts`` with ``AUTOINCREMENT``.
+
+Artifact ids key the in-process version cache, and other tables may still
+name a deleted artifact, so an id handed out again would attach them to the
+wrong artifact. SQLite only reuses the highest rowid without
+``AUTOINCREMENT``, which cannot be added to an existing table, so the table
+is recreated and its rows copied. The sequence starts above every artifact
+id still referenced anywhere. PostgreSQL sequences never go back; nothing
+to do there.
+"""
+from sqlalchemy import (
+    Boolean, Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, Text, column, func, select,
+    table, union_all,
+)
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+# Only so the foreign keys resolve; the tables exist already
+for _name in ("blobs", "organizations", "projects", "users"):
+    Table(_name, metadata, Column("id", Integer, primary_key=True))
+
+artifacts = Table(
+    "artifacts_rebuilt", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("title", String(255), nullable=False),
+    Column("description", Text),
+    Column("content_blob_id", Integer, ForeignKey("blobs.id"), nullable=False),
+    Column("organization_id", Integer, ForeignKey("organizations.id"), nullable=False),
+    Column("project_id", Integer, ForeignKey("projects.id")),
+    Column("creator_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("version", Integer),
+    Column("is_promoted_to_template", Boolean),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    sqlite_autoincrement=True,
+)
+COLUMNS = ", ".join(column.name for column in artifacts.columns)
+
+# Created once the rebuilt table has its final name
+indexes = Table(
+    "artifacts", MetaData(),
+    Column("id", Integer), Column("organization_id", Integer), Column("updated_at", DateTime),
+    Column("content_blob_id", Integer),
+)
+INDEXES = [
+    Index("ix_artifacts_id", indexes.c.id),
+    Index("ix_artifacts_org_updated_id", indexes.c.organization_id, indexes.c.updated_at, indexes.c.id),
+    Index("ix_artifacts_content_blob_id", indexes.c.content_blob_id),
+]
+
+REFERENCES = [
+    ("artifacts", "id"),
+    ("artifact_versions", "artifact_id"),
+    ("templates", "source_artifact_id"),
+    ("template_imports", "imported_as_artifact_id"),
+    ("sop_steps", "source_artifact_id"),
+]
+
+
+def upgrade(connection: Connection) -> None:
+    if connection.dialect.name != "sqlite":
+        return
+    definition = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'artifacts'"
+    ).scalar()
+    if "AUTOINCREMENT" in definition.upper():
+        return
+
+    highest = connection.scalar(select(func.max(column("id"))).select_from(union_all(*(
+        select(func.max(column(name)).label("id")).select_from(table(source, column(name)))
+        for source, name in REFERENCES
+    )).subquery()))
+
+    artifacts.create(connection)
+    connection.exec_driver_sql(f"INSERT INTO artifacts_rebuilt ({COLUMNS}) SELECT {COLUMNS} FROM artifacts")
+    connection.exec_driver_sql("DROP TABLE artifacts")
+    connection.exec_driver_sql("ALTER TABLE artifacts_rebuilt RENAME TO artifacts")
+    for index in INDEXES:
+        index.create(connection, checkfirst=True)
+    if highest:
+        connection.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'artifacts'")
+        connection.exec_driver_sql(f"INSERT INTO sqlite_sequence (name, seq) VALUES ('artifacts', {int(highest)})")
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Enum, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Enum, LargeBinary, JSON, Index, DDL, event
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -23,6 +24,28 @@ class Organization(Base):
     projects = relationship("Project", back_populates="organization")
 
 
+class Blob(Base):
+    """Text stored once per distinct content and shared by reference count.
+
+    Artifacts, their versions and templates point here through
+    ``content_blob_id``; see ``app.services.blobs``.
+    """
+
+    __tablename__ = "blobs"
+    # Ids key the in-process blob cache, so SQLite must never reuse them
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    hash = Column(String(64), nullable=False, unique=True)  # SHA-256 of the UTF-8 text
+    content = Column(Text, nullable=False)  # Empty when the text is compressed or kept in a file
+    size = Column(Integer, nullable=False)  # Bytes of the UTF-8 text
+    in_file = Column(Boolean, nullable=False, default=False)  # Stored under BLOB_FILE_DIR, named by id
+    encoding = Column(String(16), nullable=True)  # "gzip" when stored compressed, inline or in the file
+    compressed = Column(LargeBinary, nullable=True)  # The inline text when encoding is set
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -57,11 +80,16 @@ class Project(Base):
 
 class Artifact(Base):
     __tablename__ = "artifacts"
+    __table_args__ = (
+        Index("ix_artifacts_org_updated_id", "organization_id", "updated_at", "id"),
+        # Ids key the version cache, so SQLite must never reuse them
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
     description = Column(Text)
-    content = Column(Text, nullable=False)
+    content_blob_id = Column(Integer, ForeignKey("blobs.id"), nullable=False, index=True)
     organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
     project_id = Column(Integer, ForeignKey("projects.id"))
     creator_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -75,38 +103,56 @@ class Artifact(Base):
     creator = relationship("User", back_populates="artifacts")
     versions = relationship("ArtifactVersion", back_populates="artifact", cascade="all, delete-orphan")
 
+    content = None  # Head text, filled from the blob by blobs.load; not a column
+
 
 class ArtifactVersion(Base):
     __tablename__ = "artifact_versions"
+    __table_args__ = (
+        Index("ix_artifact_versions_artifact_number", "artifact_id", "version_number", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     artifact_id = Column(Integer, ForeignKey("artifacts.id"), nullable=False)
     version_number = Column(Integer, nullable=False)
-    content = Column(Text, nullable=False)
+    content_blob_id = Column(Integer, ForeignKey("blobs.id"), nullable=False, index=True)
+    is_snapshot = Column(Boolean, nullable=False, default=True)
+    content_size = Column(Integer)  # Size of the reconstructed content in bytes
     change_summary = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     artifact = relationship("Artifact", back_populates="versions")
 
+    content = None  # Full text for snapshots, encoded delta otherwise; filled by blobs.load
+
 
 class Template(Base):
     __tablename__ = "templates"
+    __table_args__ = (
+        Index("ix_templates_org_updated_id", "organization_id", "updated_at", "id"),
+        Index("ix_templates_promoted_updated", "is_promoted", "updated_at"),
+        Index("ix_templates_promoted_category_imports", "is_promoted", "category", "import_count"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
     description = Column(Text)
-    content = Column(Text, nullable=False)
+    content_blob_id = Column(Integer, ForeignKey("blobs.id"), nullable=False, index=True)
     category = Column(String(100))
     organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
     source_artifact_id = Column(Integer, ForeignKey("artifacts.id"))
-    sanitization_checklist = Column(JSON)  # List of sanitization items applied
+    sanitization_checklist = Column(JSON)  # {"items": client checklist, "scan": scanner report}
     is_promoted = Column(Boolean, default=False)
+    # Denormalized count of template_imports rows, flushed in batches by app.services.import_counts
+    import_count = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     organization = relationship("Organization", back_populates="templates")
     template_imports = relationship("TemplateImport", back_populates="template", cascade="all, delete-orphan")
 
+    content = None  # Filled from the blob by blobs.load; not a column
+
 
 class TemplateImport(Base):
     __tablename__ = "template_imports"
@@ -120,8 +166,24 @@ class TemplateImport(Base):
     template = relationship("Template", back_populates="template_imports")
 
 
+class SanitizationPattern(Base):
+    """An organization's own pattern for the promotion scanner (see ``app.services.sanitization``)."""
+
+    __tablename__ = "sanitization_patterns"
+
+    id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False, index=True)
+    category = Column(String(20), nullable=False)  # customer (a literal name) or custom (a regex)
+    name = Column(String(100), nullable=False)
+    pattern = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 class SOP(Base):
     __tablename__ = "sops"
+    __table_args__ = (
+        Index("ix_sops_org_updated_id", "organization_id", "updated_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
@@ -136,11 +198,16 @@ class SOP(Base):
     organization = relationship("Organization", back_populates="sops")
     project = relationship("Project", back_populates="sops")
     creator = relationship("User", back_populates="sops")
-    steps = relationship("SOPStep", back_populates="sop", cascade="all, delete-orphan")
+    steps = relationship(
+        "SOPStep", back_populates="sop", cascade="all, delete-orphan", order_by="SOPStep.step_number"
+    )
 
 
 class SOPStep(Base):
     __tablename__ = "sop_steps"
+    __table_args__ = (
+        Index("ix_sop_steps_sop_number", "sop_id", "step_number"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     sop_id = Column(Integer, ForeignKey("sops.id"), nullable=False)
@@ -152,3 +219,44 @@ class SOPStep(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     sop = relationship("SOP", back_populates="steps")
+
+
+class SearchDocument(Base):
+    """Denormalized text of artifacts, templates and SOPs for full-text search.
+
+    PostgreSQL ranks on the ``search_vector`` column (GIN indexed); SQLite keeps
+    an FTS5 shadow table in sync through triggers.
+    """
+
+    __tablename__ = "search_documents"
+    __table_args__ = (
+        Index("ix_search_documents_doc", "doc_type", "doc_id", unique=True),
+        Index("ix_search_documents_org", "organization_id"),
+        Index("ix_search_documents_vector", "search_vector", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+    doc_type = Column(String(20), nullable=False)  # artifact, template or sop
+    doc_id = Column(Integer, nullable=False)
+    title = Column(String(255), nullable=False)
+    body = Column(Text, nullable=False, default="")
+    is_promoted = Column(Boolean, nullable=False, default=False)
+    search_vector = Column(Text().with_variant(TSVECTOR(), "postgresql"))
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+for _statement in (
+    "CREATE VIRTUAL TABLE search_documents_fts USING fts5("
+    "title, body, content='search_documents', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER search_documents_ai AFTER INSERT ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    "CREATE TRIGGER search_documents_ad AFTER DELETE ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(search_documents_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); END",
+    "CREATE TRIGGER search_documents_au AFTER UPDATE ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(search_documents_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); "
+    "INSERT INTO search_documents_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+):
+    event.listen(SearchDocument.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
@@ -0,0 +1,51 @@
+"""pytest fixtures for checking how many SQL statements a route issues.
+
+Enable with ``pytest -p app.pytest_plugin`` or ``pytest_plugins = ["app.pytest_plugin"]``
+in a ``conftest.py``::
+
+    def test_sop_detail(client, query_budget):
+        with query_budget(3):
+            client.get("/api/sops/1", headers=auth)
+
+Every request that finishes inside the block must stay within the budget,
+otherwise the test fails with the statements that request executed.
+``@pytest.mark.query_budget(n)`` applies a budget to every request in a test.
+"""
+from contextlib import contextmanager
+import pytest
+from app.services import query_stats
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "query_budget(n): fail if any request in the test runs more than n SQL statements"
+    )
+
+
+def _check(finished, budget: int) -> None:
+    over = [stats for stats in finished if stats.count > budget]
+    if over:
+        details = "\n".join(stats.summary() for stats in over)
+        pytest.fail(f"Query budget of {budget} exceeded:\n{details}", pytrace=False)
+
+
+@pytest.fixture
+def query_budget():
+    @contextmanager
+    def budget(limit: int):
+        with query_stats.observe() as finished:
+            yield finished
+        _check(finished, limit)
+
+    return budget
+
+
+@pytest.fixture(autouse=True)
+def _query_budget_marker(request):
+    marker = request.node.get_closest_marker("query_budget")
+    if marker is None:
+        yield
+        return
+    with query_stats.observe() as finished:
+        yield
+    _check(finished, marker.args[0])
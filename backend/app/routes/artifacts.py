@@ -1,10 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
 from app.database import get_db
-from app.middleware.auth import get_current_user
-from app.models import User, Artifact, ArtifactVersion
-from app.schemas import ArtifactCreate, ArtifactUpdate, ArtifactResponse, ArtifactDetailResponse
-from typing import List
+from app.middleware.auth import get_current_principal
+from app.models import Artifact, ArtifactVersion, Blob
+from app.schemas import (
+    ArtifactCreate,
+    ArtifactUpdate,
+    ArtifactResponse,
+    ArtifactSummaryResponse,
+    ArtifactDetailResponse,
+    ArtifactVersionSummaryResponse,
+    ArtifactVersionResponse,
+)
+from app.services import blobs, bulk, content_stream, diffing, etag, serialization
+from app.services import search as search_index
+from app.services import versioning
+from app.services.change_feed import change_feed
+from app.services.principal_cache import Principal
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate_rows, set_next_cursor
+from typing import List, Literal, Optional, Union
 
 router = APIRouter(prefix="/api/artifacts", tags=["artifacts"])
 
@@ -12,8 +29,8 @@ router = APIRouter(prefix="/api/artifacts", tags=["artifacts"])
 @router.post("/", response_model=ArtifactResponse)
 async def create_artifact(
     artifact_data: ArtifactCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
 ):
     artifact = Artifact(
         title=artifact_data.title,
@@ -23,43 +40,268 @@ async def create_artifact(
         project_id=artifact_data.project_id,
         creator_id=current_user.id,
     )
+    await blobs.store(db, artifact)
     db.add(artifact)
-    db.flush()
+    await db.flush()
 
-    # Create initial version
-    version = ArtifactVersion(
-        artifact_id=artifact.id,
-        version_number=1,
-        content=artifact_data.content,
-        change_summary="Initial version",
+    # Create initial version; its snapshot shares the artifact's blob
+    version = versioning.build_version(
+        artifact.id, 1, artifact_data.content, None, "Initial version"
     )
+    await blobs.store(db, version)
     db.add(version)
-    db.commit()
-    db.refresh(artifact)
-    return artifact
+    versioning.cache_on_commit(db, version, artifact_data.content)
+    await search_index.index_artifact(db, artifact)
+    await db.commit()
+    change_feed.publish(current_user.organization_id, "artifact", artifact.id, "created", artifact.version)
+    await db.refresh(artifact)
+    return blobs.omit_large(artifact, settings.CONTENT_INLINE_MAX_BYTES)
 
 
-@router.get("/", response_model=List[ArtifactResponse])
+@router.get("/", response_model=Union[List[ArtifactResponse], List[ArtifactSummaryResponse]])
 async def list_artifacts(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    view: Literal["full", "summary"] = "full",
+    project_id: Optional[int] = None,
+    creator_id: Optional[int] = None,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    criteria = [Artifact.organization_id == current_user.organization_id]
+    if project_id is not None:
+        criteria.append(Artifact.project_id == project_id)
+    if creator_id is not None:
+        criteria.append(Artifact.creator_id == creator_id)
+
+    list_etag = await etag.list_etag(
+        request, db, Artifact, criteria,
+        "artifacts", current_user.organization_id, cursor, limit, view, project_id, creator_id,
+    )
+    if list_etag and etag.matches(request, list_etag):
+        return etag.not_modified(list_etag)
+
+    # Summary listings never select the content column
+    schema = ArtifactSummaryResponse if view == "summary" else ArtifactResponse
+    query = select(*serialization.columns(Artifact, schema)).where(*criteria)
+    rows, next_cursor = await paginate_rows(db, query, Artifact, cursor, limit)
+    rows = await serialization.load_content(db, rows, schema, settings.CONTENT_INLINE_MAX_BYTES)
+
+    response = serialization.json_response(serialization.render(rows, schema))
+    etag.set_etag(response, list_etag or etag.body_etag(response.body))
+    set_next_cursor(response, next_cursor)
+    return response
+
+
+@router.get("/export")
+async def export_artifacts(
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
 ):
-    artifacts = db.query(Artifact).filter(
-        Artifact.organization_id == current_user.organization_id
-    ).all()
-    return artifacts
+    return StreamingResponse(
+        bulk.export_organization(db, current_user.organization_id),
+        media_type=bulk.NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": 'attachment; filename="export.ndjson"'},
+    )
+
+
+@router.post("/import")
+async def import_artifacts(
+    request: Request,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    counts = await bulk.import_artifacts(
+        db, current_user.organization_id, current_user.id, bulk.iter_lines(request.stream())
+    )
+    if counts["artifacts"]:
+        # One event for the batch rather than one per row
+        change_feed.publish(current_user.organization_id, "artifact", None, "imported")
+    return counts
 
 
 @router.get("/{artifact_id}", response_model=ArtifactDetailResponse)
 async def get_artifact(
     artifact_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    if etag.requested(request):
+        # Revalidate from the version columns alone
+        state = (await db.execute(select(Artifact.version, Artifact.updated_at).where(
+            Artifact.id == artifact_id,
+            Artifact.organization_id == current_user.organization_id,
+        ))).one_or_none()
+        if state is not None:
+            detail_etag = etag.make_etag("artifact", artifact_id, *state)
+            if etag.matches(request, detail_etag):
+                return etag.not_modified(detail_etag)
+
+    artifact = await db.scalar(select(Artifact).where(
+        Artifact.id == artifact_id,
+        Artifact.organization_id == current_user.organization_id,
+    ))
+
+    if not artifact:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Artifact not found",
+        )
+    etag.set_etag(response, etag.make_etag("artifact", artifact.id, artifact.version, artifact.updated_at))
+    await blobs.load(db, artifact, max_bytes=settings.CONTENT_INLINE_MAX_BYTES)
+
+    # Version metadata only; content is served by the /versions endpoints
+    versions = (await db.execute(
+        select(
+            ArtifactVersion.id,
+            ArtifactVersion.version_number,
+            ArtifactVersion.change_summary,
+            ArtifactVersion.content_size,
+            ArtifactVersion.created_at,
+        ).where(
+            ArtifactVersion.artifact_id == artifact.id
+        ).order_by(ArtifactVersion.version_number)
+    )).all()
+
+    return ArtifactDetailResponse(
+        **ArtifactResponse.model_validate(artifact).model_dump(),
+        versions=[ArtifactVersionSummaryResponse.model_validate(version) for version in versions],
+    )
+
+
+@router.get("/{artifact_id}/content")
+async def get_artifact_content(
+    artifact_id: int,
+    request: Request,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    blob = (await db.execute(
+        select(Blob.id, Blob.hash, Blob.size, Blob.in_file, Blob.encoding, Blob.compressed)
+        .join(Artifact, Artifact.content_blob_id == Blob.id)
+        .where(
+            Artifact.id == artifact_id,
+            Artifact.organization_id == current_user.organization_id,
+        )
+    )).one_or_none()
+
+    if not blob:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Artifact not found",
+        )
+
+    return await content_stream.response(db, request, blob)
+
+
+@router.get("/{artifact_id}/versions", response_model=List[ArtifactVersionResponse])
+async def list_artifact_versions(
+    artifact_id: int,
+    request: Request,
+    response: Response,
+    cursor: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    artifact = (await db.execute(select(Artifact.id, Artifact.version).where(
+        Artifact.id == artifact_id,
+        Artifact.organization_id == current_user.organization_id,
+    ))).one_or_none()
+
+    if not artifact:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Artifact not found",
+        )
+
+    # Versions never change once written, so the head version number pins the page
+    page_etag = etag.make_etag("artifact_versions", artifact.id, artifact.version, cursor, limit)
+    if etag.matches(request, page_etag):
+        return etag.not_modified(page_etag)
+    etag.set_etag(response, page_etag)
+
+    # Newest first; the cursor is the last version number already returned
+    last = min(artifact.version, cursor - 1) if cursor is not None else artifact.version
+    first = max(last - limit + 1, 1)
+    if last < first:
+        return []
+
+    versions = await versioning.get_versions(db, artifact.id, first, last)
+    if first > 1:
+        set_next_cursor(response, str(first))
+    return [
+        ArtifactVersionResponse(
+            **ArtifactVersionSummaryResponse.model_validate(version).model_dump(),
+            content=content,
+        )
+        for version, content in reversed(versions)
+    ]
+
+
+@router.get("/{artifact_id}/versions/{version_number}", response_model=ArtifactVersionResponse)
+async def get_artifact_version(
+    artifact_id: int,
+    version_number: int,
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    if etag.requested(request):
+        version_id = await db.scalar(select(ArtifactVersion.id).join(Artifact).where(
+            Artifact.id == artifact_id,
+            Artifact.organization_id == current_user.organization_id,
+            ArtifactVersion.version_number == version_number,
+        ))
+        if version_id is not None:
+            version_etag = etag.make_etag("artifact_version", artifact_id, version_number, version_id)
+            if etag.matches(request, version_etag):
+                return etag.not_modified(version_etag)
+
+    artifact = await db.scalar(select(Artifact).where(
+        Artifact.id == artifact_id,
+        Artifact.organization_id == current_user.organization_id,
+    ))
+
+    version = None
+    if artifact:
+        version = await db.scalar(select(ArtifactVersion).where(
+            ArtifactVersion.artifact_id == artifact.id,
+            ArtifactVersion.version_number == version_number,
+        ))
+
+    if not version:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Version not found",
+        )
+
+    content = await versioning.get_version_content(db, artifact, version_number)
+    etag.set_etag(response, etag.make_etag("artifact_version", artifact.id, version_number, version.id))
+    return ArtifactVersionResponse(
+        **ArtifactVersionSummaryResponse.model_validate(version).model_dump(),
+        content=content,
+    )
+
+
+@router.get("/{artifact_id}/diff")
+async def diff_artifact_versions(
+    artifact_id: int,
+    request: Request,
+    from_version: int = Query(..., alias="from", ge=1),
+    to_version: int = Query(..., alias="to", ge=1),
+    mode: Literal["line", "word"] = "line",
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
 ):
-    artifact = db.query(Artifact).filter(
+    artifact = await db.scalar(select(Artifact).where(
         Artifact.id == artifact_id,
         Artifact.organization_id == current_user.organization_id,
-    ).first()
+    ))
 
     if not artifact:
         raise HTTPException(
@@ -67,60 +309,116 @@ async def get_artifact(
             detail="Artifact not found",
         )
 
-    return artifact
+    # Versions never change once written
+    diff_etag = etag.make_etag("artifact_diff", artifact.id, artifact.created_at, from_version, to_version, mode)
+    if etag.matches(request, diff_etag):
+        return etag.not_modified(diff_etag)
+
+    key = (artifact.id, from_version, to_version, mode)
+    cached = diffing.diff_cache.get(key)
+    if cached is not None:
+        chunks = iter(cached)
+    else:
+        old = new = None
+        if max(from_version, to_version) <= artifact.version:
+            old = await versioning.get_version_content(db, artifact, from_version)
+            new = await versioning.get_version_content(db, artifact, to_version)
+        if old is None or new is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Version not found",
+            )
+        # A sync iterator, so the diff is computed in the threadpool as it streams
+        chunks = diffing.cached_diff(key, diffing.iter_diff(old, new, mode))
+
+    response = StreamingResponse(chunks, media_type=bulk.NDJSON_MEDIA_TYPE)
+    etag.set_etag(response, diff_etag)
+    return response
 
 
 @router.put("/{artifact_id}", response_model=ArtifactResponse)
 async def update_artifact(
     artifact_id: int,
     artifact_data: ArtifactUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
 ):
-    artifact = db.query(Artifact).filter(
+    # Concurrent edits wait here on PostgreSQL; SQLite has no row locks, see below
+    artifact = await db.scalar(select(Artifact).where(
         Artifact.id == artifact_id,
         Artifact.organization_id == current_user.organization_id,
-    ).first()
+    ).with_for_update())
 
     if not artifact:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Artifact not found",
         )
+    await blobs.load(db, artifact)
 
     # Create new version if content changed
+    previous_content = None
     if artifact_data.content and artifact_data.content != artifact.content:
+        previous_content = artifact.content
         new_version_number = artifact.version + 1
-        version = ArtifactVersion(
-            artifact_id=artifact.id,
-            version_number=new_version_number,
-            content=artifact_data.content,
-            change_summary=artifact_data.change_summary,
+        # Claim the version number only if the head is still the one just read
+        claimed = await db.execute(
+            update(Artifact)
+            .where(Artifact.id == artifact.id, Artifact.version == artifact.version)
+            .values(version=new_version_number)
+            .execution_options(synchronize_session=False)
         )
-        db.add(version)
+        if claimed.rowcount != 1:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Artifact was changed by another request; reload it and retry",
+            )
+        # A delta needs the previous version's row to be applied to
+        has_base = await versioning.has_version(db, artifact.id, artifact.version)
+        version = await versioning.build_version_async(
+            artifact.id,
+            new_version_number,
+            artifact_data.content,
+            artifact.content if has_base else None,
+            artifact_data.change_summary,
+        )
+        previous_blob_id = artifact.content_blob_id
         artifact.version = new_version_number
         artifact.content = artifact_data.content
+        await blobs.store(db, artifact, version)
+        await blobs.release(db, [previous_blob_id])
+        db.add(version)
+        versioning.cache_on_commit(db, version, artifact_data.content)
 
     if artifact_data.title:
         artifact.title = artifact_data.title
     if artifact_data.description is not None:
         artifact.description = artifact_data.description
 
-    db.commit()
-    db.refresh(artifact)
-    return artifact
+    await search_index.index_artifact(db, artifact)
+    await db.commit()
+    change_feed.publish(current_user.organization_id, "artifact", artifact.id, "updated", artifact.version)
+    if previous_content is not None:
+        # Runs after the response is sent; the diff view usually asks for this pair first
+        background_tasks.add_task(
+            diffing.precompute, artifact.id, artifact.version - 1, artifact.version,
+            previous_content, artifact.content,
+        )
+    await db.refresh(artifact)
+    return blobs.omit_large(artifact, settings.CONTENT_INLINE_MAX_BYTES)
 
 
 @router.delete("/{artifact_id}")
 async def delete_artifact(
     artifact_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
 ):
-    artifact = db.query(Artifact).filter(
+    artifact = await db.scalar(select(Artifact).where(
         Artifact.id == artifact_id,
         Artifact.organization_id == current_user.organization_id,
-    ).first()
+    ))
 
     if not artifact:
         raise HTTPException(
@@ -128,6 +426,15 @@ async def delete_artifact(
             detail="Artifact not found",
         )
 
-    db.delete(artifact)
-    db.commit()
+    blob_ids = [artifact.content_blob_id, *(await db.scalars(
+        select(ArtifactVersion.content_blob_id).where(ArtifactVersion.artifact_id == artifact.id)
+    )).all()]
+    await db.delete(artifact)
+    await db.flush()
+    await blobs.release(db, blob_ids)
+    await search_index.remove_document(db, "artifact", artifact_id)
+    await db.commit()
+    versioning.forget_artifact(artifact_id)
+    diffing.forget_artifact(artifact_id)
+    change_feed.publish(current_user.organization_id, "artifact", artifact_id, "deleted")
     return {"status": "deleted"}
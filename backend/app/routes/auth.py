@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
+from app.models import User
 from app.schemas import UserRegister, UserLogin, TokenResponse, UserResponse
 from app.services.auth_service import (
+    PasswordHasherBusy,
     register_user,
     authenticate_user,
     create_access_token,
@@ -10,20 +13,33 @@ from app.services.auth_service import (
     verify_token,
 )
 from app.middleware.auth import get_current_user
-from app.models import User
+from app.services.principal_cache import Principal
+from app.services.read_routing import read_router
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent sign-ins, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/register", response_model=TokenResponse)
-async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
     try:
-        user = register_user(db, user_data)
+        user = await register_user(db, user_data)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except PasswordHasherBusy:
+        raise _hasher_busy()
+    # The request carried no token, so start the new user's read-your-writes window here
+    read_router.record_write(user.id)
 
-    access_token = create_access_token({"sub": user.id})
-    refresh_token = create_refresh_token({"sub": user.id})
+    access_token = create_access_token({"sub": str(user.id)}, organization_id=user.organization_id)
+    refresh_token = create_refresh_token({"sub": str(user.id)}, organization_id=user.organization_id)
 
     return {
         "access_token": access_token,
@@ -32,16 +48,24 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=TokenResponse)
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
-    user = authenticate_user(db, credentials.email, credentials.password)
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
+    try:
+        user = await authenticate_user(db, credentials.email, credentials.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
         )
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Inactive user",
+        )
 
-    access_token = create_access_token({"sub": user.id})
-    refresh_token = create_refresh_token({"sub": user.id})
+    access_token = create_access_token({"sub": str(user.id)}, organization_id=user.organization_id)
+    refresh_token = create_refresh_token({"sub": str(user.id)}, organization_id=user.organization_id)
 
     return {
         "access_token": access_token,
@@ -50,17 +74,25 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
 
 
 @router.post("/refresh", response_model=TokenResponse)
-async def refresh(refresh_token: str):
+async def refresh(refresh_token: str, db: AsyncSession = Depends(get_db)):
     payload = verify_token(refresh_token)
-    if payload is None or payload.get("type") != "refresh":
+    if payload is None or payload.get("type") != "refresh" or payload.get("sub") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+        )
+
+    # Refresh tokens outlive any deactivation, so the user is checked every time
+    user = await db.scalar(select(User).where(User.id == int(payload["sub"])))
+    if user is None or not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid refresh token",
         )
 
-    user_id = payload.get("sub")
-    access_token = create_access_token({"sub": user_id})
-    new_refresh_token = create_refresh_token({"sub": user_id})
+    user_id = str(user.id)
+    access_token = create_access_token({"sub": user_id}, organization_id=user.organization_id)
+    new_refresh_token = create_refresh_token({"sub": user_id}, organization_id=user.organization_id)
 
     return {
         "access_token": access_token,
@@ -69,5 +101,5 @@ async def refresh(refresh_token: str):
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: Principal = Depends(get_current_user)):
     return current_user
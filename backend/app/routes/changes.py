@@ -0,0 +1,68 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
+from app.config import settings
+from app.middleware.auth import get_streaming_principal
+from app.services.change_feed import change_feed, encode, encode_change
+from app.services.principal_cache import Principal
+
+router = APIRouter(prefix="/api/changes", tags=["changes"])
+
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+RETRY_MILLISECONDS = 3000
+
+
+async def _events(organization_id: int, last_event_id: Optional[str]):
+    # Subscribed on first iteration, so a stream that never starts never registers
+    subscription, replay, seq = change_feed.subscribe(organization_id, last_event_id)
+    try:
+        yield f"retry: {RETRY_MILLISECONDS}\n\n".encode()
+        if replay is None:
+            # The client's position is gone; it refetches and continues from here
+            yield encode(change_feed.event_id(seq), "reset", {"seq": seq})
+        elif not last_event_id:
+            # Gives a new client an id to resume from even if nothing changes
+            yield encode(change_feed.event_id(seq), "ready", {"seq": seq})
+        for change in replay or []:
+            yield encode_change(change_feed, change)
+
+        while True:
+            try:
+                change = await asyncio.wait_for(subscription.queue.get(), settings.CHANGE_FEED_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            if change is None:
+                # Fell too far behind; reconnecting resumes from the backlog
+                yield b"event: dropped\ndata: {}\n\n"
+                return
+            yield encode_change(change_feed, change)
+    finally:
+        change_feed.unsubscribe(subscription)
+
+
+@router.get("/")
+async def stream_changes(
+    last_event_id: Optional[str] = Header(None),
+    after: Optional[str] = None,
+    current_user: Principal = Depends(get_streaming_principal),
+):
+    """Server-sent ``change`` events for the caller's organization.
+
+    Resume with the ``Last-Event-ID`` header (sent by ``EventSource``) or
+    ``?after=<event id>``.
+    """
+    if change_feed.full():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many open change streams",
+            headers={"Retry-After": str(RETRY_MILLISECONDS // 1000)},
+        )
+
+    return StreamingResponse(
+        _events(current_user.organization_id, last_event_id or after),
+        media_type=EVENT_STREAM_MEDIA_TYPE,
+        # Keep proxies from buffering or caching the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,108 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import get_db
+from app.middleware.auth import get_current_principal
+from app.models import Artifact, SanitizationPattern
+from app.schemas import (
+    SanitizationPatternCreate,
+    SanitizationPatternResponse,
+    SanitizationReport,
+    SanitizationScanRequest,
+)
+from app.services import blobs, sanitization
+from app.services.principal_cache import Principal
+from typing import List
+
+router = APIRouter(prefix="/api/sanitization", tags=["sanitization"])
+
+
+@router.get("/patterns", response_model=List[SanitizationPatternResponse])
+async def list_patterns(
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    return (await db.scalars(
+        select(SanitizationPattern)
+        .where(SanitizationPattern.organization_id == current_user.organization_id)
+        .order_by(SanitizationPattern.id)
+    )).all()
+
+
+@router.post("/patterns", response_model=SanitizationPatternResponse)
+async def create_pattern(
+    pattern_data: SanitizationPatternCreate,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    problem = sanitization.validate_pattern(pattern_data.category, pattern_data.pattern)
+    if problem:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=problem)
+
+    count = await db.scalar(select(func.count()).select_from(SanitizationPattern).where(
+        SanitizationPattern.organization_id == current_user.organization_id
+    ))
+    if count >= settings.SANITIZATION_MAX_PATTERNS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Organizations can have at most {settings.SANITIZATION_MAX_PATTERNS} patterns",
+        )
+
+    pattern = SanitizationPattern(
+        organization_id=current_user.organization_id,
+        category=pattern_data.category,
+        name=pattern_data.name,
+        pattern=pattern_data.pattern,
+    )
+    db.add(pattern)
+    await db.commit()
+    await db.refresh(pattern)
+    return pattern
+
+
+@router.delete("/patterns/{pattern_id}")
+async def delete_pattern(
+    pattern_id: int,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    pattern = await db.scalar(select(SanitizationPattern).where(
+        SanitizationPattern.id == pattern_id,
+        SanitizationPattern.organization_id == current_user.organization_id,
+    ))
+
+    if not pattern:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pattern not found",
+        )
+
+    await db.delete(pattern)
+    await db.commit()
+    return {"status": "deleted"}
+
+
+@router.post("/scan", response_model=SanitizationReport)
+async def scan_artifact(
+    scan_data: SanitizationScanRequest,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    """Preview what promoting the artifact would record, without promoting it."""
+    blob_id = await db.scalar(select(Artifact.content_blob_id).where(
+        Artifact.id == scan_data.artifact_id,
+        Artifact.organization_id == current_user.organization_id,
+    ))
+
+    if blob_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Artifact not found",
+        )
+
+    spec = await sanitization.organization_spec(db, current_user.organization_id)
+    try:
+        return await sanitization.scanner.scan(spec, await blobs.get(db, blob_id))
+    except sanitization.ScanTimedOut:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=sanitization.TIMED_OUT)
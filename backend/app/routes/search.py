@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db
+from app.middleware.auth import get_current_principal
+from app.schemas import SearchResult
+from app.services import search as search_index
+from app.services.principal_cache import Principal
+from typing import List, Literal, Optional
+
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+
+@router.get("/", response_model=List[SearchResult])
+async def search(
+    q: str = Query(..., min_length=1, max_length=500),
+    type: Optional[List[Literal["artifact", "template", "sop"]]] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    rows = await search_index.search(db, current_user.organization_id, q, type, limit, offset)
+    return [
+        SearchResult(type=row.doc_type, id=row.doc_id, title=row.title, snippet=row.snippet, rank=row.rank)
+        for row in rows
+    ]
@@ -1,67 +1,134 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from app.database import get_db
-from app.middleware.auth import get_current_user
-from app.models import User, SOP, SOPStep
+from app.middleware.auth import get_current_principal
+from app.models import SOP, SOPStep
 from app.schemas import SOPCreate, SOPResponse, SOPDetailResponse
-from typing import List
+from app.services import etag, serialization
+from app.services import search as search_index
+from app.services.change_feed import change_feed
+from app.services.principal_cache import Principal
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate_rows, set_next_cursor
+from typing import List, Optional
 
 router = APIRouter(prefix="/api/sops", tags=["sops"])
 
 
+async def _create_sops(db: AsyncSession, current_user: Principal, sops_data: List[SOPCreate]) -> List[SOP]:
+    sops = [
+        SOP(
+            title=sop_data.title,
+            description=sop_data.description,
+            organization_id=current_user.organization_id,
+            project_id=sop_data.project_id,
+            creator_id=current_user.id,
+        )
+        for sop_data in sops_data
+    ]
+    db.add_all(sops)
+    await db.flush()
+
+    # Create steps for every SOP in one batched insert
+    step_rows = [
+        {
+            "sop_id": sop.id,
+            "step_number": idx,
+            "title": step_data.title,
+            "description": step_data.description,
+            "source_artifact_id": step_data.source_artifact_id,
+        }
+        for sop, sop_data in zip(sops, sops_data)
+        for idx, step_data in enumerate(sop_data.steps, 1)
+    ]
+    if step_rows:
+        await db.execute(insert(SOPStep), step_rows)
+
+    await search_index.index_documents(db, [
+        search_index.sop_document(sop, sop_data.steps) for sop, sop_data in zip(sops, sops_data)
+    ])
+    await db.commit()
+    for sop in sops:
+        change_feed.publish(current_user.organization_id, "sop", sop.id, "created", sop.version)
+    return sops
+
+
 @router.post("/", response_model=SOPResponse)
 async def create_sop(
     sop_data: SOPCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
 ):
-    sop = SOP(
-        title=sop_data.title,
-        description=sop_data.description,
-        organization_id=current_user.organization_id,
-        project_id=sop_data.project_id,
-        creator_id=current_user.id,
-    )
-    db.add(sop)
-    db.flush()
-
-    # Create steps
-    for idx, step_data in enumerate(sop_data.steps, 1):
-        step = SOPStep(
-            sop_id=sop.id,
-            step_number=idx,
-            title=step_data.title,
-            description=step_data.description,
-            source_artifact_id=step_data.source_artifact_id,
-        )
-        db.add(step)
+    sops = await _create_sops(db, current_user, [sop_data])
+    return sops[0]
 
-    db.commit()
-    db.refresh(sop)
-    return sop
+
+@router.post("/bulk", response_model=List[SOPResponse])
+async def create_sops_bulk(
+    sops_data: List[SOPCreate],
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    if not sops_data:
+        return []
+    return await _create_sops(db, current_user, sops_data)
 
 
 @router.get("/", response_model=List[SOPResponse])
 async def list_sops(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    project_id: Optional[int] = None,
+    creator_id: Optional[int] = None,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
 ):
-    sops = db.query(SOP).filter(
-        SOP.organization_id == current_user.organization_id
-    ).all()
-    return sops
+    criteria = [SOP.organization_id == current_user.organization_id]
+    if project_id is not None:
+        criteria.append(SOP.project_id == project_id)
+    if creator_id is not None:
+        criteria.append(SOP.creator_id == creator_id)
+
+    list_etag = await etag.list_etag(
+        request, db, SOP, criteria,
+        "sops", current_user.organization_id, cursor, limit, project_id, creator_id,
+    )
+    if list_etag and etag.matches(request, list_etag):
+        return etag.not_modified(list_etag)
+
+    query = select(*serialization.columns(SOP, SOPResponse)).where(*criteria)
+    rows, next_cursor = await paginate_rows(db, query, SOP, cursor, limit)
+
+    response = serialization.json_response(serialization.render(rows, SOPResponse))
+    etag.set_etag(response, list_etag or etag.body_etag(response.body))
+    set_next_cursor(response, next_cursor)
+    return response
 
 
 @router.get("/{sop_id}", response_model=SOPDetailResponse)
 async def get_sop(
     sop_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
 ):
-    sop = db.query(SOP).filter(
+    if etag.requested(request):
+        state = (await db.execute(select(SOP.version, SOP.updated_at).where(
+            SOP.id == sop_id,
+            SOP.organization_id == current_user.organization_id,
+        ))).one_or_none()
+        if state is not None:
+            detail_etag = etag.make_etag("sop", sop_id, *state)
+            if etag.matches(request, detail_etag):
+                return etag.not_modified(detail_etag)
+
+    sop = await db.scalar(select(SOP).options(selectinload(SOP.steps)).where(
         SOP.id == sop_id,
         SOP.organization_id == current_user.organization_id,
-    ).first()
+    ))
 
     if not sop:
         raise HTTPException(
@@ -69,19 +136,20 @@ async def get_sop(
             detail="SOP not found",
         )
 
+    etag.set_etag(response, etag.make_etag("sop", sop.id, sop.version, sop.updated_at))
     return sop
 
 
 @router.delete("/{sop_id}")
 async def delete_sop(
     sop_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
 ):
-    sop = db.query(SOP).filter(
+    sop = await db.scalar(select(SOP).where(
         SOP.id == sop_id,
         SOP.organization_id == current_user.organization_id,
-    ).first()
+    ))
 
     if not sop:
         raise HTTPException(
@@ -89,6 +157,8 @@ async def delete_sop(
             detail="SOP not found",
         )
 
-    db.delete(sop)
-    db.commit()
+    await db.delete(sop)
+    await search_index.remove_document(db, "sop", sop_id)
+    await db.commit()
+    change_feed.publish(current_user.organization_id, "sop", sop_id, "deleted")
     return {"status": "deleted"}
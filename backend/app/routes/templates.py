@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
 from app.database import get_db
-from app.middleware.auth import get_current_user
-from app.models import User, Template, Artifact, TemplateImport
+from app.middleware.auth import get_current_principal
+from app.models import Template, Artifact, TemplateImport
 from app.schemas import (
     TemplateCreate,
     PromoteArtifactToTemplate,
@@ -10,7 +12,14 @@ from app.schemas import (
     ImportTemplateRequest,
     ArtifactResponse,
 )
-from typing import List
+from app.services import blobs, etag, sanitization, serialization, versioning
+from app.services import search as search_index
+from app.services.change_feed import change_feed
+from app.services.gallery_cache import popular_templates, promoted_templates, serialize_entries, serialize_template
+from app.services.import_counts import import_counter
+from app.services.principal_cache import Principal
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, TOTAL_COUNT_HEADER, paginate_rows, set_next_cursor
+from typing import List, Literal, Optional
 
 router = APIRouter(prefix="/api/templates", tags=["templates"])
 
@@ -18,14 +27,14 @@ router = APIRouter(prefix="/api/templates", tags=["templates"])
 @router.post("/promote", response_model=TemplateResponse)
 async def promote_artifact_to_template(
     promotion_data: PromoteArtifactToTemplate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
 ):
     # Get the artifact
-    artifact = db.query(Artifact).filter(
+    artifact = await db.scalar(select(Artifact).where(
         Artifact.id == promotion_data.artifact_id,
         Artifact.organization_id == current_user.organization_id,
-    ).first()
+    ))
 
     if not artifact:
         raise HTTPException(
@@ -33,60 +42,141 @@ async def promote_artifact_to_template(
             detail="Artifact not found",
         )
 
-    # Create template from artifact
+    # Record what the scanner finds next to the client's own checklist
+    await blobs.load(db, artifact)
+    spec = await sanitization.organization_spec(db, current_user.organization_id)
+    try:
+        report = await sanitization.scanner.scan(spec, artifact.content)
+    except sanitization.ScanTimedOut:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=sanitization.TIMED_OUT)
+
+    # Create template from artifact, sharing its content blob
+    await blobs.acquire(db, [artifact.content_blob_id])
     template = Template(
         name=artifact.title,
         description=artifact.description,
+        content_blob_id=artifact.content_blob_id,
         content=artifact.content,
         category="Promoted",
         organization_id=current_user.organization_id,
         source_artifact_id=artifact.id,
-        sanitization_checklist=promotion_data.sanitization_checklist,
+        sanitization_checklist={"items": promotion_data.sanitization_checklist, "scan": report},
         is_promoted=True,
     )
     db.add(template)
     artifact.is_promoted_to_template = True
-    db.commit()
-    db.refresh(template)
+    await db.flush()
+    await search_index.index_template(db, template)
+    await db.commit()
+    promoted_templates.invalidate()
+    change_feed.publish(current_user.organization_id, "template", template.id, "created")
+    change_feed.publish(current_user.organization_id, "artifact", artifact.id, "updated", artifact.version)
+    await db.refresh(template)
     return template
 
 
 @router.get("/", response_model=List[TemplateResponse])
 async def list_templates(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
 ):
-    templates = db.query(Template).filter(
-        Template.organization_id == current_user.organization_id
-    ).all()
-    return templates
+    criteria = [Template.organization_id == current_user.organization_id]
+    list_etag = await etag.list_etag(
+        request, db, Template, criteria,
+        "templates", current_user.organization_id, cursor, limit,
+    )
+    if list_etag and etag.matches(request, list_etag):
+        return etag.not_modified(list_etag)
+
+    # TemplateResponse has no updated_at, but the keyset needs it
+    query = select(*serialization.columns(Template, TemplateResponse, Template.updated_at)).where(*criteria)
+    rows, next_cursor = await paginate_rows(db, query, Template, cursor, limit)
+    rows = await serialization.load_content(db, rows, TemplateResponse)
+
+    response = serialization.json_response(serialization.render(rows, TemplateResponse))
+    etag.set_etag(response, list_etag or etag.body_etag(response.body))
+    set_next_cursor(response, next_cursor)
+    return response
 
 
 @router.get("/gallery", response_model=List[TemplateResponse])
 async def get_template_gallery(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    request: Request,
+    category: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    sort: Literal["recent", "popular"] = "recent",
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
 ):
-    # Get templates from current org and promoted templates from other orgs
-    own_templates = db.query(Template).filter(
-        Template.organization_id == current_user.organization_id
-    ).all()
+    promoted = Template.is_promoted == True
+    if sort == "popular":
+        # Promoted templates from every org, most imported first
+        promoted_mark = await etag.watermark(db, Template, promoted)
+        ranking_tag, ranking = await popular_templates.ranking(db, promoted_mark, category)
+        gallery_etag = etag.make_etag("gallery-popular", category, limit, offset, ranking_tag)
+        if etag.matches(request, gallery_etag):
+            return etag.not_modified(gallery_etag)
+        return _gallery_response(
+            await serialize_entries(db, ranking[offset:offset + limit]), len(ranking), gallery_etag,
+        )
 
-    promoted_templates = db.query(Template).filter(
-        Template.is_promoted == True,
-        Template.organization_id != current_user.organization_id,
-    ).all()
+    # Templates from current org first, then promoted templates from other orgs
+    own = Template.organization_id == current_user.organization_id
+    if category is not None:
+        own = own & (Template.category == category)
 
-    return own_templates + promoted_templates
+    # Also what tells the promoted cache whether it is current, so both marks are always needed
+    own_mark, promoted_mark = await etag.watermarks(db, Template, own, promoted)
+    own_count = own_mark[0]
+
+    gallery_etag = etag.make_etag(
+        "gallery", current_user.organization_id, category, limit, offset, *own_mark, *promoted_mark,
+    )
+    if etag.matches(request, gallery_etag):
+        return etag.not_modified(gallery_etag)
+
+    promoted_entries = [
+        entry
+        for entry in await promoted_templates.entries(db, promoted_mark)
+        if entry[0] != current_user.organization_id
+        and (category is None or entry[1] == category)
+    ]
+
+    bodies = []
+    if offset < own_count:
+        own_templates = (await db.scalars(
+            select(Template).where(own)
+            .order_by(Template.updated_at.desc(), Template.id.desc())
+            .offset(offset).limit(limit)
+        )).all()
+        await blobs.load(db, *own_templates)
+        bodies = [serialize_template(template) for template in own_templates]
+    promoted_start = max(offset - own_count, 0)
+    bodies += await serialize_entries(db, promoted_entries[promoted_start:promoted_start + limit - len(bodies)])
+    return _gallery_response(bodies, own_count + len(promoted_entries), gallery_etag)
+
+
+def _gallery_response(bodies: List[bytes], total: int, gallery_etag: str) -> Response:
+    response = Response(
+        content=b"[" + b",".join(bodies) + b"]",
+        media_type="application/json",
+        headers={TOTAL_COUNT_HEADER: str(total)},
+    )
+    etag.set_etag(response, gallery_etag)
+    return response
 
 
 @router.post("/import", response_model=ArtifactResponse)
 async def import_template(
     import_data: ImportTemplateRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
 ):
-    template = db.query(Template).filter(Template.id == import_data.template_id).first()
+    template = await db.scalar(select(Template).where(Template.id == import_data.template_id))
 
     if not template:
         raise HTTPException(
@@ -94,16 +184,24 @@ async def import_template(
             detail="Template not found",
         )
 
-    # Create artifact from template
+    # Create artifact from template; it and its first version share the template's blob
+    await blobs.load(db, template)
+    await blobs.acquire(db, [template.content_blob_id, template.content_blob_id])
     artifact = Artifact(
         title=import_data.artifact_title or template.name,
         description=template.description,
+        content_blob_id=template.content_blob_id,
         content=template.content,
         organization_id=current_user.organization_id,
         creator_id=current_user.id,
     )
     db.add(artifact)
-    db.flush()
+    await db.flush()
+
+    version = versioning.build_version(artifact.id, 1, template.content, None, "Imported from template")
+    version.content_blob_id = template.content_blob_id
+    db.add(version)
+    versioning.cache_on_commit(db, version, template.content)
 
     # Record the import
     template_import = TemplateImport(
@@ -112,16 +210,19 @@ async def import_template(
         imported_as_artifact_id=artifact.id,
     )
     db.add(template_import)
-    db.commit()
-    db.refresh(artifact)
-    return artifact
+    await search_index.index_artifact(db, artifact)
+    await db.commit()
+    import_counter.record(template.id)
+    change_feed.publish(current_user.organization_id, "artifact", artifact.id, "created", artifact.version)
+    await db.refresh(artifact)
+    return blobs.omit_large(artifact, settings.CONTENT_INLINE_MAX_BYTES)
 
 
 @router.post("/", response_model=TemplateResponse)
 async def create_template(
     template_data: TemplateCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
 ):
     template = Template(
         name=template_data.name,
@@ -130,7 +231,12 @@ async def create_template(
         category=template_data.category,
         organization_id=current_user.organization_id,
     )
+    await blobs.store(db, template)
     db.add(template)
-    db.commit()
-    db.refresh(template)
+    await db.flush()
+    await search_index.index_template(db, template)
+    await db.commit()
+    promoted_templates.invalidate()
+    change_feed.publish(current_user.organization_id, "template", template.id, "created")
+    await db.refresh(template)
     return template
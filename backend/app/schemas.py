@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Literal, Optional, List
 
 
 # Authentication
@@ -76,22 +76,25 @@ class ArtifactUpdate(BaseModel):
     change_summary: Optional[str] = None
 
 
-class ArtifactVersionResponse(BaseModel):
+class ArtifactVersionSummaryResponse(BaseModel):
     id: int
     version_number: int
-    content: str
     change_summary: Optional[str]
+    content_size: Optional[int]
     created_at: datetime
 
     class Config:
         from_attributes = True
 
 
-class ArtifactResponse(BaseModel):
+class ArtifactVersionResponse(ArtifactVersionSummaryResponse):
+    content: str
+
+
+class ArtifactSummaryResponse(BaseModel):
     id: int
     title: str
     description: Optional[str]
-    content: str
     organization_id: int
     project_id: Optional[int]
     version: int
@@ -104,8 +107,12 @@ class ArtifactResponse(BaseModel):
         from_attributes = True
 
 
+class ArtifactResponse(ArtifactSummaryResponse):
+    content: Optional[str]  # None above CONTENT_INLINE_MAX_BYTES; read /content instead
+
+
 class ArtifactDetailResponse(ArtifactResponse):
-    versions: List[ArtifactVersionResponse] = []
+    versions: List[ArtifactVersionSummaryResponse] = []
 
 
 # Template
@@ -129,6 +136,7 @@ class TemplateResponse(BaseModel):
     category: Optional[str]
     organization_id: int
     source_artifact_id: Optional[int]
+    sanitization_checklist: Optional[dict] = None
     is_promoted: bool
     created_at: datetime
 
@@ -141,6 +149,44 @@ class ImportTemplateRequest(BaseModel):
     artifact_title: Optional[str] = None
 
 
+# Sanitization
+class SanitizationPatternCreate(BaseModel):
+    category: Literal["customer", "custom"]  # A customer name, or a regular expression
+    name: str = Field(..., min_length=1, max_length=100)
+    pattern: str
+
+
+class SanitizationPatternResponse(BaseModel):
+    id: int
+    category: str
+    name: str
+    pattern: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class SanitizationScanRequest(BaseModel):
+    artifact_id: int
+
+
+class SanitizationFinding(BaseModel):
+    category: str
+    pattern: str
+    start: int  # Character offsets into the content
+    end: int
+    preview: str  # Redacted match
+
+
+class SanitizationReport(BaseModel):
+    scanned_at: datetime
+    bytes: int
+    counts: Dict[str, int]  # Matches per category, including those past the findings limit
+    findings: List[SanitizationFinding]
+    truncated: bool
+
+
 # SOP
 class SOPStepCreate(BaseModel):
     title: str
@@ -184,3 +230,12 @@ class SOPResponse(BaseModel):
 
 class SOPDetailResponse(SOPResponse):
     steps: List[SOPStepResponse]
+
+
+# Search
+class SearchResult(BaseModel):
+    type: Literal["artifact", "template", "sop"]
+    id: int
+    title: str
+    snippet: Optional[str]
+    rank: float
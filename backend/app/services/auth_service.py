@@ -1,13 +1,20 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models import User, Organization
 from app.schemas import UserRegister
 from app.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool already has its maximum pending work."""
 
 
 def hash_password(password: str) -> str:
@@ -18,8 +25,86 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password and return a new hash if the stored one uses outdated settings."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a dedicated pool with bounded admission.
+
+    Work beyond ``max_pending`` is rejected immediately instead of queueing,
+    so a login storm degrades into fast 503s rather than stalled requests.
+    """
+
+    def __init__(self, workers: int, max_pending: int, use_processes: bool):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.use_processes = use_processes
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Optional[Executor] = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def run(self, fn: Callable, *args):
+        # Only touched from the event loop thread, so a plain counter is safe
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self.run(hash_password, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        return await self.run(verify_and_update_password, password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    settings.PASSWORD_HASH_WORKERS,
+    settings.PASSWORD_HASH_MAX_PENDING,
+    settings.PASSWORD_HASH_USE_PROCESSES,
+)
+
+
+def _with_organization(data: dict, organization_id: Optional[int]) -> dict:
     to_encode = data.copy()
+    if settings.TOKEN_EMBED_ORGANIZATION and organization_id is not None:
+        to_encode["org"] = organization_id
+    return to_encode
+
+
+def create_access_token(
+    data: dict,
+    expires_delta: Optional[timedelta] = None,
+    organization_id: Optional[int] = None,
+) -> str:
+    to_encode = _with_organization(data, organization_id)
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -29,8 +114,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def create_refresh_token(data: dict) -> str:
-    to_encode = data.copy()
+def create_refresh_token(data: dict, organization_id: Optional[int] = None) -> str:
+    to_encode = _with_organization(data, organization_id)
     expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire, "type": "refresh"})
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
@@ -45,39 +130,47 @@ def verify_token(token: str) -> dict:
         return None
 
 
-def register_user(db: Session, user_data: UserRegister) -> User:
+async def register_user(db: AsyncSession, user_data: UserRegister) -> User:
     # Check if email exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await db.scalar(select(User).where(User.email == user_data.email))
     if existing_user:
         raise ValueError("Email already registered")
 
     # Create organization
     org_slug = user_data.organization_name.lower().replace(" ", "-")
-    existing_org = db.query(Organization).filter(Organization.slug == org_slug).first()
+    existing_org = await db.scalar(select(Organization).where(Organization.slug == org_slug))
     if existing_org:
         raise ValueError("Organization slug already exists")
 
+    # Hash before taking any write locks
+    password_hash = await password_hasher.hash(user_data.password)
+
     organization = Organization(name=user_data.organization_name, slug=org_slug)
     db.add(organization)
-    db.flush()
+    await db.flush()
 
     # Create user
     user = User(
         email=user_data.email,
-        password_hash=hash_password(user_data.password),
+        password_hash=password_hash,
         full_name=user_data.full_name,
         organization_id=organization.id,
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
-    user = db.query(User).filter(User.email == email).first()
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
+    user = await db.scalar(select(User).where(User.email == email))
     if not user:
         return None
-    if not verify_password(password, user.password_hash):
+    verified, new_hash = await password_hasher.verify_and_update(password, user.password_hash)
+    if not verified:
         return None
+    if new_hash:
+        # Cost factor changed since this hash was created
+        user.password_hash = new_hash
+        await db.commit()
     return user
@@ -0,0 +1,331 @@
+"""Content-addressed storage for artifact, version and template text.
+
+Each distinct text is stored once in ``blobs``, keyed by its SHA-256, with a
+count of the rows pointing at it through ``content_blob_id``. Writers take
+references with ``put_many`` / ``store`` (new text) or ``acquire`` (an
+existing blob, e.g. when a template is imported), and delete paths hand them
+back with ``release``, which removes blobs nobody references any more.
+
+The models expose the text as a plain ``content`` attribute. ``load`` fills
+it from ``blob_cache``, a bounded cache of hot blobs, and reads only the
+misses from the database, in one query.
+
+Texts of ``BLOB_FILE_THRESHOLD_BYTES`` or more are written to a file under
+``BLOB_FILE_DIR`` named by blob id, and the row keeps an empty ``content``.
+Ids are never reused, so the file is written before its row commits and
+removed only once the row's delete has committed; a rollback removes the
+files its transaction wrote.
+
+Texts of ``BLOB_COMPRESS_THRESHOLD_BYTES`` or more are gzip-compressed
+(``app.services.compression``), into ``compressed`` or the file, with
+``encoding`` set. ``size`` is always the size of the UTF-8 text, and the
+cache holds decompressed text.
+"""
+import hashlib
+import os
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.models import Blob
+from app.services import compression
+from app.services.lru import LRUCache
+
+BATCH_SIZE = 500
+THREADPOOL_BYTES = 256 * 1024  # Larger writes hash and compress in the threadpool
+
+blob_cache = LRUCache(settings.BLOB_CACHE_SIZE)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _cache(blob_id: int, text: str) -> None:
+    if len(text) <= settings.BLOB_CACHE_MAX_CHARS:
+        blob_cache.set(blob_id, text)
+
+
+def path(blob_id: int) -> Path:
+    return Path(settings.BLOB_FILE_DIR) / f"{blob_id % 256:02x}" / str(blob_id)
+
+
+def _write_files(files: List[Tuple[int, bytes]]) -> List[int]:
+    """Write the files that do not exist yet. Returns the ids written."""
+    written = []
+    for blob_id, data in files:
+        target = path(blob_id)
+        if target.exists():
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Readers never see a partial file
+        with tempfile.NamedTemporaryFile(dir=target.parent, delete=False) as temporary:
+            temporary.write(data)
+        os.replace(temporary.name, target)
+        written.append(blob_id)
+    return written
+
+
+def read_file(blob_id: int, encoding: Optional[str] = None) -> str:
+    data = path(blob_id).read_bytes()
+    return (data if encoding is None else compression.decompress(encoding, data)).decode()
+
+
+def decode(content: str, encoding: Optional[str], compressed: Optional[bytes]) -> str:
+    """The text of an inline blob row."""
+    return content if encoding is None else compression.decompress(encoding, compressed).decode()
+
+
+def row_text(row) -> str:
+    """The text of a row with ``id``, ``content``, ``in_file``, ``encoding`` and ``compressed``."""
+    if row.in_file:
+        return read_file(row.id, row.encoding)
+    return decode(row.content, row.encoding, row.compressed)
+
+
+def remove_files(blob_ids: Iterable[int]) -> None:
+    for blob_id in blob_ids:
+        try:
+            path(blob_id).unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _pending(db: AsyncSession) -> dict:
+    return db.sync_session.info.setdefault("blob_files", {"written": [], "released": []})
+
+
+@event.listens_for(Session, "after_commit")
+def _remove_released(session: Session) -> None:
+    pending = session.info.pop("blob_files", None)
+    if pending:
+        remove_files(pending["released"])
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _remove_written(session: Session, transaction) -> None:
+    # Not after_rollback: a session closed mid-transaction (a request that
+    # raised) rolls back without it. Committed work was popped above already.
+    if transaction.parent is not None:
+        return
+    pending = session.info.pop("blob_files", None)
+    if pending:
+        remove_files(pending["written"])
+
+
+def _upsert(dialect: str, rows: List[dict]):
+    insert = pg_insert if dialect == "postgresql" else sqlite_insert
+    statement = insert(Blob).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=["hash"],
+        set_={"ref_count": Blob.ref_count + statement.excluded.ref_count},
+    ).returning(Blob.id, Blob.hash, Blob.in_file)
+
+
+def _plan(texts: List[str], refs: int):
+    """Hashes of ``texts`` in order, upsert batches of distinct texts and file payloads by hash."""
+    digests = [content_hash(text) for text in texts]
+    counts = Counter(digests)
+    threshold = settings.BLOB_FILE_THRESHOLD_BYTES
+    rows, payloads = [], {}
+    for digest, text in dict(zip(digests, texts)).items():
+        data = text.encode()
+        encoding, stored = compression.for_storage(data)
+        in_file = 0 < threshold <= len(data)
+        if in_file:
+            payloads[digest] = stored
+        rows.append({
+            "hash": digest,
+            "content": "" if in_file or encoding else text,
+            "size": len(data),
+            "in_file": in_file,
+            "encoding": encoding,
+            "compressed": stored if encoding and not in_file else None,
+            "ref_count": counts[digest] * refs,
+        })
+    batches = [rows[start:start + BATCH_SIZE] for start in range(0, len(rows), BATCH_SIZE)]
+    return digests, batches, payloads
+
+
+def _collect(rows, by_hash: Dict[str, int], payloads: Dict[str, bytes], files: list) -> None:
+    for row in rows:
+        by_hash[row.hash] = row.id
+        # An existing row keeps its own storage; only new file blobs need writing
+        if row.in_file and row.hash in payloads:
+            files.append((row.id, payloads[row.hash]))
+
+
+async def put_many(db: AsyncSession, texts: List[str], refs: int = 1) -> List[int]:
+    """Store ``texts`` and take ``refs`` references on each. Returns blob ids in order."""
+    if not texts:
+        return []
+    dialect = db.get_bind().dialect.name
+    if sum(len(text) for text in texts) >= THREADPOOL_BYTES:
+        digests, batches, payloads = await run_in_threadpool(_plan, texts, refs)
+    else:
+        digests, batches, payloads = _plan(texts, refs)
+    by_hash: Dict[str, int] = {}
+    files: List[Tuple[int, bytes]] = []
+    for batch in batches:
+        # Not cached yet: if this transaction rolls back, SQLite may hand the id out again
+        _collect((await db.execute(_upsert(dialect, batch))).all(), by_hash, payloads, files)
+    if files:
+        _pending(db)["written"].extend(await run_in_threadpool(_write_files, files))
+    return [by_hash[digest] for digest in digests]
+
+
+def put_many_sync(connection: Connection, texts: List[str], refs: int = 1) -> List[int]:
+    """``put_many`` on a plain connection, for migrations and scripts."""
+    if not texts:
+        return []
+    digests, batches, payloads = _plan(texts, refs)
+    by_hash: Dict[str, int] = {}
+    files: List[Tuple[int, bytes]] = []
+    for batch in batches:
+        _collect(connection.execute(_upsert(connection.dialect.name, batch)).all(), by_hash, payloads, files)
+    _write_files(files)
+    return [by_hash[digest] for digest in digests]
+
+
+async def put(db: AsyncSession, text: str) -> int:
+    return (await put_many(db, [text]))[0]
+
+
+async def store(db: AsyncSession, *objects) -> None:
+    """Store each object's ``content`` and point its ``content_blob_id`` at the blob."""
+    for obj, blob_id in zip(objects, await put_many(db, [obj.content for obj in objects])):
+        obj.content_blob_id = blob_id
+
+
+def _adjustments(blob_ids: Iterable[Optional[int]], sign: int):
+    """Distinct ids and one ``UPDATE`` per reference delta."""
+    counts = Counter(blob_id for blob_id in blob_ids if blob_id is not None)
+    by_delta: Dict[int, List[int]] = {}
+    for blob_id, count in counts.items():
+        by_delta.setdefault(count, []).append(blob_id)
+    statements = [
+        update(Blob).where(Blob.id.in_(ids)).values(ref_count=Blob.ref_count + sign * count)
+        for count, ids in by_delta.items()
+    ]
+    return list(counts), statements
+
+
+def _unreferenced(ids: List[int]):
+    return delete(Blob).where(Blob.id.in_(ids), Blob.ref_count <= 0).returning(Blob.id, Blob.in_file)
+
+
+async def acquire(db: AsyncSession, blob_ids: Iterable[Optional[int]]) -> None:
+    """Take one more reference per id (repeat an id to take several)."""
+    for statement in _adjustments(blob_ids, 1)[1]:
+        await db.execute(statement)
+
+
+async def release(db: AsyncSession, blob_ids: Iterable[Optional[int]]) -> None:
+    """Drop one reference per id and delete blobs left unreferenced.
+
+    Flush deletes of the referencing rows first so foreign keys allow it.
+    """
+    ids, statements = _adjustments(blob_ids, -1)
+    for statement in statements:
+        await db.execute(statement)
+    if ids:
+        for blob_id, in_file in await db.execute(_unreferenced(ids)):
+            blob_cache.pop(blob_id)
+            if in_file:
+                _pending(db)["released"].append(blob_id)
+
+
+def release_sync(connection: Connection, blob_ids: Iterable[Optional[int]]) -> List[int]:
+    """``release`` on a plain connection, for migrations and scripts.
+
+    Returns the ids of deleted file blobs; pass them to ``remove_files``
+    after committing.
+    """
+    ids, statements = _adjustments(blob_ids, -1)
+    for statement in statements:
+        connection.execute(statement)
+    released = []
+    if ids:
+        for blob_id, in_file in connection.execute(_unreferenced(ids)):
+            blob_cache.pop(blob_id)
+            if in_file:
+                released.append(blob_id)
+    return released
+
+
+def _read_files(files: List[Tuple[int, Optional[str]]]) -> Dict[int, str]:
+    return {blob_id: read_file(blob_id, encoding) for blob_id, encoding in files}
+
+
+async def get_many(
+    db: AsyncSession,
+    blob_ids: Iterable[Optional[int]],
+    cache: bool = True,
+    max_bytes: Optional[int] = None,
+) -> Dict[int, str]:
+    """Texts by blob id, from the cache where possible.
+
+    Pass ``cache=False`` for bulk reads (exports) so they do not evict hot
+    blobs. Blobs larger than ``max_bytes`` are left out, without being read.
+    """
+    found: Dict[int, str] = {}
+    missing = []
+    for blob_id in set(blob_ids):
+        if blob_id is None:
+            continue
+        text = blob_cache.get(blob_id) if cache else None
+        if text is None:
+            missing.append(blob_id)
+        elif max_bytes is None or len(text.encode()) <= max_bytes:
+            found[blob_id] = text
+    in_files = []
+    for start in range(0, len(missing), BATCH_SIZE):
+        statement = select(Blob.id, Blob.content, Blob.in_file, Blob.encoding, Blob.compressed).where(
+            Blob.id.in_(missing[start:start + BATCH_SIZE])
+        )
+        if max_bytes is not None:
+            statement = statement.where(Blob.size <= max_bytes)
+        for blob_id, content, in_file, encoding, compressed in await db.execute(statement):
+            if in_file:
+                in_files.append((blob_id, encoding))
+                continue
+            text = decode(content, encoding, compressed)
+            found[blob_id] = text
+            if cache:
+                _cache(blob_id, text)
+    if in_files:
+        texts = await run_in_threadpool(_read_files, in_files)
+        found.update(texts)
+        if cache:
+            for blob_id, text in texts.items():
+                _cache(blob_id, text)
+    return found
+
+
+async def get(db: AsyncSession, blob_id: int) -> Optional[str]:
+    return (await get_many(db, [blob_id])).get(blob_id)
+
+
+def omit_large(obj, max_bytes: int):
+    """Clear ``obj.content`` when it is larger than ``max_bytes``. Returns ``obj``."""
+    if obj.content is not None and len(obj.content.encode()) > max_bytes:
+        obj.content = None
+    return obj
+
+
+async def load(db: AsyncSession, *objects, max_bytes: Optional[int] = None) -> None:
+    """Fill ``content`` on objects with a ``content_blob_id``.
+
+    Objects whose blob is larger than ``max_bytes`` get ``None``.
+    """
+    texts = await get_many(db, [obj.content_blob_id for obj in objects], max_bytes=max_bytes)
+    for obj in objects:
+        obj.content = texts.get(obj.content_blob_id)
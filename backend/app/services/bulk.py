@@ -0,0 +1,222 @@
+"""NDJSON export and import of an organization's content.
+
+Export streams one JSON object per line with a ``type`` of ``artifact``,
+``artifact_version``, ``template``, ``sop`` or ``sop_step``. Rows are read
+through server-side cursors so memory stays flat whatever the tenant size,
+and version content is reconstructed from the delta chain on the fly. Text
+is joined in from the blob table rather than read through the blob cache, so
+an export does not evict hot content.
+
+Import accepts the same format and creates ``artifact`` records (plus their
+initial version) with multi-row inserts; other record types are skipped.
+The artifact and its version-1 snapshot share one blob.
+"""
+import json
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Dict, List
+from fastapi import HTTPException, status
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.models import Artifact, ArtifactVersion, Blob, SOP, SOPStep, Template
+from app.services import blobs
+from app.services import search as search_index
+from app.services.versioning import apply_delta
+
+EXPORT_BATCH_SIZE = 500
+IMPORT_BATCH_SIZE = 500
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _line(record_type: str, values: Dict) -> bytes:
+    return (json.dumps({"type": record_type, **values}, default=_default, ensure_ascii=False) + "\n").encode()
+
+
+async def _stream_rows(db: AsyncSession, statement):
+    result = await db.stream(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    async for partition in result.partitions():
+        for row in partition:
+            yield row
+
+
+def _columns(model, *exclude: str) -> list:
+    return [column for column in model.__table__.c if column.name not in exclude]
+
+
+def _with_content(model):
+    """Select ``model``'s columns with its blob's text in place of the blob id.
+
+    Read rows through ``_content_values``, which fills in text kept in files or compressed.
+    """
+    return select(*[
+        Blob.content.label("content") if column.name == "content_blob_id" else column
+        for column in model.__table__.c
+    ], Blob.id.label("_blob_id"), Blob.in_file.label("_in_file"), Blob.encoding.label("_encoding"),
+        Blob.compressed.label("_compressed")).join(Blob, Blob.id == model.content_blob_id)
+
+
+async def _content_values(row) -> dict:
+    values = row._asdict()
+    blob_id, in_file = values.pop("_blob_id"), values.pop("_in_file")
+    encoding, compressed = values.pop("_encoding"), values.pop("_compressed")
+    if in_file:
+        values["content"] = await run_in_threadpool(blobs.read_file, blob_id, encoding)
+    else:
+        values["content"] = blobs.decode(values["content"], encoding, compressed)
+    return values
+
+
+async def export_organization(db: AsyncSession, organization_id: int) -> AsyncIterator[bytes]:
+    """Yield the organization's content as NDJSON lines."""
+    async for row in _stream_rows(db, _with_content(Artifact).where(
+        Artifact.organization_id == organization_id
+    ).order_by(Artifact.id)):
+        yield _line("artifact", await _content_values(row))
+
+    # Explicit ON clause: artifacts also has a content_blob_id into blobs
+    versions = _with_content(ArtifactVersion).join(Artifact, Artifact.id == ArtifactVersion.artifact_id)
+    # A delta applies to the version before it in the same artifact's chain only
+    artifact_id, content = None, None
+    async for row in _stream_rows(db, versions.where(
+        Artifact.organization_id == organization_id
+    ).order_by(ArtifactVersion.artifact_id, ArtifactVersion.version_number)):
+        values = await _content_values(row)
+        if values["artifact_id"] != artifact_id:
+            artifact_id, content = values["artifact_id"], None
+        if values.pop("is_snapshot"):
+            content = values["content"]
+        elif content is None:
+            raise ValueError(
+                f"Version {values['version_number']} of artifact {artifact_id} has no base snapshot"
+            )
+        else:
+            content = apply_delta(content, values["content"])
+        values["content"] = content
+        yield _line("artifact_version", values)
+
+    async for row in _stream_rows(db, _with_content(Template).where(
+        Template.organization_id == organization_id
+    ).order_by(Template.id)):
+        yield _line("template", await _content_values(row))
+
+    async for row in _stream_rows(db, select(*_columns(SOP)).where(
+        SOP.organization_id == organization_id
+    ).order_by(SOP.id)):
+        yield _line("sop", row._asdict())
+
+    async for row in _stream_rows(db, select(*_columns(SOPStep)).join(SOP).where(
+        SOP.organization_id == organization_id
+    ).order_by(SOPStep.sop_id, SOPStep.step_number)):
+        yield _line("sop_step", row._asdict())
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    yield buffer
+
+
+def _invalid(line_number: int, reason: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Invalid record on line {line_number}: {reason}",
+    )
+
+
+async def _insert_artifacts(db: AsyncSession, rows: List[dict]) -> None:
+    # One reference for the artifact and one for its initial snapshot
+    texts = {}
+    contents = [row.pop("content") for row in rows]
+    for row, blob_id, content in zip(rows, await blobs.put_many(db, contents, refs=2), contents):
+        row["content_blob_id"] = blob_id
+        texts[blob_id] = content
+
+    # Returning the columns we need keeps this one statement; asking for
+    # rows in parameter order makes some backends fall back to one per row
+    inserted = (await db.execute(
+        insert(Artifact).returning(
+            Artifact.id, Artifact.organization_id, Artifact.title,
+            Artifact.description, Artifact.content_blob_id, Artifact.created_at,
+        ),
+        rows,
+    )).all()
+    versions, documents = [], []
+    for artifact in inserted:
+        content = texts[artifact.content_blob_id]
+        versions.append({
+            "artifact_id": artifact.id,
+            "version_number": 1,
+            "content_blob_id": artifact.content_blob_id,
+            "is_snapshot": True,
+            "content_size": len(content.encode()),
+            "change_summary": "Imported",
+            "created_at": artifact.created_at,
+        })
+        documents.append(search_index.document_values(
+            "artifact", artifact.id, artifact.organization_id,
+            artifact.title, search_index.join_text(artifact.description, content),
+        ))
+    await db.execute(insert(ArtifactVersion), versions)
+    await search_index.index_documents(db, documents)
+
+
+async def import_artifacts(
+    db: AsyncSession, organization_id: int, creator_id: int, lines: AsyncIterable[bytes]
+) -> Dict[str, int]:
+    """Create artifacts from NDJSON ``lines`` in one transaction.
+
+    Raises a 400 on the first malformed record, leaving nothing written.
+    """
+    counts = {"artifacts": 0, "skipped": 0}
+    batch: List[dict] = []
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            raise _invalid(line_number, "not valid JSON")
+        if not isinstance(record, dict):
+            raise _invalid(line_number, "expected an object")
+        if record.get("type") != "artifact":
+            counts["skipped"] += 1
+            continue
+
+        title, content = record.get("title"), record.get("content")
+        if not isinstance(title, str) or not isinstance(content, str):
+            raise _invalid(line_number, "artifact needs a title and content")
+        now = datetime.utcnow()
+        batch.append({
+            "title": title,
+            "description": record.get("description"),
+            "content": content,
+            "organization_id": organization_id,
+            "creator_id": creator_id,
+            "version": 1,
+            "is_promoted_to_template": False,
+            "created_at": now,
+            "updated_at": now,
+        })
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await _insert_artifacts(db, batch)
+            counts["artifacts"] += len(batch)
+            batch = []
+
+    if batch:
+        await _insert_artifacts(db, batch)
+        counts["artifacts"] += len(batch)
+    await db.commit()
+    return counts
@@ -0,0 +1,152 @@
+"""In-process change feed behind ``GET /api/changes``.
+
+Handlers publish ``(type, id, action, version)`` after they commit; every
+open stream of the same organization receives it as a server-sent event, so
+clients refetch a list only when something in it changed instead of on
+every mount.
+
+Each organization numbers its events and keeps the last
+``CHANGE_FEED_BACKLOG`` of them. Event ids are ``<epoch>:<seq>``, where the
+epoch identifies this worker process; a client reconnecting with
+``Last-Event-ID`` is replayed what it missed, or sent a ``reset`` event when
+the id is from another worker or older than the backlog, meaning "refetch
+everything". With several workers each has its own feed, so a client only
+sees changes made through the worker its stream is connected to; run the
+feed where that is acceptable or behind sticky sessions.
+
+Every stream has a queue of ``CHANGE_FEED_QUEUE_SIZE`` events. Publishing
+never waits: a stream whose queue is full is dropped, and its client
+reconnects and resumes from the backlog.
+"""
+import asyncio
+import json
+import secrets
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from app.config import settings
+
+
+@dataclass(frozen=True)
+class Change:
+    seq: int
+    type: str  # "artifact", "sop" or "template"
+    id: Optional[int]  # None when many rows changed at once, e.g. a bulk import
+    action: str  # "created", "updated", "deleted" or "imported"
+    version: Optional[int]
+
+
+class Subscription:
+    def __init__(self, organization_id: int, queue_size: int):
+        self.organization_id = organization_id
+        # None in the queue means the stream was dropped
+        self.queue: "asyncio.Queue[Optional[Change]]" = asyncio.Queue(queue_size)
+
+
+@dataclass
+class _Organization:
+    seq: int = 0
+    backlog: Deque[Change] = field(default_factory=deque)
+    subscribers: Set[Subscription] = field(default_factory=set)
+
+
+class ChangeFeed:
+    def __init__(self, backlog: int, queue_size: int, max_subscribers: int):
+        self.backlog = backlog
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.epoch = secrets.token_hex(4)
+        self.published = 0
+        self.dropped = 0
+        self._subscribers = 0
+        self._organizations: Dict[int, _Organization] = {}
+
+    def _organization(self, organization_id: int) -> _Organization:
+        organization = self._organizations.get(organization_id)
+        if organization is None:
+            organization = self._organizations[organization_id] = _Organization(backlog=deque(maxlen=self.backlog))
+        return organization
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.epoch}:{seq}"
+
+    def publish(
+        self, organization_id: int, type: str, id: Optional[int], action: str, version: Optional[int] = None,
+    ) -> None:
+        organization = self._organization(organization_id)
+        organization.seq += 1
+        change = Change(organization.seq, type, id, action, version)
+        organization.backlog.append(change)
+        self.published += 1
+        for subscription in list(organization.subscribers):
+            try:
+                subscription.queue.put_nowait(change)
+            except asyncio.QueueFull:
+                self._drop(organization, subscription)
+
+    def _drop(self, organization: _Organization, subscription: Subscription) -> None:
+        organization.subscribers.discard(subscription)
+        self._subscribers -= 1
+        self.dropped += 1
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+    def full(self) -> bool:
+        return self._subscribers >= self.max_subscribers
+
+    def subscribe(self, organization_id: int, last_event_id: Optional[str]) -> Tuple[Subscription, Optional[List[Change]], int]:
+        """Register a stream. Returns it, the changes to replay and the current sequence number.
+
+        The replay is ``None`` when ``last_event_id`` cannot be resumed from.
+        """
+        organization = self._organization(organization_id)
+        replay: Optional[List[Change]] = []
+        if last_event_id:
+            epoch, _, seq = last_event_id.partition(":")
+            after = int(seq) if seq.isdigit() else -1
+            oldest = organization.backlog[0].seq if organization.backlog else organization.seq + 1
+            if epoch != self.epoch or not oldest - 1 <= after <= organization.seq:
+                replay = None
+            else:
+                replay = [change for change in organization.backlog if change.seq > after]
+
+        subscription = Subscription(organization_id, self.queue_size)
+        organization.subscribers.add(subscription)
+        self._subscribers += 1
+        return subscription, replay, organization.seq
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        organization = self._organizations.get(subscription.organization_id)
+        if organization is not None and subscription in organization.subscribers:
+            organization.subscribers.discard(subscription)
+            self._subscribers -= 1
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self._subscribers,
+            "organizations": len(self._organizations),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+def encode(event_id: str, event: str, data: dict) -> bytes:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+def encode_change(feed: ChangeFeed, change: Change) -> bytes:
+    return encode(feed.event_id(change.seq), "change", {
+        "seq": change.seq,
+        "type": change.type,
+        "id": change.id,
+        "action": change.action,
+        "version": change.version,
+    })
+
+
+change_feed = ChangeFeed(
+    settings.CHANGE_FEED_BACKLOG,
+    settings.CHANGE_FEED_QUEUE_SIZE,
+    settings.CHANGE_FEED_MAX_SUBSCRIBERS,
+)
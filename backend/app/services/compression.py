@@ -0,0 +1,72 @@
+"""gzip for blobs at rest and for HTTP responses.
+
+Blobs of ``BLOB_COMPRESS_THRESHOLD_BYTES`` or more are stored as gzip
+members, tagged ``blobs.encoding = "gzip"``. gzip rather than a denser codec
+because the stored bytes are then a valid ``Content-Encoding: gzip`` body:
+``/content`` sends them as they are to clients that accept it, with no
+decompress and recompress step. Text that does not shrink by
+``MIN_SAVING`` is stored plain.
+"""
+import zlib
+from typing import Optional, Tuple
+from app.config import settings
+
+GZIP = "gzip"
+_GZIP_WBITS = 31  # zlib's window bits for a gzip header and trailer
+MIN_SAVING = 0.1  # Fraction of the size compression must save to be kept
+
+
+def compress(data: bytes, level: int) -> bytes:
+    return zlib.compress(data, level, wbits=_GZIP_WBITS)
+
+
+def decompress(encoding: str, data: bytes) -> bytes:
+    if encoding != GZIP:
+        raise ValueError(f"Unknown blob encoding {encoding!r}")
+    return zlib.decompress(data, wbits=_GZIP_WBITS)
+
+
+def decompressor(encoding: str):
+    """An incremental decoder for streaming a stored body."""
+    if encoding != GZIP:
+        raise ValueError(f"Unknown blob encoding {encoding!r}")
+    return zlib.decompressobj(wbits=_GZIP_WBITS)
+
+
+def compressor(level: int):
+    """An incremental gzip encoder for streaming a response."""
+    return zlib.compressobj(level, zlib.DEFLATED, _GZIP_WBITS)
+
+
+def for_storage(data: bytes) -> Tuple[Optional[str], bytes]:
+    """``(encoding, stored bytes)`` for a blob's UTF-8 text; ``encoding`` is ``None`` when kept plain."""
+    threshold = settings.BLOB_COMPRESS_THRESHOLD_BYTES
+    if threshold <= 0 or len(data) < threshold:
+        return None, data
+    compressed = compress(data, settings.BLOB_COMPRESS_LEVEL)
+    if len(compressed) > len(data) * (1 - MIN_SAVING):
+        return None, data
+    return GZIP, compressed
+
+
+def accepts(header: Optional[str], coding: str) -> bool:
+    """Whether an ``Accept-Encoding`` header allows ``coding``."""
+    if not header:
+        return False
+    wildcard = None
+    for item in header.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name == coding:
+            return quality > 0
+        if name == "*":
+            wildcard = quality > 0
+    return bool(wildcard)
@@ -0,0 +1,173 @@
+"""Raw artifact bodies with HTTP range support.
+
+``GET /api/artifacts/{id}/content`` serves the head text as UTF-8 bytes.
+File blobs are streamed from disk ``CHUNK_SIZE`` bytes at a time, so memory
+per request stays flat whatever the body size; inline blobs are sliced from
+the cached text. A single ``bytes=`` range is answered with a ``206``;
+multiple ranges get the whole body, which RFC 9110 allows.
+
+A compressed blob is sent as stored, with ``Content-Encoding``, to clients
+that accept its encoding and ask for no range; it has its own ETag, as a
+different representation. Other requests get the decoded text, file blobs
+decompressed as they stream.
+"""
+import os
+from typing import BinaryIO, Optional, Tuple
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services import blobs, compression, etag
+
+CHUNK_SIZE = 64 * 1024
+MEDIA_TYPE = "text/plain"  # Responses add "; charset=utf-8"
+
+
+def _unsatisfiable(size: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+        detail="Range not satisfiable",
+        headers={"Content-Range": f"bytes */{size}"},
+    )
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """The inclusive ``(start, end)`` of a single byte range, or ``None`` for the whole body.
+
+    Malformed and multi-range headers are ignored; a range starting past the
+    end raises a 416.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else max(start, size - 1)
+        else:
+            suffix = int(last)
+            if suffix == 0:
+                raise _unsatisfiable(size)
+            start, end = max(size - suffix, 0), size - 1
+    except ValueError:
+        return None
+    if start < 0 or end < start:
+        return None
+    if start >= size:
+        raise _unsatisfiable(size)
+    return start, min(end, size - 1)
+
+
+async def _file_chunks(file: BinaryIO, length: int):
+    try:
+        remaining = length
+        while remaining > 0:
+            chunk = await run_in_threadpool(file.read, min(CHUNK_SIZE, remaining))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def _read_decoded(file: BinaryIO, decoder) -> Optional[bytes]:
+    """The text decoded from the next stored chunk, or ``None`` at the end of the file."""
+    data = file.read(CHUNK_SIZE)
+    if not data:
+        return None
+    return decoder.decompress(data)
+
+
+async def _decoded_file_chunks(file: BinaryIO, encoding: str, start: int, length: int):
+    try:
+        decoder = compression.decompressor(encoding)
+        skip, remaining = start, length
+        while remaining > 0:
+            chunk = await run_in_threadpool(_read_decoded, file, decoder)
+            if chunk is None:
+                return
+            if skip:
+                if len(chunk) <= skip:
+                    skip -= len(chunk)
+                    continue
+                chunk, skip = chunk[skip:], 0
+            chunk = chunk[:remaining]
+            remaining -= len(chunk)
+            if chunk:
+                yield chunk
+    finally:
+        file.close()
+
+
+def _not_modified(content_etag: str) -> Response:
+    result = etag.not_modified(content_etag)
+    result.headers["Vary"] = "Accept-Encoding"
+    return result
+
+
+def _stored(blob, content_etag: str) -> Response:
+    """The compressed bytes as stored, for a client that accepts their encoding."""
+    headers = {"Accept-Ranges": "bytes", "Content-Encoding": blob.encoding, "Vary": "Accept-Encoding"}
+    if blob.in_file:
+        file = open(blobs.path(blob.id), "rb")
+        length = os.fstat(file.fileno()).st_size
+        headers["Content-Length"] = str(length)
+        result = StreamingResponse(_file_chunks(file, length), headers=headers, media_type=MEDIA_TYPE)
+    else:
+        result = Response(blob.compressed, headers=headers, media_type=MEDIA_TYPE)
+    etag.set_etag(result, content_etag)
+    return result
+
+
+async def response(db: AsyncSession, request: Request, blob) -> Response:
+    """Serve ``blob`` for ``request``.
+
+    ``blob`` is a row with ``id``, ``hash``, ``size``, ``in_file``,
+    ``encoding`` and ``compressed``.
+    """
+    if (
+        blob.encoding is not None
+        and "range" not in request.headers
+        and compression.accepts(request.headers.get("accept-encoding"), blob.encoding)
+    ):
+        stored_etag = etag.make_etag("blob", blob.hash, blob.encoding)
+        if etag.matches(request, stored_etag):
+            return _not_modified(stored_etag)
+        return _stored(blob, stored_etag)
+
+    content_etag = etag.make_etag("blob", blob.hash)
+    if etag.matches(request, content_etag):
+        return _not_modified(content_etag)
+
+    # A range applies only to the representation the client already holds part of
+    byte_range = None
+    if request.headers.get("if-range", content_etag) == content_etag:
+        byte_range = parse_range(request.headers.get("range"), blob.size)
+    start, end = byte_range or (0, blob.size - 1)
+    headers = {"Accept-Ranges": "bytes", "Vary": "Accept-Encoding"}
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{blob.size}"
+    status_code = status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK
+
+    if blob.in_file:
+        # Opened now so a concurrent delete cannot pull the file away mid-stream
+        file = open(blobs.path(blob.id), "rb")
+        length = end - start + 1
+        headers["Content-Length"] = str(length)
+        if blob.encoding is None:
+            file.seek(start)
+            chunks = _file_chunks(file, length)
+        else:
+            chunks = _decoded_file_chunks(file, blob.encoding, start, length)
+        result = StreamingResponse(chunks, status_code=status_code, headers=headers, media_type=MEDIA_TYPE)
+    else:
+        data = (await blobs.get(db, blob.id)).encode()
+        result = Response(data[start:end + 1], status_code=status_code, headers=headers, media_type=MEDIA_TYPE)
+    etag.set_etag(result, content_etag)
+    return result
@@ -0,0 +1,207 @@
+"""Server-side diffs between artifact versions.
+
+Texts are split into lines or words and compared with Myers' O(ND)
+algorithm in its linear-space form: each step finds the point where the
+forward and reverse searches meet ("bisects" the edit graph) and splits the
+problem there, so memory stays O(N + M) however far apart the versions are.
+Common prefixes and suffixes are trimmed first, which makes the usual small
+edit to a long document cheap. A region whose edit distance exceeds
+``DIFF_MAX_COST`` is reported as a plain delete and insert rather than
+searched to the end.
+
+The edit script is produced in order, a region at a time, so responses
+stream as NDJSON while the rest is still being computed. Finished diffs of
+up to ``DIFF_CACHE_MAX_BYTES`` are kept in an LRU keyed by artifact,
+versions and mode; ``update_artifact`` fills it for the new version and the
+one before in the background.
+"""
+import json
+import re
+from typing import Iterator, List, Optional, Tuple
+from app.config import settings
+from app.services.lru import LRUCache
+
+# (tag, a_start, a_end, b_start, b_end) over token indexes
+Op = Tuple[str, int, int, int, int]
+
+MODES = ("line", "word")
+CHUNK_SIZE = 64 * 1024
+RUN_TOKENS = 1000  # Most tokens per output line
+
+_WORD = re.compile(r"\s+|\w+|[^\w\s]")
+
+diff_cache = LRUCache(settings.DIFF_CACHE_SIZE)
+
+
+def tokenize(text: str, mode: str) -> List[str]:
+    if mode == "word":
+        return _WORD.findall(text)
+    return text.splitlines(keepends=True)
+
+
+def _bisect(a: list, b: list, alo: int, ahi: int, blo: int, bhi: int, max_cost: int) -> Optional[Tuple[int, int]]:
+    """Where the forward and reverse searches meet, or ``None`` past ``max_cost``.
+
+    Both ranges are non-empty and share no first or last token.
+    """
+    n, m = ahi - alo, bhi - blo
+    max_d = (n + m + 1) // 2
+    offset, length = max_d, 2 * max_d + 2
+    forward = [-1] * length
+    forward[offset + 1] = 0
+    reverse = forward[:]
+    delta = n - m
+    # With an odd delta the paths can only meet on a forward step
+    odd = delta % 2 != 0
+    k1start = k1end = k2start = k2end = 0
+    for d in range(min(max_d, max_cost)):
+        for k1 in range(-d + k1start, d + 1 - k1end, 2):
+            k1_offset = offset + k1
+            if k1 == -d or (k1 != d and forward[k1_offset - 1] < forward[k1_offset + 1]):
+                x1 = forward[k1_offset + 1]
+            else:
+                x1 = forward[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[alo + x1] == b[blo + y1]:
+                x1 += 1
+                y1 += 1
+            forward[k1_offset] = x1
+            if x1 > n:
+                k1end += 2  # Ran off the right of the graph
+            elif y1 > m:
+                k1start += 2  # Ran off the bottom
+            elif odd:
+                k2_offset = offset + delta - k1
+                if 0 <= k2_offset < length and reverse[k2_offset] != -1 and x1 >= n - reverse[k2_offset]:
+                    return alo + x1, blo + y1
+
+        for k2 in range(-d + k2start, d + 1 - k2end, 2):
+            k2_offset = offset + k2
+            if k2 == -d or (k2 != d and reverse[k2_offset - 1] < reverse[k2_offset + 1]):
+                x2 = reverse[k2_offset + 1]
+            else:
+                x2 = reverse[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[ahi - 1 - x2] == b[bhi - 1 - y2]:
+                x2 += 1
+                y2 += 1
+            reverse[k2_offset] = x2
+            if x2 > n:
+                k2end += 2
+            elif y2 > m:
+                k2start += 2
+            elif not odd:
+                k1_offset = offset + delta - k2
+                if 0 <= k1_offset < length and forward[k1_offset] != -1:
+                    x1 = forward[k1_offset]
+                    if x1 >= n - x2:
+                        return alo + x1, blo + x1 - (k1_offset - offset)
+    return None
+
+
+def edit_script(a: list, b: list, max_cost: int) -> Iterator[Op]:
+    """Yield the ops turning ``a`` into ``b`` in order, adjacent ops of one tag merged."""
+    pending: Optional[list] = None
+    # Entries are regions to solve, or ops to emit once everything before them is done
+    stack: list = [("solve", 0, len(a), 0, len(b))]
+    while stack:
+        tag, alo, ahi, blo, bhi = stack.pop()
+        if tag == "solve":
+            prefix = 0
+            while alo + prefix < ahi and blo + prefix < bhi and a[alo + prefix] == b[blo + prefix]:
+                prefix += 1
+            suffix = 0
+            while (
+                alo + prefix < ahi - suffix and blo + prefix < bhi - suffix
+                and a[ahi - 1 - suffix] == b[bhi - 1 - suffix]
+            ):
+                suffix += 1
+            if suffix:
+                stack.append(("equal", ahi - suffix, ahi, bhi - suffix, bhi))
+            inner = (alo + prefix, ahi - suffix, blo + prefix, bhi - suffix)
+            split = None
+            if inner[0] < inner[1] and inner[2] < inner[3]:
+                split = _bisect(a, b, *inner, max_cost)
+            if split is not None:
+                x, y = split
+                stack.append(("solve", x, inner[1], y, inner[3]))
+                stack.append(("solve", inner[0], x, inner[2], y))
+            else:
+                # Pure insert or delete, or too costly to search: replace the region
+                stack.append(("insert", inner[1], inner[1], inner[2], inner[3]))
+                stack.append(("delete", inner[0], inner[1], inner[2], inner[2]))
+            if prefix:
+                stack.append(("equal", alo, alo + prefix, blo, blo + prefix))
+            continue
+
+        if alo == ahi and blo == bhi:
+            continue
+        if pending is not None and pending[0] == tag and pending[2] == alo and pending[4] == blo:
+            pending[2], pending[4] = ahi, bhi
+            continue
+        if pending is not None:
+            yield tuple(pending)
+        pending = [tag, alo, ahi, blo, bhi]
+    if pending is not None:
+        yield tuple(pending)
+
+
+def _intern(tokens: List[str], ids: dict) -> List[int]:
+    return [ids.setdefault(token, len(ids)) for token in tokens]
+
+
+def iter_diff(old: str, new: str, mode: str) -> Iterator[bytes]:
+    """The diff from ``old`` to ``new`` as NDJSON lines ``{"op": ..., "text": ...}``, in chunks.
+
+    ``op`` is ``equal``, ``delete`` or ``insert``; consecutive lines may share an op.
+    """
+    old_tokens, new_tokens = tokenize(old, mode), tokenize(new, mode)
+    # Compare small ints instead of strings
+    ids: dict = {}
+    a, b = _intern(old_tokens, ids), _intern(new_tokens, ids)
+
+    chunk: List[str] = []
+    size = 0
+    for tag, alo, ahi, blo, bhi in edit_script(a, b, settings.DIFF_MAX_COST):
+        tokens, start, end = (new_tokens, blo, bhi) if tag == "insert" else (old_tokens, alo, ahi)
+        # Long runs become several lines of one op, so a large unchanged stretch still streams
+        for run_start in range(start, end, RUN_TOKENS):
+            text = "".join(tokens[run_start:min(run_start + RUN_TOKENS, end)])
+            line = json.dumps({"op": tag, "text": text}, ensure_ascii=False) + "\n"
+            chunk.append(line)
+            size += len(line)
+            if size >= CHUNK_SIZE:
+                yield "".join(chunk).encode()
+                chunk, size = [], 0
+    if chunk:
+        yield "".join(chunk).encode()
+
+
+def cached_diff(key: tuple, chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Pass ``chunks`` through, caching them under ``key`` once complete if small enough."""
+    kept: Optional[List[bytes]] = []
+    total = 0
+    for chunk in chunks:
+        if kept is not None:
+            total += len(chunk)
+            if total <= settings.DIFF_CACHE_MAX_BYTES:
+                kept.append(chunk)
+            else:
+                kept = None
+        yield chunk
+    if kept is not None:
+        diff_cache.set(key, kept)
+
+
+def precompute(artifact_id: int, from_version: int, to_version: int, old: str, new: str) -> None:
+    """Cache the line diff between two adjacent versions; run as a background task."""
+    if max(len(old.encode()), len(new.encode())) > settings.DIFF_CACHE_MAX_BYTES:
+        return  # The diff holds at least the longer text, so it would not be kept
+    key = (artifact_id, from_version, to_version, "line")
+    if diff_cache.get(key) is None:
+        for _ in cached_diff(key, iter_diff(old, new, "line")):
+            pass
+
+
+def forget_artifact(artifact_id: int) -> None:
+    diff_cache.pop_matching(lambda key: key[0] == artifact_id)
@@ -0,0 +1,77 @@
+"""Strong ETags for conditional GETs.
+
+Detail views derive the tag from the row's ``(id, version, updated_at)``;
+list views from a watermark of the rows they could contain (count, latest
+``updated_at``, highest id), so a client that already has the current
+response gets a 304 before any row content is read. The watermark query
+scans the matching rows, so lists only run it for requests carrying
+``If-None-Match`` and tag other responses with a hash of their body. A
+client revalidating such a tag gets the body once more, with the watermark
+tag, and 304s from then on.
+"""
+import hashlib
+from typing import Optional
+from fastapi import Request, Response, status
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def make_etag(*parts) -> str:
+    """Build a strong ETag from the values that determine a response body."""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def body_etag(body: bytes) -> str:
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+def requested(request: Request) -> bool:
+    return "if-none-match" in request.headers
+
+
+def matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {candidate.strip() for candidate in header.split(",")}
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    # Cache privately but revalidate every time
+    response.headers["Cache-Control"] = "private, no-cache"
+
+
+def not_modified(etag: str) -> Response:
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_etag(response, etag)
+    return response
+
+
+async def watermark(db: AsyncSession, model, *criteria) -> tuple:
+    """``(count, max(updated_at), max(id))`` over the rows matching ``criteria``."""
+    return tuple((await db.execute(
+        select(func.count(), func.max(model.updated_at), func.max(model.id)).where(*criteria)
+    )).one())
+
+
+async def watermarks(db: AsyncSession, model, *sets) -> list:
+    """``watermark`` of each condition in ``sets``, from one scan of the rows matching any of them."""
+    columns = []
+    for condition in sets:
+        columns += [
+            func.count().filter(condition),
+            func.max(model.updated_at).filter(condition),
+            func.max(model.id).filter(condition),
+        ]
+    row = (await db.execute(select(*columns).where(or_(*sets)))).one()
+    return [tuple(row[index:index + 3]) for index in range(0, len(columns), 3)]
+
+
+async def list_etag(request: Request, db: AsyncSession, model, criteria: list, *parts) -> Optional[str]:
+    """The watermark tag of a list view, or ``None`` when the request is not conditional."""
+    if not requested(request):
+        return None
+    return make_etag(*parts, *await watermark(db, model, *criteria))
@@ -0,0 +1,147 @@
+"""Shared cache of promoted templates for the gallery.
+
+The promoted half of the gallery is identical for every tenant, so its
+metadata is loaded once and kept without the content, which the blob cache
+already holds; only the page being served is filled in and serialized, see
+``serialize_entries``. Entries are tagged with a cheap
+watermark of the promoted set (count, latest update, highest id); a worker
+that did not see the write itself notices the new watermark on its next
+request and rebuilds.
+
+``sort=popular`` is served from a separate ranking of the top
+``POPULAR_TOP_N`` promoted templates by import count, per category and
+overall, rebuilt with one windowed query every ``POPULAR_REFRESH_SECONDS``
+or when the promoted set changes. It holds the same content-free entries.
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Template
+from app.schemas import TemplateResponse
+from app.config import settings
+from app.services import blobs, etag
+
+# (organization_id, category, content_blob_id, TemplateResponse with empty content)
+Entry = Tuple[int, Optional[str], int, TemplateResponse]
+
+
+def serialize_template(template: Template) -> bytes:
+    return TemplateResponse.model_validate(template).model_dump_json().encode()
+
+
+def _entry(template: Template) -> Entry:
+    fields = {name: getattr(template, name) for name in TemplateResponse.model_fields}
+    metadata = TemplateResponse.model_validate({**fields, "content": ""})
+    return template.organization_id, template.category, template.content_blob_id, metadata
+
+
+async def serialize_entries(db: AsyncSession, entries: List[Entry]) -> List[bytes]:
+    """JSON bodies of ``entries``, with their content read through the blob cache."""
+    texts = await blobs.get_many(db, [blob_id for _, _, blob_id, _ in entries])
+    return [
+        template.model_copy(update={"content": texts.get(blob_id, "")}).model_dump_json().encode()
+        for _, _, blob_id, template in entries
+    ]
+
+
+class PromotedTemplateCache:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._watermark = None
+        self._entries: List[Entry] = []
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        self._watermark = None
+        self._entries = []
+
+    async def entries(self, db: AsyncSession, watermark: tuple) -> List[Entry]:
+        if self._watermark == watermark:
+            self.hits += 1
+            return self._entries
+        async with self._lock:
+            # Another request may have rebuilt while we waited
+            if self._watermark == watermark:
+                self.hits += 1
+                return self._entries
+            self.misses += 1
+            templates = (await db.scalars(
+                select(Template)
+                .where(Template.is_promoted == True)
+                .order_by(Template.updated_at.desc(), Template.id.desc())
+            )).all()
+            self._entries = [_entry(template) for template in templates]
+            self._watermark = watermark
+            return self._entries
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class PopularTemplateCache:
+    def __init__(self, top_n: int, refresh_seconds: float):
+        self.top_n = top_n
+        self.refresh_seconds = refresh_seconds
+        self.hits = 0
+        self.misses = 0
+        self._watermark = None
+        self._built_at = 0.0
+        # category (None for all) -> (tag, entries, most imported first)
+        self._rankings: Dict[Optional[str], Tuple[str, List[Entry]]] = {}
+        self._lock = asyncio.Lock()
+
+    def _fresh(self, watermark: tuple) -> bool:
+        return self._watermark == watermark and time.monotonic() - self._built_at < self.refresh_seconds
+
+    async def _build(self, db: AsyncSession) -> None:
+        rank = func.row_number().over(
+            partition_by=Template.category,
+            order_by=(Template.import_count.desc(), Template.id.desc()),
+        ).label("rank")
+        ranked = select(Template.id, rank).where(Template.is_promoted == True).subquery()
+        templates = (await db.scalars(
+            select(Template)
+            .join(ranked, ranked.c.id == Template.id)
+            .where(ranked.c.rank <= self.top_n)
+            .order_by(Template.import_count.desc(), Template.id.desc())
+        )).all()
+        # The overall top N is always within the union of the per-category top Ns
+        by_category: Dict[Optional[str], list] = {None: templates[:self.top_n]}
+        for template in templates:
+            if template.category is not None:
+                by_category.setdefault(template.category, []).append(template)
+
+        self._rankings = {
+            category: (
+                etag.make_etag(*(f"{template.id}:{template.import_count}" for template in ranking)),
+                [_entry(template) for template in ranking],
+            )
+            for category, ranking in by_category.items()
+        }
+
+    async def ranking(self, db: AsyncSession, watermark: tuple, category: Optional[str]) -> Tuple[str, List[Entry]]:
+        """The tag and entries of the most imported promoted templates, in order."""
+        if not self._fresh(watermark):
+            async with self._lock:
+                if not self._fresh(watermark):
+                    self.misses += 1
+                    await self._build(db)
+                    self._watermark = watermark
+                    self._built_at = time.monotonic()
+                    return self._rankings.get(category, ("", []))
+        self.hits += 1
+        return self._rankings.get(category, ("", []))
+
+    def invalidate(self) -> None:
+        self._watermark = None
+        self._rankings = {}
+
+    def stats(self) -> dict:
+        return {"categories": len(self._rankings), "hits": self.hits, "misses": self.misses}
+
+
+promoted_templates = PromotedTemplateCache()
+popular_templates = PopularTemplateCache(settings.POPULAR_TOP_N, settings.POPULAR_REFRESH_SECONDS)
@@ -0,0 +1,52 @@
+import bisect
+import threading
+from typing import Sequence
+
+# Upper bounds in seconds, from 1 ms to 10 s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram safe to update from any thread.
+
+    ``counts[i]`` holds observations ``<= buckets[i]`` that did not fit a
+    smaller bucket; the final slot counts everything above the last bound.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self) -> tuple:
+        """``(cumulative, count, sum)`` read together.
+
+        ``cumulative`` holds ``(upper_bound, count)`` pairs with running
+        totals, ending at ``inf``, the shape Prometheus buckets use.
+        """
+        with self._lock:
+            counts, count, total = list(self.counts), self.count, self.sum
+        running, pairs = 0, []
+        for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+            running += bucket
+            pairs.append((bound, running))
+        return pairs, count, total
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts, count, total = list(self.counts), self.count, self.sum
+        labels = [f"le_{bound * 1000:g}ms" for bound in self.buckets] + ["inf"]
+        return {
+            "count": count,
+            "mean_ms": round(total / count * 1000, 3) if count else 0.0,
+            "buckets": dict(zip(labels, counts)),
+        }
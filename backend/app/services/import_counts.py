@@ -0,0 +1,116 @@
+"""Denormalized per-template import counters.
+
+``import_template`` records each import in ``template_imports`` and bumps an
+in-memory counter here instead of updating the template row, so a popular
+template does not turn every import into a write on one hot row. Every
+``IMPORT_COUNT_FLUSH_SECONDS`` the pending increments are added to
+``templates.import_count`` in a single ``UPDATE``. Increments are additive,
+so each worker flushes its own without coordination.
+
+Increments still pending when a worker dies are lost. ``template_imports``
+stays the source of truth: ``rebuild`` (``python -m
+scripts.rebuild_import_counts``) recomputes every counter from it.
+"""
+import asyncio
+import logging
+from collections import Counter
+from contextlib import suppress
+from typing import Dict, Optional
+from sqlalchemy import case, func, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import SQLAlchemyError
+from app import database
+from app.config import settings
+from app.models import Template, TemplateImport
+
+logger = logging.getLogger(__name__)
+
+
+def apply(connection: Connection, increments: Dict[int, int]) -> None:
+    """Add ``{template_id: n}`` to the counters in one statement."""
+    connection.execute(
+        update(Template)
+        .where(Template.id.in_(list(increments)))
+        .values(
+            import_count=Template.import_count + case(increments, value=Template.id, else_=0),
+            # A counter bump is not an edit; keep updated_at, which orders the gallery
+            updated_at=Template.updated_at,
+        )
+    )
+
+
+def rebuild(connection: Connection) -> None:
+    """Recompute every counter from ``template_imports``.
+
+    Increments a worker has not flushed yet are counted again when it does;
+    run this when counters are suspected to have drifted, not routinely.
+    """
+    imports = (
+        select(func.count(TemplateImport.id))
+        .where(TemplateImport.template_id == Template.id)
+        .scalar_subquery()
+    )
+    connection.execute(update(Template).values(import_count=imports, updated_at=Template.updated_at))
+
+
+class ImportCounter:
+    """Write-behind aggregator for template import counts."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.flushes = 0
+        self.flushed = 0
+        self.failures = 0
+        self._pending: Counter = Counter()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def record(self, template_id: int) -> None:
+        self._pending[template_id] += 1
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        increments, self._pending = dict(self._pending), Counter()
+        try:
+            await database.run_on_connection(lambda connection: apply(connection, increments))
+        except (SQLAlchemyError, OSError):
+            # Keep them for the next flush rather than lose them
+            self._pending.update(increments)
+            self.failures += 1
+            logger.exception("Flushing %d template import counters failed", len(increments))
+            return
+        self.flushes += 1
+        self.flushed += sum(increments.values())
+
+    async def _run(self) -> None:
+        # Woken early by stop(), never cancelled, so a flush is not cut off half way
+        while not self._stopping.is_set():
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop after a last flush."""
+        if self._task is None:
+            await self.flush()
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "pending": sum(self._pending.values()),
+            "flushes": self.flushes,
+            "flushed": self.flushed,
+            "failures": self.failures,
+        }
+
+
+import_counter = ImportCounter(settings.IMPORT_COUNT_FLUSH_SECONDS)
@@ -0,0 +1,148 @@
+"""Per-route request metrics rendered in the Prometheus text format.
+
+``MetricsMiddleware`` records one observation per request, keyed by method
+and route template (``/api/artifacts/{artifact_id}``, never the raw path, so
+series stay bounded). Recording runs on the event loop thread, so counters
+are plain increments; histograms take only their own uncontended lock. There
+is no registry-wide lock.
+
+Request time is split into time spent in SQL statements (from
+``query_stats``) and the rest of the handler. Per-request CPU time cannot be
+isolated while other requests share the event loop, so process-wide CPU
+seconds are exported alongside. Each worker process serves its own series.
+"""
+import time
+from typing import Dict, List, Tuple
+from app.services import pool_stats
+from app.services.histogram import Histogram
+from app.services.read_routing import read_router
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # Starlette appends the charset
+
+# Body sizes in bytes, from 100 B to 10 MB
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = Histogram()
+        self.request_bytes = Histogram(SIZE_BUCKETS)
+        self.response_bytes = Histogram(SIZE_BUCKETS)
+        self.statuses: Dict[int, int] = {}
+        self.db_seconds = 0.0
+        self.db_statements = 0
+        self.app_seconds = 0.0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self.started = time.time()
+
+    def record(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        seconds: float,
+        request_bytes: int,
+        response_bytes: int,
+        db_seconds: float,
+        db_statements: int,
+    ) -> None:
+        metrics = self.routes.get((method, route))
+        if metrics is None:
+            metrics = self.routes.setdefault((method, route), RouteMetrics())
+        metrics.latency.observe(seconds)
+        metrics.request_bytes.observe(request_bytes)
+        metrics.response_bytes.observe(response_bytes)
+        metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+        metrics.db_seconds += db_seconds
+        metrics.db_statements += db_statements
+        metrics.app_seconds += max(0.0, seconds - db_seconds)
+
+    def render(self) -> str:
+        routes = list(self.routes.items())
+        out: List[str] = []
+
+        _header(out, "http_requests_total", "counter", "Requests by route template and status.")
+        for (method, route), metrics in routes:
+            for status, count in sorted(metrics.statuses.items()):
+                out.append(_sample("http_requests_total", {"method": method, "route": route, "status": status}, count))
+
+        for name, attribute, help_text in (
+            ("http_request_duration_seconds", "latency", "Request latency by route template."),
+            ("http_request_size_bytes", "request_bytes", "Request body size by route template."),
+            ("http_response_size_bytes", "response_bytes", "Response body size by route template."),
+        ):
+            _header(out, name, "histogram", help_text)
+            for (method, route), metrics in routes:
+                _histogram(out, name, {"method": method, "route": route}, getattr(metrics, attribute))
+
+        for name, attribute, help_text in (
+            ("http_request_db_seconds_total", "db_seconds", "Time spent executing SQL statements."),
+            ("http_request_db_statements_total", "db_statements", "SQL statements executed."),
+            ("http_request_app_seconds_total", "app_seconds", "Request time outside SQL statements."),
+        ):
+            _header(out, name, "counter", help_text)
+            for (method, route), metrics in routes:
+                out.append(_sample(name, {"method": method, "route": route}, getattr(metrics, attribute)))
+
+        _header(out, "process_cpu_seconds_total", "counter", "User and system CPU time of this worker.")
+        out.append(_sample("process_cpu_seconds_total", {}, time.process_time()))
+        _header(out, "process_start_time_seconds", "gauge", "Worker start time since the epoch.")
+        out.append(_sample("process_start_time_seconds", {}, self.started))
+
+        pools = list(pool_stats.pools.values())
+        _header(out, "db_pool_checked_out", "gauge", "Connections currently checked out of the pool.")
+        for pool in pools:
+            out.append(_sample("db_pool_checked_out", {"engine": pool.name}, pool.checked_out))
+        _header(out, "db_pool_checkout_timeouts_total", "counter", "Checkouts that gave up waiting for a connection.")
+        for pool in pools:
+            out.append(_sample("db_pool_checkout_timeouts_total", {"engine": pool.name}, pool.timeouts))
+        _header(out, "db_pool_checkout_wait_seconds", "histogram", "Time to check a connection out of the pool.")
+        for pool in pools:
+            _histogram(out, "db_pool_checkout_wait_seconds", {"engine": pool.name}, pool.waits)
+
+        _header(out, "db_route_sessions_total", "counter", "Request sessions by engine and routing reason.")
+        for (target, reason), count in sorted(read_router.decisions.items()):
+            out.append(_sample("db_route_sessions_total", {"target": target, "reason": reason}, count))
+
+        out.append("")
+        return "\n".join(out)
+
+
+def _header(out: List[str], name: str, kind: str, help_text: str) -> None:
+    out.append(f"# HELP {name} {help_text}")
+    out.append(f"# TYPE {name} {kind}")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, object]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _sample(name: str, labels: Dict[str, object], value) -> str:
+    return f"{name}{_labels(labels)} {_number(value)}"
+
+
+def _histogram(out: List[str], name: str, labels: Dict[str, object], histogram: Histogram) -> None:
+    cumulative, count, total = histogram.snapshot()
+    for bound, running in cumulative:
+        out.append(_sample(f"{name}_bucket", {**labels, "le": _number(bound)}, running))
+    out.append(_sample(f"{name}_sum", labels, total))
+    out.append(_sample(f"{name}_count", labels, count))
+
+
+registry = MetricsRegistry()
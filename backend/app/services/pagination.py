@@ -0,0 +1,70 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import HTTPException, Response, status
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+def encode_cursor(updated_at: datetime, row_id: int) -> str:
+    raw = json.dumps([updated_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        updated_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(updated_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+def _keyset(statement: Select, model, cursor: Optional[str], limit: int) -> Select:
+    if cursor:
+        updated_at, row_id = decode_cursor(cursor)
+        statement = statement.where(tuple_(model.updated_at, model.id) < (updated_at, row_id))
+    return statement.order_by(model.updated_at.desc(), model.id.desc()).limit(limit + 1)
+
+
+def _page(rows: list, limit: int) -> Tuple[list, Optional[str]]:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.updated_at, last.id)
+    return rows, next_cursor
+
+
+async def paginate(
+    db: AsyncSession, statement: Select, model, cursor: Optional[str], limit: int
+) -> Tuple[list, Optional[str]]:
+    """Keyset-paginate ``statement`` newest first on ``(updated_at, id)``.
+
+    Returns the page and the cursor for the next one (``None`` on the last page).
+    One extra row is fetched to detect whether another page exists.
+    """
+    rows = (await db.scalars(_keyset(statement, model, cursor, limit))).all()
+    return _page(rows, limit)
+
+
+async def paginate_rows(
+    db: AsyncSession, statement: Select, model, cursor: Optional[str], limit: int
+) -> Tuple[list, Optional[str]]:
+    """Like ``paginate`` for a column select; it must include ``updated_at`` and ``id``."""
+    rows = (await db.execute(_keyset(statement, model, cursor, limit))).all()
+    return _page(rows, limit)
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,92 @@
+"""Connection pool telemetry.
+
+``app.database`` builds each engine with a pool class from
+:func:`instrumented`, which times every checkout (including the wait for a
+free connection) and counts checkouts that give up after ``pool_timeout``.
+Checked-out connections are tracked with pool events, so pools without
+their own counters (``NullPool``) still report them.
+"""
+import threading
+import time
+from typing import Dict, Type
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+from app.services.histogram import Histogram
+
+
+class PoolStats:
+    def __init__(self, name: str, pool_class: str):
+        self.name = name
+        self.pool_class = pool_class
+        self.waits = Histogram()
+        self.timeouts = 0
+        self.checked_out = 0
+        self.pool: Pool = None
+        self._lock = threading.Lock()
+
+    def _add(self, attribute: str, delta: int) -> None:
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + delta)
+
+    def stats(self) -> dict:
+        pool = self.pool
+        result = {
+            "pool": self.pool_class,
+            "checked_out": self.checked_out,
+            "timeouts": self.timeouts,
+            "checkout_wait": self.waits.stats(),
+        }
+        if pool is not None and hasattr(pool, "overflow"):
+            result["size"] = pool.size()
+            # QueuePool's overflow counter starts at -size
+            result["overflow"] = max(0, pool.overflow())
+            result["checked_in"] = pool.checkedin()
+        return result
+
+
+pools: Dict[str, PoolStats] = {}
+
+
+def instrumented(pool_class: Type[Pool], name: str) -> Type[Pool]:
+    """A subclass of ``pool_class`` that records checkout waits under ``name``.
+
+    The stats live on the class, so they survive ``Pool.recreate`` (called by
+    ``Engine.dispose``).
+    """
+    stats = pools[name] = PoolStats(name, pool_class.__name__)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = pool_class._do_get(self)
+        except exc.TimeoutError:
+            stats._add("timeouts", 1)
+            raise
+        stats.waits.observe(time.perf_counter() - start)
+        return connection
+
+    return type(f"Instrumented{pool_class.__name__}", (pool_class,), {"_do_get": _do_get, "stats": stats})
+
+
+def instrument(engine: Engine) -> None:
+    stats = getattr(engine.pool, "stats", None)
+    if not isinstance(stats, PoolStats):
+        return
+    stats.pool = engine.pool
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+        stats._add("checked_out", 1)
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record) -> None:
+        stats._add("checked_out", -1)
+
+    @event.listens_for(engine, "engine_disposed")
+    def _disposed(engine) -> None:
+        stats.pool = engine.pool
+
+
+def stats() -> dict:
+    return {name: pool.stats() for name, pool in pools.items()}
@@ -0,0 +1,82 @@
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from threading import Lock
+from typing import Dict, Optional
+from sqlalchemy import event
+from app.config import settings
+from app.models import User
+from app.services.lru import LRUCache
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated caller, detached from any database session."""
+
+    id: int
+    organization_id: int
+    is_active: bool = True
+    email: Optional[str] = None
+    full_name: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            organization_id=user.organization_id,
+            is_active=bool(user.is_active),
+            email=user.email,
+            full_name=user.full_name,
+            created_at=user.created_at,
+        )
+
+
+class DeactivatedUsers:
+    """Users deactivated in this worker, remembered until their access tokens have expired.
+
+    Routes that trust the token's organization claim never load the user, so
+    this is what rejects them. Unlike ``principal_cache`` entries these are
+    neither evicted nor expired early. Login and refresh check the user
+    themselves, so no token issued after the deactivation needs covering.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._until: Dict[int, float] = {}
+        self._lock = Lock()
+
+    def add(self, user_id: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._until = {key: until for key, until in self._until.items() if until > now}
+            self._until[user_id] = now + self.ttl
+
+    def discard(self, user_id: int) -> None:
+        with self._lock:
+            self._until.pop(user_id, None)
+
+    def __contains__(self, user_id: int) -> bool:
+        return self._until.get(user_id, 0) > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._until)
+
+
+principal_cache = LRUCache(settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS)
+deactivated_users = DeactivatedUsers(settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target: User) -> None:
+    if target.is_active:
+        principal_cache.pop(target.id)
+        deactivated_users.discard(target.id)
+    else:
+        principal_cache.set(target.id, Principal.from_user(target))
+        deactivated_users.add(target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target: User) -> None:
+    principal_cache.pop(target.id)
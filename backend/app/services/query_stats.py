@@ -0,0 +1,96 @@
+"""Per-request SQL statement accounting.
+
+``app.database`` attaches :func:`instrument` to every engine. While a
+:func:`track` block is active, each statement executed in that context is
+counted and timed against the block's :class:`QueryStats`. Statements with
+identical SQL text are grouped, so a lazy relationship loaded once per row
+shows up as one statement repeated N times.
+"""
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryStats:
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+
+    @property
+    def repeated(self) -> int:
+        """Executions of statements that had already run in this request."""
+        return sum(count - 1 for count in self.statements.values())
+
+    def most_repeated(self, threshold: int = 2) -> List[Tuple[str, int]]:
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+    def summary(self) -> str:
+        lines = [f"{self.label}: {self.count} statements in {self.seconds * 1000:.1f} ms"]
+        for sql, count in self.statements.most_common():
+            lines.append(f"  {count}x {' '.join(sql.split())[:200]}")
+        return "\n".join(lines)
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Finished request stats are handed to these lists while an ``observe`` block is open
+_observers: List[list] = []
+_observers_lock = threading.Lock()
+
+
+def current() -> Optional[QueryStats]:
+    return _current.get()
+
+
+@contextmanager
+def track(label: str = "") -> Iterator[QueryStats]:
+    stats = QueryStats(label)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+        with _observers_lock:
+            for observer in _observers:
+                observer.append(stats)
+
+
+@contextmanager
+def observe() -> Iterator[List[QueryStats]]:
+    """Collect the stats of every ``track`` block that finishes inside this one."""
+    finished: List[QueryStats] = []
+    with _observers_lock:
+        _observers.append(finished)
+    try:
+        yield finished
+    finally:
+        with _observers_lock:
+            _observers.remove(finished)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def instrument(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
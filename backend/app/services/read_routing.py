@@ -0,0 +1,74 @@
+"""Route read-only requests to the read replica.
+
+With ``DATABASE_REPLICA_URL`` set, ``get_db`` asks :data:`read_router`
+which engine a request's session should use. ``GET`` and ``HEAD`` go to the
+replica, except for users who wrote within the last
+``READ_YOUR_WRITES_SECONDS``. Those stay on the primary so replication lag
+never hides their own changes. Everything else goes to the primary and
+starts such a window for the user it authenticated, restarted once the
+response has gone out.
+
+A read is matched to its user through the bearer token, verified the same
+way as by the auth dependencies, so a forged ``sub`` claim can neither pin
+nor unpin anyone. A write's window is keyed on ``request.state.principal``,
+which only those dependencies set. Windows are kept per worker process.
+"""
+from collections import Counter
+from typing import Optional
+from app.config import settings
+from app.services.auth_service import verify_token
+from app.services.lru import LRUCache
+
+READ_METHODS = frozenset({"GET", "HEAD"})
+
+
+def token_user_id(authorization: Optional[str]) -> Optional[str]:
+    """The ``sub`` of a valid bearer token, or ``None``."""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    payload = verify_token(authorization[7:])
+    return None if payload is None else payload.get("sub")
+
+
+class ReadRouter:
+    def __init__(self, window: float, maxsize: int):
+        self.window = window
+        self.recent_writers = LRUCache(maxsize, ttl=window)
+        # (target, reason) -> sessions
+        self.decisions: Counter = Counter()
+
+    def record_write(self, user_id) -> None:
+        if user_id is not None and self.window > 0:
+            self.recent_writers.set(str(user_id), True)
+
+    def use_replica(self, method: str, authorization: Optional[str]) -> bool:
+        if method not in READ_METHODS:
+            self.decisions["primary", "write"] += 1
+            return False
+        if self.window > 0 and len(self.recent_writers):
+            user_id = token_user_id(authorization)
+            if user_id is not None and self.recent_writers.get(str(user_id)):
+                self.decisions["primary", "recent_write"] += 1
+                return False
+        self.decisions["replica", "read"] += 1
+        return True
+
+    def authenticated(self, method: str, principal) -> None:
+        """Start the window of a write's ``principal`` as soon as its token is verified."""
+        if method not in READ_METHODS:
+            self.record_write(principal.id)
+
+    def finished(self, method: str, principal) -> None:
+        """Restart the window once a write's response has gone out."""
+        if method not in READ_METHODS and principal is not None:
+            self.record_write(principal.id)
+
+    def stats(self) -> dict:
+        return {
+            "window_seconds": self.window,
+            "sticky_users": len(self.recent_writers),
+            "sessions": {f"{target}:{reason}": count for (target, reason), count in self.decisions.items()},
+        }
+
+
+read_router = ReadRouter(settings.READ_YOUR_WRITES_SECONDS, settings.READ_YOUR_WRITES_MAX_USERS)
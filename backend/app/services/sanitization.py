@@ -0,0 +1,435 @@
+"""Scan artifact text for content that should not leave an organization.
+
+Built-in patterns cover secrets (cloud keys, tokens, private keys, password
+assignments), email addresses and URLs. Organizations add customer names,
+matched case-insensitively as whole words, and custom regular expressions.
+
+Every pattern is compiled into one alternation, so a scan is a single
+left-to-right pass whatever the pattern count. The alternation has no
+capturing groups and runs of ``\b``-prefixed patterns share one ``\b``, which
+lets the regex engine reject most alternatives on their first character.
+Which pattern matched is worked out afterwards, at the match position only.
+Customer names are first folded into a character trie, which keeps
+thousands of names down to one branch per distinct prefix instead of one
+alternative per name.
+
+Python's regex engine backtracks, so a pattern such as ``(?:a+)+b`` takes
+exponential time on a long run of ``a``. ``validate_pattern`` rejects the
+shapes that cause this: nested unbounded quantifiers, repeated alternatives
+that can start with the same character, and adjacent unbounded quantifiers
+over overlapping characters. Patterns saved before those checks, and slow
+shapes they miss, are contained by the scanner: any spec with custom
+patterns is scanned in a process pool under
+``SANITIZATION_SCAN_TIMEOUT_SECONDS``, and a scan that overruns has its
+worker killed. Built-in-only specs are scanned inline below
+``SANITIZATION_PROCESS_THRESHOLD_BYTES``, in the pool above it.
+"""
+import asyncio
+import re
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models import SanitizationPattern
+
+try:
+    from re import _constants as sre, _parser as sre_parse
+except ImportError:  # Python 3.10
+    import sre_constants as sre
+    import sre_parse
+
+# Possessive quantifiers and atomic groups only parse on Python 3.11+
+_POSSESSIVE_REPEAT = getattr(sre, "POSSESSIVE_REPEAT", None)
+_ATOMIC_GROUP = getattr(sre, "ATOMIC_GROUP", None)
+
+# (category, name, regex)
+Spec = Tuple[Tuple[str, str, str], ...]
+
+BUILTIN_PATTERNS: Spec = (
+    ("secret", "aws_access_key", r"\b(?:AKIA|ASIA)[0-9A-Z]{16}\b"),
+    ("secret", "github_token", r"\bgh[pousr]_[A-Za-z0-9]{36,}\b"),
+    ("secret", "slack_token", r"\bxox[abposr]-[A-Za-z0-9-]{10,}"),
+    ("secret", "stripe_key", r"\b[rs]k_live_[A-Za-z0-9]{16,}\b"),
+    ("secret", "private_key", r"-----BEGIN (?:[A-Z]+ )?PRIVATE KEY-----"),
+    ("secret", "jwt", r"\beyJ[A-Za-z0-9_-]{8,}\.eyJ[A-Za-z0-9_-]{8,}\.[A-Za-z0-9_-]+"),
+    (
+        "secret", "credential_assignment",
+        r"(?i:\b(?:password|passwd|pwd|secret|api[_-]?key|access[_-]?token|auth[_-]?token)\b\s*[:=]\s*[^\s'\"]{4,})",
+    ),
+    ("email", "email", r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}\b"),
+    ("url", "url", r"\bhttps?://[^\s<>\"'()]*[^\s<>\"'().,;:!?]"),
+)
+
+MAX_PATTERN_LENGTH = 500
+
+_REPEATS = (sre.MAX_REPEAT, sre.MIN_REPEAT)
+_CATEGORIES = {
+    sre.CATEGORY_DIGIT: re.compile(r"\d"), sre.CATEGORY_NOT_DIGIT: re.compile(r"\D"),
+    sre.CATEGORY_SPACE: re.compile(r"\s"), sre.CATEGORY_NOT_SPACE: re.compile(r"\S"),
+    sre.CATEGORY_WORD: re.compile(r"\w"), sre.CATEGORY_NOT_WORD: re.compile(r"\W"),
+}
+# Characters that character classes are compared over; literals are added as they appear
+_PROBE = frozenset(map(chr, range(256)))
+
+
+TIMED_OUT = "Sanitization scan timed out; simplify the organization's custom patterns"
+
+
+class ScanTimedOut(Exception):
+    """Raised when a scan runs past ``SANITIZATION_SCAN_TIMEOUT_SECONDS``."""
+
+
+def _cases(code: int) -> set:
+    char = chr(code)
+    return {case for case in (char, char.lower(), char.upper()) if len(case) == 1}
+
+
+def _class_chars(items) -> frozenset:
+    """The probe characters (and literals) a character class matches, ignoring case."""
+    literals, negate = set(), False
+    for op, av in items:
+        if op is sre.LITERAL:
+            literals |= _cases(av)
+    universe = _PROBE | literals
+    matched = set()
+    for op, av in items:
+        if op is sre.NEGATE:
+            negate = True
+        elif op is sre.LITERAL:
+            matched |= _cases(av)
+        elif op is sre.RANGE:
+            low, high = av
+            matched |= {char for char in universe if any(low <= ord(case) <= high for case in _cases(ord(char)))}
+        elif op is sre.CATEGORY:
+            matched |= {char for char in universe if _CATEGORIES[av].match(char)}
+    return frozenset(universe - matched if negate else matched)
+
+
+def _nullable(op, av) -> bool:
+    if op in _REPEATS or op is _POSSESSIVE_REPEAT:
+        return av[0] == 0 or all(_nullable(*item) for item in av[2])
+    if op is sre.SUBPATTERN:
+        return all(_nullable(*item) for item in av[3])
+    if op is _ATOMIC_GROUP:
+        return all(_nullable(*item) for item in av)
+    if op is sre.BRANCH:
+        return any(all(_nullable(*item) for item in branch) for branch in av[1])
+    return op not in (sre.LITERAL, sre.NOT_LITERAL, sre.ANY, sre.IN)
+
+
+def _first(items) -> frozenset:
+    """Characters a match of the sequence ``items`` can start with."""
+    chars = set()
+    for op, av in items:
+        if op is sre.LITERAL:
+            chars |= _cases(av)
+        elif op is sre.NOT_LITERAL:
+            chars |= _PROBE - _cases(av)
+        elif op is sre.ANY:
+            chars |= _PROBE
+        elif op is sre.IN:
+            chars |= _class_chars(av)
+        elif op in _REPEATS or op is _POSSESSIVE_REPEAT:
+            chars |= _first(av[2])
+        elif op is sre.SUBPATTERN:
+            chars |= _first(av[3])
+        elif op is _ATOMIC_GROUP:
+            chars |= _first(av)
+        elif op is sre.BRANCH:
+            for branch in av[1]:
+                chars |= _first(branch)
+        if not _nullable(op, av):
+            break
+    return frozenset(chars)
+
+
+def _overlapping_branches(branches) -> bool:
+    """Whether two alternatives can match the same text's start, so a repeat must try both."""
+    seen, empty = set(), False
+    for branch in branches:
+        if all(_nullable(*item) for item in branch):
+            if empty:
+                return True
+            empty = True
+        first = _first(branch)
+        if seen & first:
+            return True
+        seen |= first
+    return False
+
+
+def _backtracking_problem(items, enclosing_max: Optional[int] = None) -> Optional[str]:
+    """Why the parsed sequence ``items`` can backtrack exponentially or polynomially, or ``None``."""
+    previous = None  # First characters of the unbounded repeat just before, if any
+    for op, av in items:
+        current = None
+        if op in _REPEATS:
+            low, high, body = av
+            if high > 1:
+                if enclosing_max is not None and sre.MAXREPEAT in (high, enclosing_max):
+                    return "Nested quantifiers such as (a+)+ are not supported"
+                if high == sre.MAXREPEAT:
+                    current = _first(body)
+                    if previous and previous & current:
+                        return "Adjacent quantifiers over the same characters, such as \\d+\\d+, are not supported"
+                problem = _backtracking_problem(body, high)
+            else:
+                problem = _backtracking_problem(body, enclosing_max)
+        elif op is _POSSESSIVE_REPEAT:
+            # Never gives characters back, so it only needs checking inside
+            problem = _backtracking_problem(av[2])
+        elif op is sre.SUBPATTERN:
+            problem = _backtracking_problem(av[3], enclosing_max)
+        elif op is _ATOMIC_GROUP:
+            problem = _backtracking_problem(av, enclosing_max)
+        elif op is sre.BRANCH:
+            if enclosing_max == sre.MAXREPEAT and _overlapping_branches(av[1]):
+                return "Alternatives in a repeated group must not start with the same text"
+            problem = next(filter(None, (_backtracking_problem(branch, enclosing_max) for branch in av[1])), None)
+        elif op in (sre.ASSERT, sre.ASSERT_NOT):
+            problem = _backtracking_problem(av[1], enclosing_max)
+        else:
+            problem = None
+        if problem:
+            return problem
+        previous = current
+    return None
+
+
+def validate_pattern(category: str, pattern: str) -> Optional[str]:
+    """Why ``pattern`` cannot be used, or ``None`` if it can."""
+    if not pattern.strip():
+        return "Pattern is empty"
+    if len(pattern) > MAX_PATTERN_LENGTH:
+        return f"Pattern is longer than {MAX_PATTERN_LENGTH} characters"
+    if category == "custom":
+        try:
+            compiled = re.compile(pattern)
+        except re.error as exc:
+            return f"Invalid regular expression: {exc}"
+        # The combined pattern wraps every pattern in its own group
+        try:
+            re.compile(f"(?:{pattern})")
+        except re.error:
+            return "Global flags such as (?i) are not supported; use a scoped (?i:...) group"
+        if compiled.groupindex:
+            return "Named groups are not supported"
+        if compiled.groups and re.search(r"(?<!\\)\\[1-9]", pattern):
+            return "Backreferences are not supported"
+        if compiled.match(""):
+            return "Pattern matches the empty string"
+        problem = _backtracking_problem(sre_parse.parse(pattern))
+        if problem:
+            return problem
+    return None
+
+
+def _trie_regex(names: Iterable[str]) -> str:
+    trie: dict = {}
+    for name in names:
+        node = trie
+        for char in name.lower():
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        ends = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not ends:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        return group + "?" if ends else group
+
+    return build(trie)
+
+
+def build_spec(custom: Iterable[Tuple[str, str]], customers: Iterable[str]) -> Spec:
+    """Built-in patterns plus an organization's ``(name, regex)`` pairs and customer names.
+
+    Where two patterns match at the same position the earlier one wins, so
+    custom patterns go before the broader customer names.
+    """
+    spec = list(BUILTIN_PATTERNS)
+    spec.extend(("custom", name, regex) for name, regex in custom)
+    names = [name.strip() for name in customers if name.strip()]
+    if names:
+        spec.append(("customer", "customer_name", rf"(?i:(?<!\w)(?:{_trie_regex(names)})(?!\w))"))
+    return tuple(spec)
+
+
+def _top_level_branch(regex: str) -> bool:
+    """Whether ``regex`` has a ``|`` outside any group or character class."""
+    depth, in_class, escaped = 0, False, False
+    for char in regex:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+    return False
+
+
+@lru_cache(maxsize=64)
+def _compile(spec: Spec) -> Tuple["re.Pattern", "re.Pattern"]:
+    """The single-pass scan pattern and the named-group pattern that identifies a match."""
+    branches, bounded = [], []
+    for _, _, regex in spec:
+        if regex.startswith(r"\b") and not _top_level_branch(regex):
+            bounded.append(f"(?:{regex[2:]})")
+            continue
+        if bounded:
+            branches.append(r"\b(?:" + "|".join(bounded) + ")")
+            bounded = []
+        branches.append(f"(?:{regex})")
+    if bounded:
+        branches.append(r"\b(?:" + "|".join(bounded) + ")")
+    named = "|".join(f"(?P<p{index}>{regex})" for index, (_, _, regex) in enumerate(spec))
+    return re.compile("|".join(branches)), re.compile(named)
+
+
+def _redact(value: str) -> str:
+    return value[:3] + "*" * min(max(len(value) - 3, 3), 12)
+
+
+def scan_text(spec: Spec, text: str, max_findings: int) -> dict:
+    """One pass of the combined pattern over ``text``.
+
+    Module level so the process pool can pickle it; each worker process
+    keeps its own cache of compiled specs.
+    """
+    scan, named = _compile(spec)
+    counts: Counter = Counter()
+    findings = []
+    for match in scan.finditer(text):
+        # Same alternatives in the same order, so the same one wins at this position
+        category, name, _ = spec[int(named.match(text, match.start()).lastgroup[1:])]
+        counts[category] += 1
+        if len(findings) < max_findings:
+            findings.append({
+                "category": category,
+                "pattern": name,
+                "start": match.start(),
+                "end": match.end(),
+                "preview": _redact(match.group()),
+            })
+    return {
+        "counts": dict(counts),
+        "findings": findings,
+        "truncated": sum(counts.values()) > len(findings),
+    }
+
+
+async def organization_spec(db: AsyncSession, organization_id: int) -> Spec:
+    rows = (await db.execute(
+        select(SanitizationPattern.category, SanitizationPattern.name, SanitizationPattern.pattern)
+        .where(SanitizationPattern.organization_id == organization_id)
+        .order_by(SanitizationPattern.id)
+    )).all()
+    return build_spec(
+        [(row.name, row.pattern) for row in rows if row.category == "custom"],
+        [row.pattern for row in rows if row.category == "customer"],
+    )
+
+
+class Scanner:
+    """Runs scans inline, or in a process pool for large bodies and custom patterns."""
+
+    def __init__(self, workers: int, process_threshold: int, max_findings: int, timeout: float):
+        self.workers = workers
+        self.process_threshold = process_threshold
+        self.max_findings = max_findings
+        self.timeout = timeout
+        self.scans = 0
+        self.offloaded = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.scanned_bytes = 0
+        self._executor: Optional[Executor] = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def scan(self, spec: Spec, text: str) -> dict:
+        size = len(text.encode())
+        self.scans += 1
+        self.scanned_bytes += size
+        custom = any(category == "custom" for category, _, _ in spec)
+        if custom or size >= self.process_threshold > 0:
+            self.offloaded += 1
+            report = await self._scan_in_pool(spec, text)
+        else:
+            report = scan_text(spec, text, self.max_findings)
+        return {"scanned_at": datetime.utcnow().isoformat(), "bytes": size, **report}
+
+    async def _scan_in_pool(self, spec: Spec, text: str) -> dict:
+        # One retry: killing the pool for another scan's runaway regex breaks this one too
+        for attempt in range(2):
+            executor = self.executor
+            future = asyncio.get_running_loop().run_in_executor(executor, scan_text, spec, text, self.max_findings)
+            try:
+                return await asyncio.wait_for(future, self.timeout if self.timeout > 0 else None)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                # A running regex cannot be interrupted, so the pool and its workers go
+                self._discard(executor)
+                raise ScanTimedOut() from None
+            except BrokenProcessPool:
+                self._discard(executor)
+                if attempt:
+                    raise
+                self.retries += 1
+
+    def _discard(self, executor: Executor) -> None:
+        """Kill ``executor`` unless another scan already replaced it.
+
+        Scans still queued or running in it fail with ``BrokenProcessPool``
+        and are retried in the next pool rather than cancelled.
+        """
+        if self._executor is executor:
+            self.shutdown(kill=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "scans": self.scans,
+            "offloaded": self.offloaded,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "scanned_bytes": self.scanned_bytes,
+        }
+
+    def shutdown(self, kill: bool = False) -> None:
+        if self._executor is not None:
+            # ProcessPoolExecutor has no public way to stop a running task
+            processes = list((getattr(self._executor, "_processes", None) or {}).values()) if kill else []
+            self._executor.shutdown(wait=False, cancel_futures=not kill)
+            for process in processes:
+                process.kill()
+            self._executor = None
+
+
+scanner = Scanner(
+    settings.SANITIZATION_WORKERS,
+    settings.SANITIZATION_PROCESS_THRESHOLD_BYTES,
+    settings.SANITIZATION_MAX_FINDINGS,
+    settings.SANITIZATION_SCAN_TIMEOUT_SECONDS,
+)
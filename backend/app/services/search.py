@@ -0,0 +1,216 @@
+"""Full-text index over artifacts, templates and SOPs.
+
+Handlers call ``index_*`` / ``remove_document`` inside their own transaction,
+so the index is always updated together with the row it describes.
+"""
+import re
+from datetime import datetime
+from typing import Iterable, List, Optional
+from sqlalchemy import column, delete, func, literal_column, or_, select, table
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models import Artifact, SearchDocument, SOP, SOPStep, Template
+from app.services import blobs
+
+DOC_TYPES = ("artifact", "template", "sop")
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _dialect(db: AsyncSession) -> str:
+    return db.get_bind().dialect.name
+
+
+def _tsvector(title, body):
+    language = settings.SEARCH_LANGUAGE
+    return func.setweight(func.to_tsvector(language, title), "A").op("||")(
+        func.setweight(func.to_tsvector(language, body), "B")
+    )
+
+
+def document_values(
+    doc_type: str,
+    doc_id: int,
+    organization_id: int,
+    title: str,
+    body: str,
+    is_promoted: bool = False,
+) -> dict:
+    return {
+        "doc_type": doc_type,
+        "doc_id": doc_id,
+        "organization_id": organization_id,
+        "title": title,
+        "body": body[:settings.SEARCH_MAX_BODY_CHARS],
+        "is_promoted": is_promoted,
+        "updated_at": datetime.utcnow(),
+    }
+
+
+async def index_documents(db: AsyncSession, documents: List[dict], batch_size: int = 500) -> None:
+    """Upsert ``document_values`` rows with one multi-row statement per batch."""
+    postgresql = _dialect(db) == "postgresql"
+    for start in range(0, len(documents), batch_size):
+        batch = documents[start:start + batch_size]
+        if postgresql:
+            batch = [{**values, "search_vector": _tsvector(values["title"], values["body"])} for values in batch]
+            statement = pg_insert(SearchDocument).values(batch)
+        else:
+            statement = sqlite_insert(SearchDocument).values(batch)
+
+        statement = statement.on_conflict_do_update(
+            index_elements=["doc_type", "doc_id"],
+            set_={key: statement.excluded[key] for key in batch[0] if key not in ("doc_type", "doc_id")},
+        )
+        await db.execute(statement)
+
+
+async def index_document(
+    db: AsyncSession,
+    doc_type: str,
+    doc_id: int,
+    organization_id: int,
+    title: str,
+    body: str,
+    is_promoted: bool = False,
+) -> None:
+    await index_documents(db, [document_values(doc_type, doc_id, organization_id, title, body, is_promoted)])
+
+
+async def remove_document(db: AsyncSession, doc_type: str, doc_id: int) -> None:
+    await db.execute(
+        delete(SearchDocument).where(SearchDocument.doc_type == doc_type, SearchDocument.doc_id == doc_id)
+    )
+
+
+def join_text(*parts: Optional[str]) -> str:
+    return "\n".join(part for part in parts if part)
+
+
+async def index_artifact(db: AsyncSession, artifact: Artifact) -> None:
+    await index_document(
+        db, "artifact", artifact.id, artifact.organization_id,
+        artifact.title, join_text(artifact.description, artifact.content),
+    )
+
+
+async def index_template(db: AsyncSession, template: Template) -> None:
+    await index_document(
+        db, "template", template.id, template.organization_id,
+        template.name, join_text(template.description, template.content),
+        is_promoted=bool(template.is_promoted),
+    )
+
+
+def sop_document(sop: SOP, steps: Iterable[SOPStep]) -> dict:
+    step_text = (join_text(step.title, step.description) for step in steps)
+    return document_values(
+        "sop", sop.id, sop.organization_id,
+        sop.title, join_text(sop.description, *step_text),
+    )
+
+
+async def index_sop(db: AsyncSession, sop: SOP, steps: Iterable[SOPStep]) -> None:
+    await index_documents(db, [sop_document(sop, steps)])
+
+
+def _fts5_query(query: str) -> Optional[str]:
+    # Quote every term so user input can never be parsed as FTS5 syntax
+    terms = _WORD.findall(query)
+    return " ".join(f'"{term}"' for term in terms) or None
+
+
+async def search(
+    db: AsyncSession,
+    organization_id: int,
+    query: str,
+    doc_types: Optional[List[str]],
+    limit: int,
+    offset: int,
+) -> list:
+    """Return ranked rows of ``(doc_type, doc_id, title, snippet, rank)``.
+
+    Covers the organization's own documents plus promoted templates from
+    other organizations. Higher ``rank`` is a better match.
+    """
+    visible = or_(
+        SearchDocument.organization_id == organization_id,
+        (SearchDocument.doc_type == "template") & (SearchDocument.is_promoted == True),
+    )
+
+    if _dialect(db) == "postgresql":
+        tsquery = func.websearch_to_tsquery(settings.SEARCH_LANGUAGE, query)
+        rank = func.ts_rank_cd(SearchDocument.search_vector, tsquery)
+        snippet = func.ts_headline(
+            settings.SEARCH_LANGUAGE, SearchDocument.body, tsquery, "MaxFragments=1, MaxWords=30, MinWords=10"
+        )
+        statement = select(
+            SearchDocument.doc_type, SearchDocument.doc_id, SearchDocument.title,
+            snippet.label("snippet"), rank.label("rank"),
+        ).where(SearchDocument.search_vector.op("@@")(tsquery), visible)
+    else:
+        match = _fts5_query(query)
+        if match is None:
+            return []
+        fts = table("search_documents_fts", column("rowid"))
+        # bm25() is lower-is-better; negate so both backends sort descending
+        rank = -func.bm25(literal_column(fts.name), 2.0, 1.0)
+        snippet = func.snippet(literal_column(fts.name), 1, "", "", "...", 30)
+        statement = (
+            select(
+                SearchDocument.doc_type, SearchDocument.doc_id, SearchDocument.title,
+                snippet.label("snippet"), rank.label("rank"),
+            )
+            .select_from(SearchDocument)
+            .join(fts, fts.c.rowid == SearchDocument.id)
+            .where(literal_column(fts.name).op("MATCH")(match), visible)
+        )
+
+    if doc_types:
+        statement = statement.where(SearchDocument.doc_type.in_(doc_types))
+    statement = statement.order_by(literal_column("rank").desc(), SearchDocument.id).limit(limit).offset(offset)
+    return (await db.execute(statement)).all()
+
+
+async def _in_batches(db: AsyncSession, model, batch_size: int = 500):
+    last_id = 0
+    while True:
+        rows = (await db.scalars(
+            select(model).where(model.id > last_id).order_by(model.id).limit(batch_size)
+        )).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+        db.expunge_all()
+
+
+async def rebuild(db: AsyncSession) -> int:
+    """Re-index every artifact, template and SOP. Returns the number of documents."""
+    await db.execute(delete(SearchDocument))
+    count = 0
+    async for artifacts in _in_batches(db, Artifact):
+        await blobs.load(db, *artifacts)
+        for artifact in artifacts:
+            await index_artifact(db, artifact)
+        count += len(artifacts)
+    async for templates in _in_batches(db, Template):
+        await blobs.load(db, *templates)
+        for template in templates:
+            await index_template(db, template)
+        count += len(templates)
+    async for sops in _in_batches(db, SOP):
+        steps = (await db.scalars(
+            select(SOPStep)
+            .where(SOPStep.sop_id.in_([sop.id for sop in sops]))
+            .order_by(SOPStep.sop_id, SOPStep.step_number)
+        )).all()
+        steps_by_sop: dict = {}
+        for step in steps:
+            steps_by_sop.setdefault(step.sop_id, []).append(step)
+        for sop in sops:
+            await index_sop(db, sop, steps_by_sop.get(sop.id, []))
+        count += len(sops)
+    await db.commit()
+    return count
@@ -0,0 +1,201 @@
+"""Delta-compressed storage for artifact versions.
+
+Each version is stored either as a full snapshot or as a line-based delta
+against the previous version. A snapshot is forced every
+``ARTIFACT_SNAPSHOT_INTERVAL`` versions so reconstructing any version applies
+a bounded number of deltas. ``Artifact.content`` always holds the head.
+The stored text lives in the blob store, so a snapshot identical to the
+head shares its blob.
+"""
+import json
+from difflib import SequenceMatcher
+from typing import Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.models import Artifact, ArtifactVersion
+from app.services import blobs
+from app.services.lru import LRUCache
+
+THREADPOOL_BYTES = 256 * 1024  # Larger edits are diffed in the threadpool
+
+version_cache = LRUCache(settings.VERSION_CACHE_SIZE)
+
+
+def cache_on_commit(db: AsyncSession, version: ArtifactVersion, content: str) -> None:
+    """Cache a new version's full ``content`` once the transaction creating it commits."""
+    pending = db.sync_session.info.setdefault("new_versions", {})
+    pending[(version.artifact_id, version.version_number)] = content
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed(session: Session) -> None:
+    for key, content in session.info.pop("new_versions", {}).items():
+        version_cache.set(key, content)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session: Session) -> None:
+    session.info.pop("new_versions", None)
+
+
+def make_delta(base: str, target: str) -> str:
+    """Encode ``target`` as copies of ``base`` line ranges plus inserted text.
+
+    The encoding is a JSON list where ``[start, end]`` copies lines from the
+    base and a string is inserted verbatim.
+    """
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    ops: list = []
+    matcher = SequenceMatcher(None, base_lines, target_lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            inserted = "".join(target_lines[j1:j2])
+            if ops and isinstance(ops[-1], str):
+                ops[-1] += inserted
+            else:
+                ops.append(inserted)
+    return json.dumps(ops, ensure_ascii=False, separators=(",", ":"))
+
+
+def apply_delta(base: str, delta: str) -> str:
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in json.loads(delta):
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(base_lines[op[0]:op[1]])
+    return "".join(parts)
+
+
+def build_version(
+    artifact_id: int,
+    version_number: int,
+    content: str,
+    previous_content: Optional[str],
+    change_summary: Optional[str],
+) -> ArtifactVersion:
+    """Create the row for a new version, as a delta when that is worthwhile.
+
+    ``previous_content`` is the text of the stored version before this one;
+    pass ``None`` when there is no such row (see ``has_version``) and the
+    version is stored as a snapshot. The caller stores ``content`` with
+    ``blobs.store`` before flushing, and may pass the row to ``cache_on_commit``.
+    """
+    stored, is_snapshot = content, True
+    interval = max(settings.ARTIFACT_SNAPSHOT_INTERVAL, 1)
+    if previous_content is not None and (version_number - 1) % interval != 0:
+        delta = make_delta(previous_content, content)
+        if len(delta) < len(content):
+            stored, is_snapshot = delta, False
+
+    return ArtifactVersion(
+        artifact_id=artifact_id,
+        version_number=version_number,
+        content=stored,
+        is_snapshot=is_snapshot,
+        content_size=len(content.encode()),
+        change_summary=change_summary,
+    )
+
+
+async def build_version_async(
+    artifact_id: int,
+    version_number: int,
+    content: str,
+    previous_content: Optional[str],
+    change_summary: Optional[str],
+) -> ArtifactVersion:
+    """``build_version`` for request handlers; the diff of a large edit runs in the threadpool."""
+    args = (artifact_id, version_number, content, previous_content, change_summary)
+    if previous_content is not None and len(content) + len(previous_content) >= THREADPOOL_BYTES:
+        return await run_in_threadpool(build_version, *args)
+    return build_version(*args)
+
+
+async def has_version(db: AsyncSession, artifact_id: int, version_number: int) -> bool:
+    """Whether ``version_number`` has a row that a delta can be applied to.
+
+    Artifacts imported before version rows were written for imports have none.
+    """
+    return await db.scalar(select(ArtifactVersion.id).where(
+        ArtifactVersion.artifact_id == artifact_id,
+        ArtifactVersion.version_number == version_number,
+    )) is not None
+
+
+def iter_contents(versions: Iterable[ArtifactVersion]) -> Iterator[Tuple[ArtifactVersion, str]]:
+    """Yield ``(version, content)`` for versions sorted by ``version_number``.
+
+    The sequence must start at a snapshot; each delta is applied to the
+    content of the version before it.
+    """
+    content = None
+    for version in versions:
+        if version.is_snapshot:
+            content = version.content
+        else:
+            if content is None:
+                raise ValueError(f"Version {version.version_number} has no base snapshot")
+            content = apply_delta(content, version.content)
+        yield version, content
+
+
+async def get_versions(
+    db: AsyncSession, artifact_id: int, first: int, last: int
+) -> List[Tuple[ArtifactVersion, str]]:
+    """Return ``(version, content)`` for versions ``first..last`` in ascending order.
+
+    Loads the chain from the nearest snapshot at or before ``first`` in one query.
+    """
+    latest_snapshot = (
+        select(func.max(ArtifactVersion.version_number))
+        .where(
+            ArtifactVersion.artifact_id == artifact_id,
+            ArtifactVersion.is_snapshot == True,
+            ArtifactVersion.version_number <= first,
+        )
+        .scalar_subquery()
+    )
+    chain: List[ArtifactVersion] = (
+        await db.scalars(
+            select(ArtifactVersion)
+            .where(
+                ArtifactVersion.artifact_id == artifact_id,
+                ArtifactVersion.version_number >= latest_snapshot,
+                ArtifactVersion.version_number <= last,
+            )
+            .order_by(ArtifactVersion.version_number)
+        )
+    ).all()
+    await blobs.load(db, *chain)
+
+    versions = []
+    for version, content in iter_contents(chain):
+        version_cache.set((artifact_id, version.version_number), content)
+        if version.version_number >= first:
+            versions.append((version, content))
+    return versions
+
+
+async def get_version_content(db: AsyncSession, artifact: Artifact, version_number: int) -> Optional[str]:
+    """Return the full content of one version of ``artifact``."""
+    if version_number == artifact.version:
+        return await blobs.get(db, artifact.content_blob_id)
+
+    cached = version_cache.get((artifact.id, version_number))
+    if cached is not None:
+        return cached
+
+    versions = await get_versions(db, artifact.id, version_number, version_number)
+    return versions[0][1] if versions else None
+
+
+def forget_artifact(artifact_id: int) -> None:
+    version_cache.pop_matching(lambda key: key[0] == artifact_id)
@@ -0,0 +1,401 @@
+"""Latency, throughput and memory of every API router on synthetic tenants.
+
+Seeds a database with ``benchmarks.tenants`` and drives each endpoint
+in-process through ``httpx.ASGITransport`` (no network, no uvicorn), one
+endpoint at a time, reporting p50/p95/p99 latency, requests per second,
+SQL statements per request and peak RSS after the endpoint ran. Request
+sequences are seeded, so two runs with the same arguments issue the same
+requests.
+
+Results can be saved as a JSON baseline and a later run compared against
+it; the comparison exits non-zero when an endpoint regresses by more than
+``--threshold`` percent.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_api --save baseline.json
+    python -m benchmarks.bench_api --compare baseline.json
+    python -m benchmarks.bench_api --database-url postgresql://user:pw@localhost/bench --orgs 20
+    python -m benchmarks.bench_api --endpoints artifacts templates.gallery
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple
+from benchmarks import peak_rss_mb, percentile
+
+if TYPE_CHECKING:
+    # Importing the app reads its configuration, so runtime imports wait
+    # until main() has set DATABASE_URL and DATABASE_ASYNC
+    from benchmarks.tenants import Tenant, TenantSpec
+
+# (method, url, keyword arguments for httpx)
+Request = Tuple[str, str, dict]
+SCENARIOS: Dict[str, Tuple[Callable, float]] = {}
+
+
+@dataclass
+class Context:
+    spec: TenantSpec
+    tenants: List[Tenant]
+    headers: Dict[int, dict]
+    refresh_tokens: Dict[int, str]
+
+
+def scenario(name: str, scale: float = 1.0):
+    """Register a request builder; ``scale`` shrinks the request count for slow endpoints."""
+    def register(build: Callable[[random.Random, Context], Request]):
+        SCENARIOS[name] = (build, scale)
+        return build
+    return register
+
+
+def _pick(rng: random.Random, ctx: Context) -> Tuple[Tenant, dict]:
+    tenant = rng.choice(ctx.tenants)
+    return tenant, {"headers": ctx.headers[tenant.organization_id]}
+
+
+def _seeded_artifact(rng: random.Random, ctx: Context, tenant: Tenant) -> int:
+    # The first ``spec.artifacts`` ids carry the full version chain
+    return rng.choice(tenant.artifact_ids[:ctx.spec.artifacts])
+
+
+@scenario("auth.login", scale=0.05)
+def _login(rng, ctx):
+    from benchmarks.tenants import PASSWORD
+
+    tenant = rng.choice(ctx.tenants)
+    return "POST", "/api/auth/login", {"json": {"email": tenant.email, "password": PASSWORD}}
+
+
+@scenario("auth.me")
+def _me(rng, ctx):
+    return ("GET", "/api/auth/me", _pick(rng, ctx)[1])
+
+
+@scenario("auth.refresh")
+def _refresh(rng, ctx):
+    tenant = rng.choice(ctx.tenants)
+    return "POST", "/api/auth/refresh", {"params": {"refresh_token": ctx.refresh_tokens[tenant.organization_id]}}
+
+
+@scenario("artifacts.list_summary")
+def _artifacts_summary(rng, ctx):
+    _, kwargs = _pick(rng, ctx)
+    return "GET", "/api/artifacts/", {**kwargs, "params": {"view": "summary", "limit": 50}}
+
+
+@scenario("artifacts.list_full")
+def _artifacts_full(rng, ctx):
+    _, kwargs = _pick(rng, ctx)
+    return "GET", "/api/artifacts/", {**kwargs, "params": {"limit": 50}}
+
+
+@scenario("artifacts.detail")
+def _artifact_detail(rng, ctx):
+    tenant, kwargs = _pick(rng, ctx)
+    return "GET", f"/api/artifacts/{_seeded_artifact(rng, ctx, tenant)}", kwargs
+
+
+@scenario("artifacts.versions")
+def _artifact_versions(rng, ctx):
+    tenant, kwargs = _pick(rng, ctx)
+    return "GET", f"/api/artifacts/{_seeded_artifact(rng, ctx, tenant)}/versions", {**kwargs, "params": {"limit": 5}}
+
+
+@scenario("artifacts.version")
+def _artifact_version(rng, ctx):
+    tenant, kwargs = _pick(rng, ctx)
+    number = rng.randint(1, ctx.spec.versions)
+    return "GET", f"/api/artifacts/{_seeded_artifact(rng, ctx, tenant)}/versions/{number}", kwargs
+
+
+@scenario("artifacts.diff")
+def _artifact_diff(rng, ctx):
+    tenant, kwargs = _pick(rng, ctx)
+    first, second = sorted(rng.sample(range(1, ctx.spec.versions + 1), 2))
+    params = {"from": first, "to": second}
+    return "GET", f"/api/artifacts/{_seeded_artifact(rng, ctx, tenant)}/diff", {**kwargs, "params": params}
+
+
+@scenario("artifacts.create")
+def _artifact_create(rng, ctx):
+    _, kwargs = _pick(rng, ctx)
+    body = {"title": f"Bench {rng.random():.8f}", "content": f"term{rng.randrange(5000)} created\n" * 100}
+    return "POST", "/api/artifacts/", {**kwargs, "json": body}
+
+
+@scenario("artifacts.update")
+def _artifact_update(rng, ctx):
+    tenant, kwargs = _pick(rng, ctx)
+    body = {"content": f"term{rng.randrange(5000)} updated {rng.random()}\n" * 100, "change_summary": "bench"}
+    return "PUT", f"/api/artifacts/{_seeded_artifact(rng, ctx, tenant)}", {**kwargs, "json": body}
+
+
+@scenario("artifacts.export", scale=0.05)
+def _artifact_export(rng, ctx):
+    return ("GET", "/api/artifacts/export", _pick(rng, ctx)[1])
+
+
+@scenario("sops.list")
+def _sops_list(rng, ctx):
+    _, kwargs = _pick(rng, ctx)
+    return "GET", "/api/sops/", {**kwargs, "params": {"limit": 50}}
+
+
+@scenario("sops.detail")
+def _sop_detail(rng, ctx):
+    tenant, kwargs = _pick(rng, ctx)
+    return "GET", f"/api/sops/{rng.choice(tenant.sop_ids)}", kwargs
+
+
+@scenario("sops.create")
+def _sop_create(rng, ctx):
+    _, kwargs = _pick(rng, ctx)
+    steps = [{"title": f"Step {number}", "description": f"term{rng.randrange(5000)}"} for number in range(10)]
+    return "POST", "/api/sops/", {**kwargs, "json": {"title": f"Bench SOP {rng.random():.8f}", "steps": steps}}
+
+
+@scenario("templates.list")
+def _templates_list(rng, ctx):
+    _, kwargs = _pick(rng, ctx)
+    return "GET", "/api/templates/", {**kwargs, "params": {"limit": 50}}
+
+
+@scenario("templates.gallery")
+def _templates_gallery(rng, ctx):
+    return ("GET", "/api/templates/gallery", _pick(rng, ctx)[1])
+
+
+@scenario("templates.gallery.popular")
+def _templates_gallery_popular(rng, ctx):
+    _, kwargs = _pick(rng, ctx)
+    return "GET", "/api/templates/gallery", {**kwargs, "params": {"sort": "popular"}}
+
+
+@scenario("templates.import")
+def _template_import(rng, ctx):
+    tenant, kwargs = _pick(rng, ctx)
+    others = [
+        template_id
+        for owner in ctx.tenants if owner is not tenant
+        for template_id in owner.promoted_template_ids
+    ]
+    return "POST", "/api/templates/import", {**kwargs, "json": {"template_id": rng.choice(others)}}
+
+
+@scenario("search.query")
+def _search(rng, ctx):
+    _, kwargs = _pick(rng, ctx)
+    return "GET", "/api/search/", {**kwargs, "params": {"q": f"term{rng.randrange(5000)}"}}
+
+
+async def run_endpoint(client, name: str, requests: List[Request], concurrency: int) -> dict:
+    from app.services import query_stats
+
+    latencies: List[float] = []
+    errors = 0
+    pending = iter(requests)
+
+    async def worker() -> None:
+        nonlocal errors
+        for method, url, kwargs in pending:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    with query_stats.observe() as finished:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "queries": statistics.mean(stats.count for stats in finished) if finished else 0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+async def seed(database_url: str, spec: TenantSpec) -> Tuple[List[Tenant], float]:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from app import migrations
+    from app.database import to_async_url
+    from benchmarks.tenants import generate
+
+    engine = create_async_engine(to_async_url(database_url))
+    async with engine.begin() as conn:
+        await conn.run_sync(migrations.upgrade)
+    start = time.perf_counter()
+    async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+        tenants = await generate(db, spec)
+    seconds = time.perf_counter() - start
+    await engine.dispose()
+    return tenants, seconds
+
+
+async def run(args: argparse.Namespace, spec: TenantSpec) -> dict:
+    import httpx
+    from app.main import app
+    from app.services.auth_service import create_access_token, create_refresh_token
+
+    tenants, seed_seconds = await seed(args.database_url, spec)
+    ctx = Context(
+        spec=spec,
+        tenants=tenants,
+        headers={
+            tenant.organization_id: {"Authorization": "Bearer " + create_access_token(
+                {"sub": str(tenant.user_id)}, organization_id=tenant.organization_id
+            )}
+            for tenant in tenants
+        },
+        refresh_tokens={
+            tenant.organization_id: create_refresh_token(
+                {"sub": str(tenant.user_id)}, organization_id=tenant.organization_id
+            )
+            for tenant in tenants
+        },
+    )
+
+    names = [
+        name for name in SCENARIOS
+        if not args.endpoints or any(name == wanted or name.startswith(wanted + ".") for wanted in args.endpoints)
+    ]
+    results = {}
+    # Unhandled errors become 500s and count as errors instead of aborting the run
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            for name in names:
+                build, scale = SCENARIOS[name]
+                rng = random.Random(f"{spec.seed}:{name}")
+                count = max(1, int(args.requests * scale))
+                requests = [build(rng, ctx) for _ in range(count)]
+                # Warm caches and connections so the first request does not skew p99
+                for method, url, kwargs in requests[:max(1, count // 20)]:
+                    await client.request(method, url, **kwargs)
+                results[name] = await run_endpoint(client, name, requests, args.concurrency)
+                print_row(name, results[name])
+
+    return {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "database": args.database_url.split("://", 1)[0],
+            "database_async": os.environ.get("DATABASE_ASYNC", "true"),
+            "python": platform.python_version(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed_seconds": seed_seconds,
+            "spec": asdict(spec),
+        },
+        "endpoints": results,
+    }
+
+
+HEADER = f"{'endpoint':<24} {'reqs':>6} {'err':>4} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'sql':>5} {'rss MB':>7}"
+
+
+def print_row(name: str, r: dict) -> None:
+    print(
+        f"{name:<24} {r['requests']:>6} {r['errors']:>4} {r['rps']:>9.1f} {r['p50_ms']:>8.2f}"
+        f" {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['queries']:>5.1f} {r['peak_rss_mb']:>7.1f}"
+    )
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Print per-endpoint changes against ``baseline``; return regressed endpoints."""
+    regressions = []
+    print(f"\n{'endpoint':<24} {'p95 before':>11} {'p95 after':>10} {'change':>8} {'req/s change':>13}")
+    for name, after in current["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if before is None:
+            print(f"{name:<24} {'(new)':>11}")
+            continue
+        p95_change = (after["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0.0
+        rps_change = (after["rps"] / before["rps"] - 1) * 100 if before["rps"] else 0.0
+        regressed = p95_change > threshold or rps_change < -threshold
+        if regressed:
+            regressions.append(name)
+        print(
+            f"{name:<24} {before['p95_ms']:>11.2f} {after['p95_ms']:>10.2f} {p95_change:>+7.1f}%"
+            f" {rps_change:>+12.1f}%{'  REGRESSION' if regressed else ''}"
+        )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=None, help="defaults to a throwaway SQLite file")
+    parser.add_argument("--sync", action="store_true", help="run the app with DATABASE_ASYNC=false")
+    parser.add_argument("--orgs", type=int, default=5)
+    parser.add_argument("--artifacts", type=int, default=100)
+    parser.add_argument("--versions", type=int, default=10)
+    parser.add_argument("--content-kb", type=int, default=4)
+    parser.add_argument("--sops", type=int, default=20)
+    parser.add_argument("--steps", type=int, default=15)
+    parser.add_argument("--templates", type=int, default=10)
+    parser.add_argument("--imports", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--endpoints", nargs="*", help="names or router prefixes, e.g. artifacts sops.detail")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="compare against a saved JSON baseline")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.database_url is None:
+            args.database_url = f"sqlite:///{tmp}/bench.db"
+        os.environ["DATABASE_URL"] = args.database_url
+        os.environ["DATABASE_ASYNC"] = "false" if args.sync else "true"
+        results = benchmark(args)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} endpoint(s) regressed by more than {args.threshold:.0f}%")
+            sys.exit(1)
+
+
+def benchmark(args: argparse.Namespace) -> dict:
+    from benchmarks.tenants import TenantSpec
+
+    spec = TenantSpec(
+        organizations=args.orgs,
+        artifacts=args.artifacts,
+        versions=args.versions,
+        content_kb=args.content_kb,
+        sops=args.sops,
+        steps=args.steps,
+        templates=args.templates,
+        imports=args.imports,
+        seed=args.seed,
+    )
+    print(HEADER)
+    return asyncio.run(run(args, spec))
+
+
+if __name__ == "__main__":
+    main()
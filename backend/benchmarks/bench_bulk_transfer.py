@@ -0,0 +1,98 @@
+"""Rows per second of the NDJSON bulk import and export.
+
+Imports a generated stream of artifacts into a throwaway SQLite database
+through ``bulk.import_artifacts``, gives some of them a few extra versions,
+then streams the whole organization back out through
+``bulk.export_organization`` and reports throughput for both directions.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_bulk_transfer --artifacts 20000 --size 2000
+"""
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.models import Base, Artifact, Organization, User
+from app.services import blobs, bulk, versioning
+
+
+def generate(rng: random.Random, count: int, size: int) -> list:
+    lines = []
+    for number in range(count):
+        words = " ".join(f"word{rng.randrange(10000)}" for _ in range(size // 9))
+        record = {"type": "artifact", "title": f"Artifact {number}", "description": None, "content": words}
+        lines.append(json.dumps(record).encode())
+    return lines
+
+
+async def replay(lines: list):
+    for line in lines:
+        yield line
+
+
+async def run(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+        async with sessions() as db:
+            org = Organization(name="Bench", slug="bench")
+            db.add(org)
+            await db.flush()
+            user = User(email="bench@example.com", password_hash="x", full_name="Bench", organization_id=org.id)
+            db.add(user)
+            await db.commit()
+
+        lines = generate(rng, args.artifacts, args.size)
+        async with sessions() as db:
+            start = time.perf_counter()
+            counts = await bulk.import_artifacts(db, org.id, user.id, replay(lines))
+            import_seconds = time.perf_counter() - start
+
+        async with sessions() as db:
+            artifacts = (await db.scalars(select(Artifact).limit(args.artifacts // 10))).all()
+            await blobs.load(db, *artifacts)
+            for artifact in artifacts:
+                for number in range(2, args.versions + 2):
+                    content = artifact.content + f"\nedit {number}"
+                    version = versioning.build_version(artifact.id, number, content, artifact.content, None)
+                    artifact.content, artifact.version = content, number
+                    await blobs.store(db, artifact, version)
+                    db.add(version)
+            await db.commit()
+
+        async with sessions() as db:
+            lines = 0
+            exported_bytes = 0
+            start = time.perf_counter()
+            async for line in bulk.export_organization(db, org.id):
+                lines += 1
+                exported_bytes += len(line)
+            export_seconds = time.perf_counter() - start
+        await engine.dispose()
+
+    print(f"imported artifacts:  {counts['artifacts']}")
+    print(f"import:              {counts['artifacts'] / import_seconds:,.0f} rows/s ({import_seconds:.2f} s)")
+    print(f"exported lines:      {lines} ({exported_bytes / 1e6:.1f} MB)")
+    print(f"export:              {lines / export_seconds:,.0f} rows/s ({export_seconds:.2f} s)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--artifacts", type=int, default=20000)
+    parser.add_argument("--size", type=int, default=2000, help="approximate content bytes per artifact")
+    parser.add_argument("--versions", type=int, default=5, help="extra versions on every tenth artifact")
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Storage, bandwidth and CPU of compressing content at rest and in responses.
+
+Generates synthetic runbook-style artifact bodies and reports three things:
+
+* storage: the ratio and compress / decompress throughput of the blob codec
+  at each ``--levels`` value, for bodies over ``BLOB_COMPRESS_THRESHOLD_BYTES``;
+* ``/content``: bytes on the wire and CPU per request for a plain blob sent
+  as is, a plain blob gzipped per request, a compressed blob decoded for an
+  identity client, and a compressed blob passed through as stored;
+* JSON: the size of an artifact list page and the time ``CompressionMiddleware``
+  spends compressing it at each level.
+
+Every compressed body is decoded and checked against its input.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_compression --bodies 200 --size 32768 --levels 1 6 9
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+import zlib
+from app.config import settings
+from app.services import compression
+
+WORDS = [
+    "deploy", "restart", "queue", "billing", "rollback", "config", "latency", "shard", "owner", "ticket",
+    "kubectl", "service", "region", "replica", "alert", "runbook", "escalate", "verify", "cache", "token",
+]
+
+
+def make_body(rng: random.Random, size: int) -> str:
+    lines, total = [], 0
+    while total < size:
+        if rng.random() < 0.1:
+            line = f"## Step {len(lines)}: {rng.choice(WORDS).title()} the {rng.choice(WORDS)}\n"
+        else:
+            words = [rng.choice(WORDS) for _ in range(rng.randint(6, 14))]
+            words.insert(rng.randrange(len(words)), f"{rng.choice(WORDS)}-{rng.randrange(10000)}")
+            line = " ".join(words) + "\n"
+        lines.append(line)
+        total += len(line)
+    return "".join(lines)
+
+
+def make_page(rng: random.Random, rows: int) -> bytes:
+    # Shaped like GET /api/artifacts?view=summary
+    return json.dumps([{
+        "id": number,
+        "title": f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} runbook {number}",
+        "description": None if number % 3 else f"How to {rng.choice(WORDS)} the {rng.choice(WORDS)}",
+        "organization_id": 1,
+        "project_id": None,
+        "version": rng.randint(1, 40),
+        "is_promoted_to_template": number % 7 == 0,
+        "creator_id": rng.randint(1, 20),
+        "created_at": f"2026-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T12:00:00",
+        "updated_at": f"2026-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T12:00:00",
+    } for number in range(rows)], separators=(",", ":")).encode()
+
+
+def timed(fn, repeat: int) -> tuple:
+    samples, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+
+def streamed(level: int, data: bytes) -> bytes:
+    # As CompressionMiddleware does for a one-message body
+    compressor = compression.compressor(level)
+    return compressor.compress(data) + compressor.flush()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bodies", type=int, default=200)
+    parser.add_argument("--size", type=int, default=32768, help="Approximate bytes per body")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 6, 9])
+    parser.add_argument("--rows", type=int, default=100, help="Artifacts in the JSON list page")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    bodies = [make_body(rng, args.size).encode() for _ in range(args.bodies)]
+    total = sum(len(body) for body in bodies)
+    megabytes = total / 1e6
+
+    print(f"storage: {args.bodies} bodies, {total / args.bodies / 1024:.1f} KiB average, median of {args.repeat}")
+    print(f"{'level':>5} {'ratio':>7} {'compress MB/s':>14} {'decompress MB/s':>16}")
+    stored_at = {}
+    for level in args.levels:
+        compress_seconds, stored = timed(lambda: [compression.compress(body, level) for body in bodies], args.repeat)
+        decompress_seconds, restored = timed(
+            lambda: [compression.decompress(compression.GZIP, data) for data in stored], args.repeat,
+        )
+        if restored != bodies:
+            raise SystemExit(f"level {level}: decompressed bodies differ from the input")
+        stored_at[level] = stored
+        ratio = total / sum(len(data) for data in stored)
+        print(f"{level:>5} {ratio:>6.2f}x {megabytes / compress_seconds:>14.1f} {megabytes / decompress_seconds:>16.1f}")
+
+    body = bodies[0]
+    level = settings.BLOB_COMPRESS_LEVEL
+    stored = stored_at.get(level) or [compression.compress(body, level)]
+    response_level = settings.RESPONSE_COMPRESSION_LEVEL
+    paths = [
+        ("plain blob, identity", lambda: body),
+        (f"plain blob, gzip per request (level {response_level})", lambda: streamed(response_level, body)),
+        ("compressed blob, decoded", lambda: compression.decompress(compression.GZIP, stored[0])),
+        ("compressed blob, passthrough", lambda: stored[0]),
+    ]
+    repeat = max(args.repeat, 100)
+    print()
+    print(f"/content: one {len(body) / 1024:.1f} KiB body stored at level {level}, median of {repeat}")
+    print(f"{'path':<44} {'wire KiB':>9} {'CPU us':>8}")
+    for name, fn in paths:
+        seconds, wire = timed(fn, repeat)
+        print(f"{name:<44} {len(wire) / 1024:>9.1f} {seconds * 1e6:>8.1f}")
+
+    page = make_page(rng, args.rows)
+    print()
+    print(f"JSON: {args.rows}-row summary page, {len(page) / 1024:.1f} KiB, median of {repeat}")
+    print(f"{'level':>5} {'wire KiB':>9} {'ratio':>7} {'CPU us':>8}")
+    for level in args.levels:
+        seconds, wire = timed(lambda: streamed(level, page), repeat)
+        if zlib.decompress(wire, wbits=31) != page:
+            raise SystemExit(f"level {level}: decompressed page differs from the input")
+        print(f"{level:>5} {len(wire) / 1024:>9.1f} {len(page) / len(wire):>6.2f}x {seconds * 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Throughput under concurrent clients for the async and sync database paths.
+
+Starts the API with uvicorn once per mode (``DATABASE_ASYNC=true`` and
+``false``), seeds one tenant with artifacts and then drives read-heavy
+traffic from many concurrent clients, reporting requests per second and
+latency percentiles.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_concurrency --clients 128 --duration 15
+    python -m benchmarks.bench_concurrency --database-url postgresql://user:pw@localhost/bench
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from benchmarks import percentile
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("API did not start in time")
+
+
+async def seed(client: httpx.AsyncClient, mode: str, artifacts: int) -> list:
+    response = await client.post("/api/auth/register", json={
+        "email": f"bench-{mode}-{time.time_ns()}@example.com",
+        "password": "benchmark-password",
+        "full_name": "Bench",
+        "organization_name": f"bench-{mode}-{time.time_ns()}",
+    })
+    response.raise_for_status()
+    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+    ids = []
+    for index in range(artifacts):
+        response = await client.post("/api/artifacts/", json={
+            "title": f"Artifact {index}",
+            "content": f"Body of artifact {index}\n" * 200,
+        })
+        response.raise_for_status()
+        ids.append(response.json()["id"])
+    return ids
+
+
+async def drive(base_url: str, headers: dict, ids: list, clients: int, duration: float) -> tuple:
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        async def worker(seed: int) -> None:
+            nonlocal errors
+            rng = random.Random(seed)
+            while time.monotonic() < deadline:
+                if rng.random() < 0.5:
+                    url = "/api/artifacts/?view=summary&limit=50"
+                else:
+                    url = f"/api/artifacts/{rng.choice(ids)}"
+                start = time.perf_counter()
+                response = await client.get(url)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        await asyncio.gather(*(worker(index) for index in range(clients)))
+    return latencies, errors
+
+
+async def bench_mode(args: argparse.Namespace, mode: str, port: int) -> dict:
+    env = dict(os.environ, DATABASE_URL=args.database_url, DATABASE_ASYNC=str(mode == "async").lower())
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            await wait_until_ready(client)
+            ids = await seed(client, mode, args.artifacts)
+            headers = dict(client.headers)
+        latencies, errors = await drive(base_url, headers, ids, args.clients, args.duration)
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        "mode": mode,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / args.duration,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": percentile(latencies, 0.95) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    results = []
+    for offset, mode in enumerate(args.modes):
+        results.append(await bench_mode(args, mode, args.port + offset))
+
+    print(f"{args.clients} concurrent clients, {args.duration:.0f}s per mode, {args.database_url}")
+    print(f"{'mode':<6} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for r in results:
+        print(
+            f"{r['mode']:<6} {r['requests']:>9} {r['errors']:>7} {r['rps']:>9.1f}"
+            f" {r['p50']:>8.1f} {r['p95']:>8.1f} {r['p99']:>8.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=128)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--artifacts", type=int, default=200)
+    parser.add_argument("--modes", nargs="+", default=["async", "sync"], choices=["async", "sync"])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.database_url is None:
+            args.database_url = f"sqlite:///{tmp}/bench.db"
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
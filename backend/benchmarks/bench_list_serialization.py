@@ -0,0 +1,113 @@
+"""Cost of serializing a list page through the ORM versus column rows.
+
+Seeds a throwaway SQLite database with artifacts, then renders the same
+rows twice: the ``response_model`` path (ORM objects validated through
+``ArtifactResponse`` and encoded the way FastAPI does) and the fast path
+(column tuples encoded by ``serialization.render``). Checks both produce
+identical bytes and reports the time per page and the speedup.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_list_serialization --rows 10000 --repeat 5
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import tempfile
+import time
+from typing import List
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.models import Base, Artifact, Organization, User
+from app.schemas import ArtifactResponse, ArtifactSummaryResponse
+from app.services import blobs, serialization
+
+
+async def seed(sessions, rng: random.Random, rows: int, size: int) -> None:
+    async with sessions() as db:
+        org = Organization(name="Bench", slug="bench")
+        db.add(org)
+        await db.flush()
+        user = User(email="bench@example.com", password_hash="x", full_name="Bench", organization_id=org.id)
+        db.add(user)
+        await db.flush()
+        blob_ids = await blobs.put_many(db, [
+            " ".join(f"word{rng.randrange(10000)}" for _ in range(size // 9)) for _ in range(rows)
+        ])
+        await db.execute(insert(Artifact), [{
+            "title": f"Artifact {number} – über \"quoted\"",
+            "description": None if number % 3 else f"Description {number}\n",
+            "content_blob_id": blob_id,
+            "organization_id": org.id,
+            "creator_id": user.id,
+            "version": 1,
+            "is_promoted_to_template": False,
+        } for number, blob_id in enumerate(blob_ids)])
+        await db.commit()
+
+
+def encode_like_fastapi(adapter: TypeAdapter, objects: list) -> bytes:
+    content = adapter.dump_python(adapter.validate_python(objects), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+async def orm_path(sessions, schema) -> bytes:
+    adapter = TypeAdapter(List[schema])
+    async with sessions() as db:
+        artifacts = (await db.scalars(select(Artifact).order_by(Artifact.id))).all()
+        await blobs.load(db, *artifacts)
+        return encode_like_fastapi(adapter, artifacts)
+
+
+async def column_path(sessions, schema) -> bytes:
+    async with sessions() as db:
+        rows = (await db.execute(select(*serialization.columns(Artifact, schema)).order_by(Artifact.id))).all()
+        rows = await serialization.load_content(db, rows, schema)
+        return serialization.render(rows, schema)
+
+
+async def timed(path, sessions, schema, repeat: int) -> tuple:
+    samples, body = [], b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = await path(sessions, schema)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), body
+
+
+async def run(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        await seed(sessions, random.Random(args.seed), args.rows, args.size)
+
+        print(f"{args.rows} rows, ~{args.size} byte content, median of {args.repeat}")
+        print(f"{'schema':<24} {'orm ms':>9} {'columns ms':>11} {'speedup':>8} {'MB':>7}")
+        for schema in (ArtifactResponse, ArtifactSummaryResponse):
+            orm_seconds, expected = await timed(orm_path, sessions, schema, args.repeat)
+            column_seconds, body = await timed(column_path, sessions, schema, args.repeat)
+            if body != expected:
+                raise SystemExit(f"{schema.__name__}: column path output differs from response_model output")
+            print(
+                f"{schema.__name__:<24} {orm_seconds * 1000:>9.1f} {column_seconds * 1000:>11.1f}"
+                f" {orm_seconds / column_seconds:>7.1f}x {len(body) / 1e6:>7.2f}"
+            )
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--size", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
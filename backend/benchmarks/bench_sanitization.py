@@ -0,0 +1,100 @@
+"""Throughput of the sanitization scanner as organizations add patterns.
+
+Generates a synthetic runbook with secrets, emails, URLs and customer names
+sprinkled in, then scans it with the built-in patterns plus a growing number
+of customer names and custom regular expressions. Each size is scanned two
+ways: the combined single-pass pattern ``sanitization.scan_text`` uses, and
+one ``finditer`` pass per pattern. Both must find the same number of matches.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_sanitization --size-mb 8 --patterns 0 10 100 1000
+"""
+import argparse
+import random
+import re
+import statistics
+import time
+from app.services import sanitization
+
+WORDS = ["deploy", "restart", "queue", "billing", "rollback", "config", "latency", "shard", "owner", "ticket"]
+
+
+def make_names(rng: random.Random, count: int) -> list:
+    syllables = ["ac", "me", "glo", "bex", "tor", "vin", "dal", "qua", "rix", "son", "lum", "era"]
+    names = set()
+    while len(names) < count:
+        names.add(" ".join("".join(rng.choice(syllables) for _ in range(rng.randint(2, 3))).title()
+                           for _ in range(rng.randint(1, 2))))
+    return sorted(names)
+
+
+def make_text(rng: random.Random, size: int, names: list) -> str:
+    samples = [
+        "AKIA" + "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789") for _ in range(16)),
+        "password = correct-horse",
+        "ops@example.com",
+        "https://wiki.example.com/runbooks/deploy",
+    ]
+    lines, total = [], 0
+    while total < size:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(8, 16))]
+        if rng.random() < 0.05:
+            words.insert(rng.randrange(len(words)), rng.choice(samples))
+        if names and rng.random() < 0.05:
+            words.insert(rng.randrange(len(words)), rng.choice(names))
+        line = " ".join(words) + "\n"
+        lines.append(line)
+        total += len(line)
+    return "".join(lines)
+
+
+def spec_for(customers: list, count: int) -> sanitization.Spec:
+    # Nine in ten extra patterns are customer names, the rest ticket-style regexes
+    custom = [(f"ticket_{number}", rf"\bT{number}-\d{{3,}}\b") for number in range(count // 10)]
+    return sanitization.build_spec(custom, customers)
+
+
+def per_pattern(spec: sanitization.Spec, text: str) -> int:
+    return sum(1 for _, _, regex in spec for _ in re.finditer(regex, text))
+
+
+def timed(fn, repeat: int) -> tuple:
+    samples, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=4.0)
+    parser.add_argument("--patterns", type=int, nargs="+", default=[0, 10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'extra patterns':>14} {'combined MB/s':>14} {'per-pattern MB/s':>17} {'speedup':>8} {'matches':>8}")
+    for count in args.patterns:
+        customers = make_names(rng, count - count // 10)
+        spec = spec_for(customers, count)
+        text = make_text(rng, int(args.size_mb * 1_000_000), customers)
+        megabytes = len(text.encode()) / 1e6
+
+        sanitization._compile(spec)  # Compile outside the timed runs, as the worker cache does
+        combined_seconds, report = timed(lambda: sanitization.scan_text(spec, text, 0), args.repeat)
+        separate_seconds, separate_matches = timed(lambda: per_pattern(spec, text), args.repeat)
+        matches = sum(report["counts"].values())
+        if matches != separate_matches:
+            raise SystemExit(f"{count} patterns: combined found {matches}, per-pattern {separate_matches}")
+        print(
+            f"{count:>14} {megabytes / combined_seconds:>14.1f} {megabytes / separate_seconds:>17.1f}"
+            f" {separate_seconds / combined_seconds:>7.1f}x {matches:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
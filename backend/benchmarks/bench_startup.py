@@ -0,0 +1,89 @@
+"""Cold-start time of an API worker.
+
+For each run, starts a fresh interpreter and measures how long ``import
+app.main`` takes. It then launches uvicorn and times the interval from
+spawning the process to the first ``200`` from ``/health/ready``. The
+database is migrated once up front, so the runs measure startup, not schema
+creation.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_startup --runs 10
+    python -m benchmarks.bench_startup --database-url postgresql://user:pw@localhost/bench
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+
+IMPORT_PROBE = "import time; start = time.perf_counter(); import app.main; print(time.perf_counter() - start)"
+
+
+def migrate(env: dict) -> None:
+    subprocess.run([sys.executable, "-m", "scripts.migrate"], env=env, check=True, stdout=subprocess.DEVNULL)
+
+
+def import_seconds(env: dict) -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_PROBE], env=env, check=True, capture_output=True, text=True)
+    return float(output.stdout.strip())
+
+
+def first_ready_seconds(env: dict, port: int, timeout: float = 60.0) -> float:
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+            while time.perf_counter() - start < timeout:
+                try:
+                    if client.get("/health/ready").status_code == 200:
+                        return time.perf_counter() - start
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.005)
+        raise RuntimeError("API did not become ready in time")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def report(label: str, samples: list) -> None:
+    print(
+        f"{label:<24} {statistics.median(samples) * 1000:>9.1f} {min(samples) * 1000:>9.1f}"
+        f" {max(samples) * 1000:>9.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8775)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--sync", action="store_true", help="Use the blocking driver in a threadpool")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=args.database_url or f"sqlite:///{tmp}/bench.db",
+            DATABASE_ASYNC=str(not args.sync).lower(),
+            DB_AUTO_MIGRATE="false",
+        )
+        migrate(env)
+        imports = [import_seconds(env) for _ in range(args.runs)]
+        ready = [first_ready_seconds(env, args.port) for _ in range(args.runs)]
+
+    print(f"{args.runs} runs, {'sync' if args.sync else 'async'} driver")
+    print(f"{'':<24} {'median ms':>9} {'min ms':>9} {'max ms':>9}")
+    report("import app.main", imports)
+    report("spawn to first ready", ready)
+
+
+if __name__ == "__main__":
+    main()
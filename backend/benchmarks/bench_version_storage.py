@@ -0,0 +1,124 @@
+"""Storage ratio and reconstruction latency of delta-encoded versions.
+
+Builds one artifact with a large body edited many times, stores every
+version through ``versioning.build_version`` in a throwaway SQLite database
+and reports how much space the deltas save and how long it takes to read
+old versions back with a cold and a warm cache.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_version_storage --size-kb 200 --edits 500
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.models import Base, Artifact, ArtifactVersion, Blob, Organization, User
+from benchmarks import percentile
+from app.services import blobs, versioning
+
+
+def make_document(rng: random.Random, size: int) -> list:
+    lines = []
+    while sum(len(line) for line in lines) < size:
+        lines.append(" ".join(f"word{rng.randrange(10000)}" for _ in range(rng.randint(4, 14))) + "\n")
+    return lines
+
+
+def edit(rng: random.Random, lines: list) -> list:
+    lines = list(lines)
+    for _ in range(rng.randint(1, 5)):
+        index = rng.randrange(len(lines))
+        action = rng.random()
+        if action < 0.6:
+            lines[index] = f"edited {rng.random()}\n"
+        elif action < 0.8:
+            lines.insert(index, f"inserted {rng.random()}\n")
+        elif len(lines) > 1:
+            del lines[index]
+    return lines
+
+
+async def run(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        db = async_sessionmaker(engine, expire_on_commit=False)()
+
+        org = Organization(name="Bench", slug="bench")
+        db.add(org)
+        await db.flush()
+        user = User(email="bench@example.com", password_hash="x", full_name="Bench", organization_id=org.id)
+        db.add(user)
+        await db.flush()
+
+        lines = make_document(rng, args.size_kb * 1024)
+        content = "".join(lines)
+        artifact = Artifact(title="Bench", content=content, organization_id=org.id, creator_id=user.id)
+        await blobs.store(db, artifact)
+        db.add(artifact)
+        await db.flush()
+        version = versioning.build_version(artifact.id, 1, content, None, "Initial version")
+        await blobs.store(db, version)
+        db.add(version)
+
+        write_start = time.perf_counter()
+        for number in range(2, args.edits + 2):
+            lines = edit(rng, lines)
+            new_content = "".join(lines)
+            version = versioning.build_version(artifact.id, number, new_content, content, None)
+            artifact.content, artifact.version, content = new_content, number, new_content
+            await blobs.store(db, artifact, version)
+            db.add(version)
+        await db.commit()
+        write_seconds = time.perf_counter() - write_start
+
+        full_bytes, stored_bytes = (await db.execute(
+            select(func.sum(ArtifactVersion.content_size), func.sum(func.coalesce(func.length(Blob.compressed), func.length(Blob.content))))
+            .join(Blob, Blob.id == ArtifactVersion.content_blob_id)
+        )).one()
+
+        targets = [rng.randint(1, artifact.version - 1) for _ in range(args.reads)]
+        cold, warm = [], []
+        for target in targets:
+            versioning.version_cache.clear()
+            start = time.perf_counter()
+            await versioning.get_version_content(db, artifact, target)
+            cold.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            await versioning.get_version_content(db, artifact, target)
+            warm.append(time.perf_counter() - start)
+        await db.close()
+        await engine.dispose()
+
+    print(f"versions:            {artifact.version}")
+    print(f"snapshot interval:   {versioning.settings.ARTIFACT_SNAPSHOT_INTERVAL}")
+    print(f"full copies:         {full_bytes / 1e6:.2f} MB")
+    print(f"stored:              {stored_bytes / 1e6:.2f} MB")
+    print(f"storage ratio:       {full_bytes / stored_bytes:.1f}x")
+    print(f"write time/version:  {write_seconds / args.edits * 1000:.2f} ms")
+    for label, samples in (("cold read", cold), ("warm read", warm)):
+        print(
+            f"{label + ':':<20} p50 {statistics.median(samples) * 1000:.2f} ms"
+            f"  p95 {percentile(samples, 0.95) * 1000:.2f} ms"
+            f"  max {max(samples) * 1000:.2f} ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-kb", type=int, default=200)
+    parser.add_argument("--edits", type=int, default=500)
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""Seeded synthetic tenants for benchmarks.
+
+``generate`` fills a database with ``organizations`` tenants, each with one
+user, artifacts carrying a chain of versions, SOPs with many steps, templates
+(some promoted) and imports of other tenants' promoted templates. The same
+seed always produces the same content; slugs and emails carry a per-run
+suffix so repeated runs can share a Postgres database.
+
+Rows are written with multi-row inserts rather than through the API, so
+seeding a large tenant takes seconds.
+"""
+import random
+import time
+from dataclasses import dataclass, field
+from typing import List
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Artifact, ArtifactVersion, Organization, SOP, SOPStep, Template, TemplateImport, User
+from app.services import blobs, import_counts
+from app.services import search as search_index
+from app.services import versioning
+from app.services.auth_service import hash_password
+
+PASSWORD = "benchmark-password"
+
+
+@dataclass
+class TenantSpec:
+    organizations: int = 5
+    artifacts: int = 100  # per organization
+    versions: int = 10  # per artifact
+    content_kb: int = 4
+    sops: int = 20
+    steps: int = 15  # per SOP
+    templates: int = 10  # per organization, half of them promoted
+    imports: int = 5  # promoted templates each organization imports from others
+    seed: int = 42
+
+
+@dataclass
+class Tenant:
+    organization_id: int
+    user_id: int
+    email: str
+    artifact_ids: List[int] = field(default_factory=list)
+    sop_ids: List[int] = field(default_factory=list)
+    template_ids: List[int] = field(default_factory=list)
+    promoted_template_ids: List[int] = field(default_factory=list)
+
+
+def _paragraphs(rng: random.Random, size: int) -> List[str]:
+    lines = []
+    while sum(len(line) for line in lines) < size:
+        lines.append(" ".join(f"term{rng.randrange(5000)}" for _ in range(rng.randint(6, 16))) + "\n")
+    return lines
+
+
+def _edit(rng: random.Random, lines: List[str]) -> List[str]:
+    lines = list(lines)
+    for _ in range(rng.randint(1, 3)):
+        index = rng.randrange(len(lines))
+        if rng.random() < 0.7:
+            lines[index] = f"revised term{rng.randrange(5000)} {rng.random():.6f}\n"
+        else:
+            lines.insert(index, f"added term{rng.randrange(5000)}\n")
+    return lines
+
+
+def _values(row) -> dict:
+    # Leave unset defaulted columns (timestamps) to the insert
+    return {
+        column.name: getattr(row, column.name)
+        for column in row.__table__.c
+        if column.name != "id" and not (column.default is not None and getattr(row, column.name) is None)
+    }
+
+
+async def _blob_rows(db: AsyncSession, rows: List[dict]) -> List[dict]:
+    # Copies of ``rows`` with ``content`` stored as a blob
+    blob_ids = await blobs.put_many(db, [row["content"] for row in rows])
+    return [
+        {**{key: value for key, value in row.items() if key != "content"}, "content_blob_id": blob_id}
+        for row, blob_id in zip(rows, blob_ids)
+    ]
+
+
+async def _insert(db: AsyncSession, model, rows: List[dict], *returning) -> list:
+    if not rows:
+        return []
+    if returning:
+        return (await db.execute(insert(model).returning(*returning), rows)).all()
+    await db.execute(insert(model), rows)
+    return []
+
+
+async def _seed_tenant(db: AsyncSession, rng: random.Random, spec: TenantSpec, index: int, run_id: str, password_hash: str) -> Tenant:
+    org = (await _insert(db, Organization, [{"name": f"Bench Org {index}", "slug": f"bench-{run_id}-{index}"}], Organization.id))[0]
+    email = f"bench-{run_id}-{index}@example.com"
+    user = (await _insert(db, User, [{
+        "email": email,
+        "password_hash": password_hash,
+        "full_name": f"Bench User {index}",
+        "organization_id": org.id,
+        "is_active": True,
+    }], User.id))[0]
+    tenant = Tenant(organization_id=org.id, user_id=user.id, email=email)
+
+    histories = []
+    artifact_rows = []
+    for number in range(spec.artifacts):
+        history = [_paragraphs(rng, spec.content_kb * 1024)]
+        for _ in range(spec.versions - 1):
+            history.append(_edit(rng, history[-1]))
+        histories.append(history)
+        artifact_rows.append({
+            "title": f"Artifact {index}-{number}",
+            "description": f"Synthetic artifact {number} of organization {index}",
+            "content": "".join(history[-1]),
+            "organization_id": org.id,
+            "creator_id": user.id,
+            "version": len(history),
+            "is_promoted_to_template": False,
+        })
+    inserted = await _insert(db, Artifact, await _blob_rows(db, artifact_rows), Artifact.id, Artifact.title)
+    # Match returned ids by title; multi-row RETURNING order is not guaranteed
+    seeded = {row["title"]: (row, history) for row, history in zip(artifact_rows, histories)}
+
+    versions, documents = [], []
+    for artifact in inserted:
+        row, history = seeded[artifact.title]
+        previous = None
+        for number, lines in enumerate(history, 1):
+            content = "".join(lines)
+            versions.append(versioning.build_version(artifact.id, number, content, previous, None))
+            previous = content
+        documents.append(search_index.document_values(
+            "artifact", artifact.id, org.id, artifact.title, search_index.join_text(row["description"], previous),
+        ))
+        tenant.artifact_ids.append(artifact.id)
+    await blobs.store(db, *versions)
+    await _insert(db, ArtifactVersion, [_values(version) for version in versions])
+    versioning.version_cache.clear()
+
+    sop_rows = [{
+        "title": f"SOP {index}-{number}",
+        "description": f"Synthetic procedure {number}",
+        "organization_id": org.id,
+        "creator_id": user.id,
+        "version": 1,
+    } for number in range(spec.sops)]
+    step_rows = []
+    for sop in await _insert(db, SOP, sop_rows, SOP.id, SOP.title):
+        steps = [{
+            "sop_id": sop.id,
+            "step_number": number,
+            "title": f"Step {number}",
+            "description": "".join(_paragraphs(rng, 200)),
+            "source_artifact_id": rng.choice(tenant.artifact_ids) if tenant.artifact_ids else None,
+        } for number in range(1, spec.steps + 1)]
+        step_rows.extend(steps)
+        documents.append(search_index.document_values(
+            "sop", sop.id, org.id, sop.title,
+            search_index.join_text(*(step["description"] for step in steps)),
+        ))
+        tenant.sop_ids.append(sop.id)
+    await _insert(db, SOPStep, step_rows)
+
+    template_rows = [{
+        "name": f"Template {index}-{number}",
+        "description": f"Synthetic template {number}",
+        "content": "".join(_paragraphs(rng, spec.content_kb * 1024)),
+        "category": rng.choice(["Engineering", "Operations", "Sales", "Promoted"]),
+        "organization_id": org.id,
+        "sanitization_checklist": {},
+        "is_promoted": number % 2 == 0,
+    } for number in range(spec.templates)]
+    template_by_name = {row["name"]: row for row in template_rows}
+    for template in await _insert(db, Template, await _blob_rows(db, template_rows), Template.id, Template.name):
+        row = template_by_name[template.name]
+        documents.append(search_index.document_values(
+            "template", template.id, org.id, row["name"],
+            search_index.join_text(row["description"], row["content"]), is_promoted=row["is_promoted"],
+        ))
+        tenant.template_ids.append(template.id)
+        if row["is_promoted"]:
+            tenant.promoted_template_ids.append(template.id)
+
+    await search_index.index_documents(db, documents)
+    return tenant
+
+
+async def _seed_imports(db: AsyncSession, rng: random.Random, spec: TenantSpec, tenants: List[Tenant]) -> None:
+    for tenant in tenants:
+        candidates = [
+            template_id
+            for owner in tenants if owner is not tenant
+            for template_id in owner.promoted_template_ids
+        ]
+        for template_id in rng.sample(candidates, min(spec.imports, len(candidates))):
+            artifact = (await _insert(db, Artifact, await _blob_rows(db, [{
+                "title": f"Imported template {template_id}",
+                "content": "Imported content\n",
+                "organization_id": tenant.organization_id,
+                "creator_id": tenant.user_id,
+                "version": 1,
+                "is_promoted_to_template": False,
+            }]), Artifact.id))[0]
+            version = versioning.build_version(artifact.id, 1, "Imported content\n", None, "Initial version")
+            await blobs.store(db, version)
+            await _insert(db, ArtifactVersion, [_values(version)])
+            await _insert(db, TemplateImport, [{
+                "template_id": template_id,
+                "importing_org_id": tenant.organization_id,
+                "imported_as_artifact_id": artifact.id,
+            }])
+            tenant.artifact_ids.append(artifact.id)
+
+
+async def generate(db: AsyncSession, spec: TenantSpec) -> List[Tenant]:
+    """Seed ``spec.organizations`` tenants and commit. Returns their ids."""
+    rng = random.Random(spec.seed)
+    run_id = format(time.time_ns(), "x")
+    password_hash = hash_password(PASSWORD)
+    tenants = [
+        await _seed_tenant(db, rng, spec, index, run_id, password_hash)
+        for index in range(spec.organizations)
+    ]
+    await _seed_imports(db, rng, spec, tenants)
+    # Imports are inserted directly, so bring the denormalized counters in line
+    await db.run_sync(lambda session: import_counts.rebuild(session.connection()))
+    await db.commit()
+    return tenants
@@ -0,0 +1,29 @@
+"""Apply pending schema migrations.
+
+Usage (from ``backend/``)::
+
+    python -m scripts.migrate          # upgrade to the latest version
+    python -m scripts.migrate --check  # exit 1 when migrations are pending
+"""
+import argparse
+import sys
+from app import migrations
+from app.database import engine
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="Only report the schema version")
+    args = parser.parse_args()
+
+    with engine.begin() as connection:
+        version = migrations.current_version(connection)
+        if args.check:
+            print(f"Schema version {version}, latest {migrations.HEAD}")
+            sys.exit(0 if version == migrations.HEAD else 1)
+        upgraded = migrations.upgrade(connection)
+    print(f"Schema version {version} -> {upgraded}")
+
+
+if __name__ == "__main__":
+    main()
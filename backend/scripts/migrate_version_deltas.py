@@ -0,0 +1,78 @@
+"""Convert full-copy artifact versions to delta storage.
+
+Rewrites every artifact's history so that only checkpoint versions keep a
+full snapshot. Safe to re-run: already converted histories are reconstructed
+and re-encoded to the same rows. Expects the blob table and the delta
+columns from migrations 0002 and 0007, so run ``python -m scripts.migrate``
+first.
+
+Usage (from ``backend/``)::
+
+    python -m scripts.migrate_version_deltas
+"""
+import sys
+from app import migrations
+from app.database import SessionLocal, engine
+from app.models import ArtifactVersion, Blob
+from app.services import blobs, versioning
+
+
+def check_schema() -> None:
+    with engine.connect() as connection:
+        version = migrations.current_version(connection)
+    if version != migrations.HEAD:
+        sys.exit(f"Schema version {version}, expected {migrations.HEAD}; run python -m scripts.migrate first")
+
+
+def convert_histories() -> None:
+    db = SessionLocal()
+    before = after = 0
+    try:
+        artifact_ids = [
+            row[0] for row in db.query(ArtifactVersion.artifact_id).distinct().order_by(ArtifactVersion.artifact_id)
+        ]
+        for artifact_id in artifact_ids:
+            versions = (
+                db.query(ArtifactVersion)
+                .filter(ArtifactVersion.artifact_id == artifact_id)
+                .order_by(ArtifactVersion.version_number)
+                .all()
+            )
+            old_blob_ids = [version.content_blob_id for version in versions]
+            texts = {
+                row.id: blobs.row_text(row)
+                for row in db.query(Blob.id, Blob.content, Blob.in_file, Blob.encoding, Blob.compressed)
+                .filter(Blob.id.in_(old_blob_ids))
+            }
+            for version in versions:
+                version.content = texts[version.content_blob_id]
+
+            previous, rebuilt_versions = None, []
+            for version, content in versioning.iter_contents(versions):
+                rebuilt = versioning.build_version(
+                    artifact_id, version.version_number, content, previous, version.change_summary
+                )
+                before += len(version.content)
+                after += len(rebuilt.content)
+                rebuilt_versions.append(rebuilt)
+                previous = content
+
+            connection = db.connection()
+            blob_ids = blobs.put_many_sync(connection, [rebuilt.content for rebuilt in rebuilt_versions])
+            for version, rebuilt, blob_id in zip(versions, rebuilt_versions, blob_ids):
+                version.content_blob_id = blob_id
+                version.is_snapshot = rebuilt.is_snapshot
+                version.content_size = rebuilt.content_size
+            db.flush()
+            released = blobs.release_sync(connection, old_blob_ids)
+            db.commit()
+            blobs.remove_files(released)
+            versioning.version_cache.clear()
+        print(f"Converted {len(artifact_ids)} artifacts: {before} -> {after} stored characters")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    check_schema()
+    convert_histories()
@@ -0,0 +1,25 @@
+"""Recompute ``templates.import_count`` from ``template_imports``.
+
+Workers flush import counters in batches, so increments pending in a worker
+that crashed are lost; run this if the counters are suspected to have
+drifted.
+
+Usage (from ``backend/``)::
+
+    python -m scripts.rebuild_import_counts
+"""
+from sqlalchemy import func, select
+from app.database import engine
+from app.models import Template
+from app.services import import_counts
+
+
+def main() -> None:
+    with engine.begin() as connection:
+        import_counts.rebuild(connection)
+        total = connection.scalar(select(func.coalesce(func.sum(Template.import_count), 0)))
+    print(f"Rebuilt import counters: {total} imports")
+
+
+if __name__ == "__main__":
+    main()
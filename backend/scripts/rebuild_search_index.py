@@ -0,0 +1,29 @@
+"""Rebuild the full-text search index from artifacts, templates and SOPs.
+
+Handlers keep the index current; run this once after enabling search on an
+existing database, or if the index is ever suspected to have drifted. The
+schema must be current; apply migrations with ``python -m scripts.migrate``.
+
+Usage (from ``backend/``)::
+
+    python -m scripts.rebuild_search_index
+"""
+import asyncio
+import sys
+from app import migrations
+from app.database import engine, get_db
+from app.services import search
+
+
+async def main() -> None:
+    with engine.connect() as connection:
+        version = migrations.current_version(connection)
+    if version != migrations.HEAD:
+        sys.exit(f"Schema version {version}, expected {migrations.HEAD}; run python -m scripts.migrate first")
+    async for db in get_db():
+        count = await search.rebuild(db)
+        print(f"Indexed {count} documents")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
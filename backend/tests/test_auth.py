@@ -0,0 +1,68 @@
+"""Deactivated users lose access even where routes trust the token's organization claim."""
+import uuid
+import pytest
+from sqlalchemy import select
+from app.config import settings
+from app.database import SessionLocal
+from app.models import User
+from app.services.principal_cache import deactivated_users, principal_cache
+from tests.conftest import PASSWORD
+
+
+@pytest.fixture
+def embedded(client, monkeypatch) -> dict:
+    """A user with organization-claim tokens: email, access headers and refresh token."""
+    monkeypatch.setattr(settings, "TOKEN_EMBED_ORGANIZATION", True)
+    email = f"{uuid.uuid4().hex[:12]}@example.com"
+    response = client.post("/api/auth/register", json={
+        "email": email, "password": PASSWORD, "full_name": "Embedded", "organization_name": f"Org {email}",
+    })
+    assert response.status_code == 200, response.text
+    tokens = response.json()
+    return {
+        "email": email,
+        "headers": {"Authorization": f"Bearer {tokens['access_token']}"},
+        "refresh_token": tokens["refresh_token"],
+    }
+
+
+def set_active(email: str, active: bool) -> int:
+    """Update the user through the ORM, as an admin would. Returns the user id."""
+    with SessionLocal() as db:
+        user = db.scalar(select(User).where(User.email == email))
+        user.is_active = active
+        db.commit()
+        return user.id
+
+
+def test_deactivation_outlasts_the_principal_cache(client, embedded):
+    assert client.get("/api/artifacts/", headers=embedded["headers"]).status_code == 200
+    set_active(embedded["email"], False)
+    # As after PRINCIPAL_CACHE_TTL_SECONDS or an LRU eviction
+    principal_cache.clear()
+    assert client.get("/api/artifacts/", headers=embedded["headers"]).status_code == 401
+
+    set_active(embedded["email"], True)
+    assert client.get("/api/artifacts/", headers=embedded["headers"]).status_code == 200
+
+
+def test_deactivated_users_get_no_new_tokens(client, embedded):
+    user_id = set_active(embedded["email"], False)
+    # As in a worker that did not make the deactivation itself
+    principal_cache.clear()
+    deactivated_users.discard(user_id)
+
+    response = client.post("/api/auth/refresh", params={"refresh_token": embedded["refresh_token"]})
+    assert response.status_code == 401
+    response = client.post("/api/auth/login", json={"email": embedded["email"], "password": PASSWORD})
+    assert response.status_code == 401
+
+
+def test_refresh_token_is_not_an_access_token(client, embedded):
+    refresh_headers = {"Authorization": f"Bearer {embedded['refresh_token']}"}
+    assert client.get("/api/artifacts/", headers=refresh_headers).status_code == 401
+
+    response = client.post("/api/auth/refresh", params={"refresh_token": embedded["refresh_token"]})
+    assert response.status_code == 200
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    assert client.get("/api/artifacts/", headers=headers).status_code == 200
@@ -0,0 +1,131 @@
+"""Blob reference counts, deduplication and the lifetime of blob files."""
+import os
+import uuid
+import pytest
+from sqlalchemy import select
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Blob
+from app.routes import artifacts as artifact_routes
+from app.services import blobs
+from tests.conftest import register
+
+
+def unique_text(label: str) -> str:
+    return f"{label} {uuid.uuid4().hex}\n" * 3
+
+
+def ref_count(text: str):
+    """The blob's reference count, or ``None`` once it is gone."""
+    with SessionLocal() as db:
+        return db.scalar(select(Blob.ref_count).where(Blob.hash == blobs.content_hash(text)))
+
+
+def blob_row(text: str) -> Blob:
+    with SessionLocal() as db:
+        return db.scalar(select(Blob).where(Blob.hash == blobs.content_hash(text)))
+
+
+def create_artifact(client, headers, content: str) -> int:
+    response = client.post("/api/artifacts/", headers=headers, json={"title": "Runbook", "content": content})
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def blob_files(tmp_root: str) -> set:
+    return {
+        os.path.join(directory, name)
+        for directory, _, names in os.walk(os.path.join(tmp_root, "blob_files"))
+        for name in names
+    }
+
+
+def test_ref_counts_follow_create_update_and_delete(client, auth):
+    first, second = unique_text("first"), unique_text("second")
+    artifact_id = create_artifact(client, auth, first)
+    # The artifact and its first version
+    assert ref_count(first) == 2
+
+    response = client.put(f"/api/artifacts/{artifact_id}", headers=auth, json={"content": second})
+    assert response.status_code == 200, response.text
+    # Version 1 keeps the old text; the head and version 2 share the new one
+    assert ref_count(first) == 1
+    assert ref_count(second) == 2
+
+    assert client.delete(f"/api/artifacts/{artifact_id}", headers=auth).status_code == 200
+    assert ref_count(first) is None
+    assert ref_count(second) is None
+
+
+def test_ref_counts_follow_promotion_and_import(client, auth):
+    importer = register(client)
+    text = unique_text("shared")
+    artifact_id = create_artifact(client, auth, text)
+    template = client.post("/api/templates/promote", headers=auth, json={
+        "artifact_id": artifact_id, "sanitization_checklist": {},
+    })
+    assert template.status_code == 200, template.text
+    assert ref_count(text) == 3
+
+    imported = client.post("/api/templates/import", headers=importer, json={"template_id": template.json()["id"]})
+    assert imported.status_code == 200, imported.text
+    assert imported.json()["content"] == text
+    # The imported artifact and its first version
+    assert ref_count(text) == 5
+
+    # The template and the imported artifact with its version still hold it
+    assert client.delete(f"/api/artifacts/{artifact_id}", headers=auth).status_code == 200
+    assert ref_count(text) == 3
+    assert client.delete(f"/api/artifacts/{imported.json()['id']}", headers=importer).status_code == 200
+    assert ref_count(text) == 1
+
+
+def test_same_text_is_stored_once_across_organizations(client, auth):
+    other = register(client)
+    text = unique_text("common")
+    first = create_artifact(client, auth, text)
+    second = create_artifact(client, other, text)
+    with SessionLocal() as db:
+        rows = db.scalars(select(Blob).where(Blob.hash == blobs.content_hash(text))).all()
+    assert len(rows) == 1
+    assert rows[0].ref_count == 4
+
+    # Deleting one org's artifact leaves the other's content intact
+    assert client.delete(f"/api/artifacts/{first}", headers=auth).status_code == 200
+    assert ref_count(text) == 2
+    assert client.get(f"/api/artifacts/{second}", headers=other).json()["content"] == text
+    assert client.get(f"/api/artifacts/{first}", headers=other).status_code == 404
+
+
+def test_file_blob_removed_once_unreferenced(client, auth, monkeypatch):
+    monkeypatch.setattr(settings, "BLOB_FILE_THRESHOLD_BYTES", 1)
+    text = unique_text("on disk")
+    artifact_id = create_artifact(client, auth, text)
+    row = blob_row(text)
+    assert row.in_file and row.content == ""
+    assert blobs.read_file(row.id, row.encoding) == text
+
+    assert client.delete(f"/api/artifacts/{artifact_id}", headers=auth).status_code == 200
+    assert blob_row(text) is None
+    assert not blobs.path(row.id).exists()
+
+
+def test_rollback_removes_files_it_wrote(client, auth, tmp_root, monkeypatch):
+    monkeypatch.setattr(settings, "BLOB_FILE_THRESHOLD_BYTES", 1)
+    kept = unique_text("kept")
+    artifact_id = create_artifact(client, auth, kept)
+    before = blob_files(tmp_root)
+
+    async def fail(db, artifact):
+        raise RuntimeError("index unavailable")
+
+    monkeypatch.setattr(artifact_routes.search_index, "index_artifact", fail)
+    lost = unique_text("rolled back")
+    with pytest.raises(RuntimeError):
+        client.put(f"/api/artifacts/{artifact_id}", headers=auth, json={"content": lost})
+    assert blob_row(lost) is None
+    assert blob_files(tmp_root) == before
+
+    # The release of the old text rolled back too, with its file
+    assert ref_count(kept) == 2
+    assert blobs.path(blob_row(kept).id).exists()
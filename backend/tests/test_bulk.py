@@ -0,0 +1,58 @@
+"""NDJSON export of an organization's version histories."""
+import json
+import pytest
+from sqlalchemy import delete, select
+from app.database import SessionLocal
+from app.models import ArtifactVersion
+
+
+def lines(text: str) -> str:
+    return "".join(f"{text} line {number}\n" for number in range(50))
+
+
+def artifact_with_history(client, auth, text: str) -> list:
+    """Create an artifact edited twice, so versions 2 and 3 are deltas. Returns its id and contents."""
+    contents = [lines(text), lines(text) + "edited\n", lines(text) + "edited\nagain\n"]
+    response = client.post("/api/artifacts/", headers=auth, json={"title": text, "content": contents[0]})
+    assert response.status_code == 200, response.text
+    artifact_id = response.json()["id"]
+    for content in contents[1:]:
+        assert client.put(f"/api/artifacts/{artifact_id}", headers=auth, json={"content": content}).status_code == 200
+    return artifact_id, contents
+
+
+def export(client, auth) -> list:
+    response = client.get("/api/artifacts/export", headers=auth)
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_export_rebuilds_each_chain_from_its_own_snapshot(client, auth):
+    first, first_contents = artifact_with_history(client, auth, "alpha")
+    second, second_contents = artifact_with_history(client, auth, "beta")
+    with SessionLocal() as db:
+        deltas = db.scalars(select(ArtifactVersion.id).where(
+            ArtifactVersion.artifact_id.in_([first, second]), ArtifactVersion.is_snapshot == False,
+        )).all()
+    assert len(deltas) == 4
+
+    versions = {
+        (record["artifact_id"], record["version_number"]): record["content"]
+        for record in export(client, auth) if record["type"] == "artifact_version"
+    }
+    for artifact_id, contents in ((first, first_contents), (second, second_contents)):
+        for number, content in enumerate(contents, start=1):
+            assert versions[artifact_id, number] == content
+
+
+def test_export_refuses_a_chain_without_a_snapshot(client, auth):
+    artifact_with_history(client, auth, "intact")
+    broken, _ = artifact_with_history(client, auth, "broken")
+    with SessionLocal() as db:
+        db.execute(delete(ArtifactVersion).where(
+            ArtifactVersion.artifact_id == broken, ArtifactVersion.version_number == 1,
+        ))
+        db.commit()
+
+    with pytest.raises(ValueError, match=f"artifact {broken} has no base snapshot"):
+        client.get("/api/artifacts/export", headers=auth)
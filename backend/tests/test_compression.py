@@ -0,0 +1,91 @@
+"""Blobs compressed at rest, and gzip of JSON responses."""
+import uuid
+import pytest
+from sqlalchemy import select
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Blob
+from app.services import blobs, compression
+
+
+def large_text() -> str:
+    return f"{uuid.uuid4().hex}\n" + "".join(f"step {number}: check the deploy\n" for number in range(2000))
+
+
+@pytest.fixture(params=[0, 1], ids=["inline", "file"])
+def compressed(request, client, auth, monkeypatch):
+    """``(url, UTF-8 body, stored size)`` of an artifact whose blob is stored gzipped."""
+    monkeypatch.setattr(settings, "BLOB_FILE_THRESHOLD_BYTES", request.param)
+    monkeypatch.setattr(settings, "BLOB_COMPRESS_THRESHOLD_BYTES", 1)
+    text = large_text()
+    response = client.post("/api/artifacts/", headers=auth, json={"title": "Large", "content": text})
+    assert response.status_code == 200, response.text
+    with SessionLocal() as db:
+        row = db.scalar(select(Blob).where(Blob.hash == blobs.content_hash(text)))
+    assert row.encoding == compression.GZIP and row.content == ""
+    stored = blobs.path(row.id).stat().st_size if row.in_file else len(row.compressed)
+    assert stored < len(text.encode())
+    return f"/api/artifacts/{response.json()['id']}/content", text.encode(), stored
+
+
+def test_compressed_blob_sent_as_stored(client, auth, compressed):
+    url, data, stored = compressed
+    response = client.get(url, headers={**auth, "Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-length"] == str(stored)
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.content == data
+
+    identity = client.get(url, headers={**auth, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert identity.content == data
+    # Different bytes, so a different tag; each revalidates only itself
+    assert identity.headers["etag"] != response.headers["etag"]
+    gzip_tag = response.headers["etag"]
+    assert client.get(url, headers={**auth, "Accept-Encoding": "gzip", "If-None-Match": gzip_tag}).status_code == 304
+    assert client.get(url, headers={**auth, "Accept-Encoding": "identity", "If-None-Match": gzip_tag}).status_code == 200
+
+
+def test_range_on_compressed_blob_is_decoded(client, auth, compressed):
+    url, data, _ = compressed
+    response = client.get(url, headers={**auth, "Accept-Encoding": "gzip", "Range": "bytes=-100"})
+    assert response.status_code == 206
+    assert "content-encoding" not in response.headers
+    assert response.headers["content-range"] == f"bytes {len(data) - 100}-{len(data) - 1}/{len(data)}"
+    assert response.content == data[-100:]
+
+
+def test_json_responses_gzipped_with_weak_etag(client, auth):
+    created = client.post("/api/artifacts/", headers=auth, json={"title": "Large", "content": large_text()})
+    url = f"/api/artifacts/{created.json()['id']}"
+
+    plain = client.get(url, headers={**auth, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert not plain.headers["etag"].startswith("W/")
+    assert "Accept-Encoding" in plain.headers["vary"]
+
+    response = client.get(url, headers={**auth, "Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == f"W/{plain.headers['etag']}"
+    assert int(response.headers["content-length"]) < len(plain.content)
+    assert response.json() == plain.json()
+
+    # Either form of the tag revalidates either representation
+    for tag in (response.headers["etag"], plain.headers["etag"]):
+        for accept in ("gzip", "identity"):
+            revalidated = client.get(url, headers={**auth, "Accept-Encoding": accept, "If-None-Match": tag})
+            assert revalidated.status_code == 304
+
+
+def test_small_json_and_plain_content_not_gzipped(client, auth):
+    response = client.get("/api/auth/me", headers={**auth, "Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+
+    created = client.post("/api/artifacts/", headers=auth, json={"title": "Small", "content": "short\n" * 400})
+    content = client.get(f"/api/artifacts/{created.json()['id']}/content", headers={
+        **auth, "Accept-Encoding": "gzip",
+    })
+    assert content.status_code == 200
+    assert "content-encoding" not in content.headers
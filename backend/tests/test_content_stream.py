@@ -0,0 +1,94 @@
+"""Range requests on ``/api/artifacts/{id}/content``, for every way a blob is stored."""
+import uuid
+import pytest
+from app.config import settings
+from app.services import content_stream
+
+# (BLOB_FILE_THRESHOLD_BYTES, BLOB_COMPRESS_THRESHOLD_BYTES)
+STORAGES = {
+    "inline": (0, 0),
+    "file": (1, 0),
+    "compressed": (0, 1),
+    "compressed file": (1, 1),
+}
+
+
+def body_text() -> str:
+    # Several read chunks long, with multi-byte characters so bytes and characters differ
+    lines = (f"ligne {number:06d} — café\n" for number in range(12000))
+    return f"{uuid.uuid4().hex}\n" + "".join(lines)
+
+
+@pytest.fixture(params=sorted(STORAGES))
+def stored(request, client, auth, monkeypatch):
+    """``(url, UTF-8 body)`` of an artifact stored the parametrized way."""
+    file_threshold, compress_threshold = STORAGES[request.param]
+    monkeypatch.setattr(settings, "BLOB_FILE_THRESHOLD_BYTES", file_threshold)
+    monkeypatch.setattr(settings, "BLOB_COMPRESS_THRESHOLD_BYTES", compress_threshold)
+    text = body_text()
+    response = client.post("/api/artifacts/", headers=auth, json={"title": "Large", "content": text})
+    assert response.status_code == 200, response.text
+    data = text.encode()
+    assert len(data) > 3 * content_stream.CHUNK_SIZE
+    return f"/api/artifacts/{response.json()['id']}/content", data
+
+
+def fetch(client, auth, url, **headers):
+    return client.get(url, headers={**auth, "Accept-Encoding": "identity", **headers})
+
+
+def test_whole_body(client, auth, stored):
+    url, data = stored
+    response = fetch(client, auth, url)
+    assert response.status_code == 200
+    assert response.content == data
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "content-range" not in response.headers
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("bytes=100-199", lambda size: (100, 199)),
+    ("bytes=70000-", lambda size: (70000, size - 1)),
+    ("bytes=-500", lambda size: (size - 500, size - 1)),
+    ("bytes=-999999999", lambda size: (0, size - 1)),
+    ("bytes=10-999999999", lambda size: (10, size - 1)),
+    ("bytes=131070-131080", lambda size: (131070, 131080)),
+])
+def test_satisfiable_ranges(client, auth, stored, spec, expected):
+    url, data = stored
+    start, end = expected(len(data))
+    response = fetch(client, auth, url, Range=spec)
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(data)}"
+    assert response.headers["content-length"] == str(end - start + 1)
+    assert response.content == data[start:end + 1]
+
+
+@pytest.mark.parametrize("spec", ["bytes={size}-", "bytes={size}-{size}", "bytes=-0"])
+def test_unsatisfiable_ranges(client, auth, stored, spec):
+    url, data = stored
+    response = fetch(client, auth, url, Range=spec.format(size=len(data)))
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(data)}"
+
+
+@pytest.mark.parametrize("spec", ["bytes=0-1,5-6", "items=0-10", "bytes=20-10", "bytes=abc-"])
+def test_ignored_ranges_get_whole_body(client, auth, stored, spec):
+    url, data = stored
+    response = fetch(client, auth, url, Range=spec)
+    assert response.status_code == 200
+    assert response.content == data
+
+
+def test_if_range(client, auth, stored):
+    url, data = stored
+    tag = fetch(client, auth, url).headers["etag"]
+    response = fetch(client, auth, url, Range="bytes=0-9", **{"If-Range": tag})
+    assert response.status_code == 206
+    assert response.content == data[:10]
+
+    response = fetch(client, auth, url, Range="bytes=0-9", **{"If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == data
+
+    assert fetch(client, auth, url, **{"If-None-Match": tag}).status_code == 304
@@ -0,0 +1,55 @@
+"""Conditional GETs on list views and the gallery."""
+from tests.conftest import register
+
+
+def statements(query_budget, client, url, headers) -> tuple:
+    with query_budget(100) as finished:
+        response = client.get(url, headers=headers)
+    return response, [statement for stats in finished for statement in stats.statements]
+
+
+def test_list_runs_watermark_only_for_conditional_requests(client, auth, query_budget):
+    for number in range(3):
+        client.post("/api/artifacts/", headers=auth, json={"title": f"A{number}", "content": f"body {number}"})
+
+    response, unconditional = statements(query_budget, client, "/api/artifacts/", auth)
+    assert response.status_code == 200
+    assert not any("count(" in statement.lower() for statement in unconditional)
+    body_tag = response.headers["etag"]
+
+    # A body-hash tag is not the watermark tag: the body once more, tagged by watermark
+    response = client.get("/api/artifacts/", headers={**auth, "If-None-Match": body_tag})
+    assert response.status_code == 200
+    list_tag = response.headers["etag"]
+    assert list_tag != body_tag
+
+    response, conditional = statements(query_budget, client, "/api/artifacts/", {**auth, "If-None-Match": list_tag})
+    assert response.status_code == 304
+    assert len(conditional) == 1 and "count(" in conditional[0].lower()
+
+    client.post("/api/artifacts/", headers=auth, json={"title": "A3", "content": "body 3"})
+    response = client.get("/api/artifacts/", headers={**auth, "If-None-Match": list_tag})
+    assert response.status_code == 200
+    assert len(response.json()) == 4
+
+
+def test_gallery_reads_both_watermarks_in_one_statement(client, auth, query_budget):
+    other = register(client)
+    artifact = client.post("/api/artifacts/", headers=other, json={"title": "Shared", "content": "shared body"})
+    response = client.post("/api/templates/promote", headers=other, json={
+        "artifact_id": artifact.json()["id"], "sanitization_checklist": {},
+    })
+    assert response.status_code == 200, response.text
+    client.post("/api/templates/", headers=auth, json={"name": "Own", "content": "own body"})
+
+    response, first = statements(query_budget, client, "/api/templates/gallery", auth)
+    assert response.status_code == 200
+    names = [template["name"] for template in response.json()]
+    assert names.index("Own") < names.index("Shared")
+    gallery_tag = response.headers["etag"]
+
+    response, conditional = statements(
+        query_budget, client, "/api/templates/gallery", {**auth, "If-None-Match": gallery_tag},
+    )
+    assert response.status_code == 304
+    assert len(conditional) == 1
@@ -0,0 +1,75 @@
+"""The shared gallery caches keep metadata, not content."""
+import uuid
+from sqlalchemy import update
+from app.database import SessionLocal
+from app.models import Template
+from app.services.blobs import blob_cache
+from app.services.gallery_cache import popular_templates, promoted_templates
+from tests.conftest import register
+
+
+def promote(client, headers, title: str, content: str) -> dict:
+    artifact = client.post("/api/artifacts/", headers=headers, json={"title": title, "content": content})
+    response = client.post("/api/templates/promote", headers=headers, json={
+        "artifact_id": artifact.json()["id"], "sanitization_checklist": {},
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_promoted_cache_holds_no_content(client, auth):
+    other = register(client)
+    contents = {f"Cached {number}": f"cached body {number} " * 50 for number in range(3)}
+    for title, content in contents.items():
+        promote(client, other, title, content)
+
+    response = client.get("/api/templates/gallery", headers=auth)
+    assert response.status_code == 200
+    served = {template["name"]: template["content"] for template in response.json()}
+    assert {name: served[name] for name in contents} == contents
+
+    for _, _, blob_id, template in promoted_templates._entries:
+        assert template.content == ""
+        assert isinstance(blob_id, int)
+
+
+def test_gallery_page_reads_content_of_only_its_own_templates(client, auth, query_budget):
+    other = register(client)
+    for number in range(4):
+        promote(client, other, f"Paged {number}", f"paged body {number}")
+    client.get("/api/templates/gallery", headers=auth)
+    blob_cache.clear()
+
+    with query_budget(100) as finished:
+        response = client.get("/api/templates/gallery?limit=1&offset=1", headers=auth)
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    blob_reads = [
+        statement for stats in finished for statement in stats.statements if "from blobs" in statement.lower()
+    ]
+    assert len(blob_reads) == 1
+    assert len(blob_cache) == 1
+
+
+def test_popular_ranking_holds_no_content(client, auth):
+    other = register(client)
+    category = f"popular-{uuid.uuid4().hex[:8]}"
+    contents = {}
+    for number in range(3):
+        template = client.post("/api/templates/", headers=other, json={
+            "name": f"Popular {number}", "content": f"popular body {number}\n" * 40, "category": category,
+        }).json()
+        contents[template["name"]] = template["content"]
+    # Created templates are not promoted; promote them directly
+    with SessionLocal() as db:
+        db.execute(update(Template).where(Template.category == category).values(is_promoted=True))
+        db.commit()
+
+    response = client.get(f"/api/templates/gallery?sort=popular&category={category}", headers=auth)
+    assert response.status_code == 200
+    assert {template["name"]: template["content"] for template in response.json()} == contents
+
+    for _, entries in popular_templates._rankings.values():
+        for _, _, blob_id, template in entries:
+            assert template.content == ""
+            assert isinstance(blob_id, int)
@@ -0,0 +1,176 @@
+"""Upgrading databases created before later migrations existed.
+
+``BASELINE`` is the schema the old import-time ``create_all`` produced: inline
+``content`` columns and none of the tables or columns added since. Upgrading
+it must not depend on what the models look like today.
+"""
+import pytest
+from sqlalchemy import create_engine, inspect
+from app import migrations
+from app.migrations import m0007_artifact_version_deltas
+from app.models import Base
+
+BASELINE = [
+    """CREATE TABLE organizations (
+        id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(255) NOT NULL, slug VARCHAR(100) NOT NULL UNIQUE,
+        created_at DATETIME, updated_at DATETIME)""",
+    """CREATE TABLE users (
+        id INTEGER NOT NULL PRIMARY KEY, email VARCHAR(255) NOT NULL UNIQUE, password_hash VARCHAR(255) NOT NULL,
+        full_name VARCHAR(255) NOT NULL, organization_id INTEGER NOT NULL REFERENCES organizations (id),
+        is_active BOOLEAN, created_at DATETIME, updated_at DATETIME)""",
+    """CREATE TABLE projects (
+        id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(255) NOT NULL, description TEXT,
+        organization_id INTEGER NOT NULL REFERENCES organizations (id), created_at DATETIME, updated_at DATETIME)""",
+    """CREATE TABLE artifacts (
+        id INTEGER NOT NULL PRIMARY KEY, title VARCHAR(255) NOT NULL, description TEXT, content TEXT NOT NULL,
+        organization_id INTEGER NOT NULL REFERENCES organizations (id), project_id INTEGER REFERENCES projects (id),
+        creator_id INTEGER NOT NULL REFERENCES users (id), version INTEGER, is_promoted_to_template BOOLEAN,
+        created_at DATETIME, updated_at DATETIME)""",
+    """CREATE TABLE artifact_versions (
+        id INTEGER NOT NULL PRIMARY KEY, artifact_id INTEGER NOT NULL REFERENCES artifacts (id),
+        version_number INTEGER NOT NULL, content TEXT NOT NULL, change_summary TEXT, created_at DATETIME)""",
+    """CREATE TABLE templates (
+        id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(255) NOT NULL, description TEXT, content TEXT NOT NULL,
+        category VARCHAR(100), organization_id INTEGER NOT NULL REFERENCES organizations (id),
+        source_artifact_id INTEGER REFERENCES artifacts (id), sanitization_checklist JSON, is_promoted BOOLEAN,
+        created_at DATETIME, updated_at DATETIME)""",
+    """CREATE TABLE template_imports (
+        id INTEGER NOT NULL PRIMARY KEY, template_id INTEGER NOT NULL REFERENCES templates (id),
+        importing_org_id INTEGER NOT NULL REFERENCES organizations (id),
+        imported_as_artifact_id INTEGER REFERENCES artifacts (id), created_at DATETIME)""",
+]
+
+DATA = [
+    "INSERT INTO organizations (id, name, slug) VALUES (1, 'Acme', 'acme'), (2, 'Globex', 'globex')",
+    "INSERT INTO users (id, email, password_hash, full_name, organization_id, is_active) "
+    "VALUES (1, 'a@example.com', 'x', 'A', 1, 1)",
+    "INSERT INTO artifacts (id, title, content, organization_id, creator_id, version, is_promoted_to_template) "
+    "VALUES (1, 'Deploy', 'deploy the thing', 1, 1, 2, 1), (2, 'Copy', 'deploy the thing', 1, 1, 1, 0)",
+    "INSERT INTO artifact_versions (artifact_id, version_number, content) "
+    "VALUES (1, 1, 'deploy a thing'), (1, 2, 'deploy the thing'), (2, 1, 'deploy the thing')",
+    "INSERT INTO templates (id, name, content, category, organization_id, source_artifact_id, is_promoted) "
+    "VALUES (1, 'Deploy', 'deploy the thing', 'ops', 1, 1, 1)",
+    # Artifact 7 was imported and has been deleted since
+    "INSERT INTO template_imports (template_id, importing_org_id, imported_as_artifact_id) "
+    "VALUES (1, 2, 7), (1, 2, NULL)",
+]
+
+
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/old.db")
+    yield engine
+    engine.dispose()
+
+
+def test_version_delta_columns_added_and_backfilled(engine):
+    with engine.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE blobs (id INTEGER PRIMARY KEY, size INTEGER NOT NULL)")
+        connection.exec_driver_sql(
+            "CREATE TABLE artifact_versions (id INTEGER PRIMARY KEY, content_blob_id INTEGER REFERENCES blobs(id))"
+        )
+        connection.exec_driver_sql("INSERT INTO blobs (id, size) VALUES (1, 10), (2, 25)")
+        connection.exec_driver_sql("INSERT INTO artifact_versions (id, content_blob_id) VALUES (1, 1), (2, 2), (3, 1)")
+        m0007_artifact_version_deltas.upgrade(connection)
+        # Idempotent: a second run neither fails nor changes the rows
+        m0007_artifact_version_deltas.upgrade(connection)
+
+    with engine.connect() as connection:
+        columns = {column["name"] for column in inspect(connection).get_columns("artifact_versions")}
+        assert {"is_snapshot", "content_size"} <= columns
+        rows = connection.exec_driver_sql(
+            "SELECT id, is_snapshot, content_size FROM artifact_versions ORDER BY id"
+        ).all()
+        assert [tuple(row) for row in rows] == [(1, 1, 10), (2, 1, 25), (3, 1, 10)]
+
+
+def test_scripts_refuse_an_unmigrated_database(engine, monkeypatch):
+    from scripts import migrate_version_deltas
+
+    monkeypatch.setattr(migrate_version_deltas, "engine", engine)
+    with pytest.raises(SystemExit, match="run python -m scripts.migrate first"):
+        migrate_version_deltas.check_schema()
+    with engine.begin() as connection:
+        assert migrations.current_version(connection) is None
+
+
+def assert_matches_models(connection) -> None:
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        assert {column.name for column in table.columns} <= columns, table.name
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        # The GIN index on search_documents exists only on PostgreSQL
+        expected = {index.name for index in table.indexes if "postgresql_using" not in index.dialect_kwargs}
+        assert expected <= indexes, table.name
+
+
+@pytest.fixture
+def baseline(engine):
+    with engine.begin() as connection:
+        for statement in BASELINE + DATA:
+            connection.exec_driver_sql(statement)
+    return engine
+
+
+def test_upgrade_from_baseline(baseline):
+    with baseline.begin() as connection:
+        assert migrations.current_version(connection) is None
+        assert migrations.upgrade(connection) == migrations.HEAD
+
+    with baseline.connect() as connection:
+        assert migrations.current_version(connection) == migrations.HEAD
+        assert_matches_models(connection)
+        inspector = inspect(connection)
+        for name in ("artifacts", "artifact_versions", "templates"):
+            columns = {column["name"] for column in inspector.get_columns(name)}
+            assert "content" not in columns and "content_blob_id" in columns
+            assert f"ix_{name}_content_blob_id" in {index["name"] for index in inspector.get_indexes(name)}
+        template_indexes = {index["name"] for index in inspector.get_indexes("templates")}
+        assert "ix_templates_promoted_category_imports" in template_indexes
+        assert inspector.has_table("sanitization_patterns")
+
+        # Four rows hold "deploy the thing", one holds "deploy a thing"
+        blobs = connection.exec_driver_sql("SELECT content, ref_count FROM blobs ORDER BY ref_count").all()
+        assert [tuple(row) for row in blobs] == [("deploy a thing", 1), ("deploy the thing", 5)]
+        artifact_blobs = connection.exec_driver_sql("SELECT DISTINCT content_blob_id FROM artifacts").all()
+        assert len(artifact_blobs) == 1
+        assert connection.exec_driver_sql("SELECT import_count FROM templates").scalar() == 2
+        sizes = connection.exec_driver_sql("SELECT content_size FROM artifact_versions ORDER BY id").scalars().all()
+        assert sizes == [14, 16, 16]
+
+
+def test_artifact_ids_autoincrement_after_upgrade(baseline):
+    with baseline.begin() as connection:
+        migrations.upgrade(connection)
+    with baseline.begin() as connection:
+        definition = connection.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'artifacts'"
+        ).scalar()
+        assert "AUTOINCREMENT" in definition
+        assert connection.exec_driver_sql("SELECT COUNT(*) FROM artifacts").scalar() == 2
+        blob_id = connection.exec_driver_sql("SELECT content_blob_id FROM artifacts WHERE id = 1").scalar()
+        connection.exec_driver_sql(
+            "INSERT INTO artifacts (title, content_blob_id, organization_id, creator_id) "
+            f"VALUES ('New', {blob_id}, 1, 1)"
+        )
+        assert connection.exec_driver_sql("SELECT MAX(id) FROM artifacts").scalar() == 8
+
+
+def test_upgrade_empty_database(engine):
+    with engine.begin() as connection:
+        assert migrations.upgrade(connection) == migrations.HEAD
+    with engine.connect() as connection:
+        assert_matches_models(connection)
+
+
+def test_upgrade_is_idempotent(baseline):
+    with baseline.begin() as connection:
+        migrations.upgrade(connection)
+    with baseline.begin() as connection:
+        for migration in migrations.MIGRATIONS:
+            migration.upgrade(connection)
+        assert connection.exec_driver_sql("SELECT SUM(ref_count) FROM blobs").scalar() == 6
+        assert connection.exec_driver_sql("SELECT import_count FROM templates").scalar() == 2
@@ -0,0 +1,51 @@
+"""Operational endpoints are closed to the public."""
+import asyncio
+import httpx
+import pytest
+from app.config import settings
+from tests.conftest import asgi_client
+
+OPS_PATHS = ["/metrics", "/health/pool", "/health/cache", "/health/changes"]
+
+
+def get_from(host: str, path: str, headers: dict = None) -> httpx.Response:
+    async def fetch():
+        async with asgi_client((host, 40000)) as client:
+            return await client.get(path, headers=headers)
+
+    return asyncio.run(fetch())
+
+
+@pytest.mark.parametrize("path", OPS_PATHS)
+def test_remote_clients_refused_without_token(client, monkeypatch, path):
+    monkeypatch.setattr(settings, "OPS_TOKEN", None)
+    assert client.get(path).status_code == 403
+    assert get_from("203.0.113.7", path).status_code == 403
+
+
+@pytest.mark.parametrize("path", OPS_PATHS)
+def test_loopback_clients_served_without_token(monkeypatch, path):
+    monkeypatch.setattr(settings, "OPS_TOKEN", None)
+    assert get_from("127.0.0.1", path).status_code == 200
+    assert get_from("::1", path).status_code == 200
+
+
+@pytest.mark.parametrize("path", OPS_PATHS)
+def test_token_required_once_set(client, monkeypatch, path):
+    monkeypatch.setattr(settings, "OPS_TOKEN", "ops-secret")
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers={"Authorization": "Bearer wrong"}).status_code == 401
+    # Loopback is no exemption once a token is configured
+    assert get_from("127.0.0.1", path).status_code == 401
+    assert client.get(path, headers={"Authorization": "Bearer ops-secret"}).status_code == 200
+
+
+def test_user_tokens_do_not_open_ops_endpoints(client, auth, monkeypatch):
+    monkeypatch.setattr(settings, "OPS_TOKEN", "ops-secret")
+    assert client.get("/health/cache", headers=auth).status_code == 401
+
+
+def test_probes_stay_public(client, monkeypatch):
+    monkeypatch.setattr(settings, "OPS_TOKEN", "ops-secret")
+    assert client.get("/health").status_code == 200
+    assert client.get("/health/ready").status_code == 200
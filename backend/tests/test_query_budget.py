@@ -0,0 +1,67 @@
+"""The ``query_budget`` fixture and marker from ``app.pytest_plugin``."""
+import pytest
+
+pytest_plugins = ["pytester"]
+
+
+def _create_sop(client, auth, steps: int) -> int:
+    response = client.post("/api/sops/", headers=auth, json={
+        "title": "Rotate credentials",
+        "steps": [{"title": f"Step {number}"} for number in range(steps)],
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_sop_detail_within_budget(client, auth, query_budget):
+    sop_id = _create_sop(client, auth, steps=10)
+    # The SOP and its steps in two statements however many steps there are
+    with query_budget(3):
+        response = client.get(f"/api/sops/{sop_id}", headers=auth)
+    assert response.status_code == 200
+    assert len(response.json()["steps"]) == 10
+
+
+def test_artifact_list_within_budget(client, auth, query_budget):
+    for number in range(20):
+        client.post("/api/artifacts/", headers=auth, json={"title": f"A{number}", "content": f"body {number}"})
+    # Rows and their content in a fixed number of statements, not one per artifact
+    with query_budget(4):
+        response = client.get("/api/artifacts/", headers=auth)
+    assert response.status_code == 200
+    assert len(response.json()) == 20
+
+
+def test_exceeded_budget_fails(client, auth, query_budget):
+    sop_id = _create_sop(client, auth, steps=2)
+    with pytest.raises(pytest.fail.Exception, match="Query budget of 1 exceeded"):
+        with query_budget(1):
+            client.get(f"/api/sops/{sop_id}", headers=auth)
+
+
+def test_marker(pytester):
+    pytester.makepyfile("""
+        import pytest
+        from sqlalchemy import create_engine, text
+        from app.services import query_stats
+
+        def request(statements):
+            engine = create_engine("sqlite://")
+            query_stats.instrument(engine)
+            with query_stats.track("GET /example"), engine.connect() as connection:
+                for number in range(statements):
+                    connection.execute(text(f"SELECT {number}"))
+
+        @pytest.mark.query_budget(2)
+        def test_within():
+            request(2)
+
+        @pytest.mark.query_budget(1)
+        def test_over():
+            request(2)
+    """)
+    result = pytester.runpytest_inprocess("-p", "app.pytest_plugin")
+    # The marker checks after the test body, so going over is reported at teardown
+    result.assert_outcomes(passed=2, errors=1)
+    assert result.ret != 0
+    result.stdout.fnmatch_lines(["*ERROR at teardown of test_over*", "*Query budget of 1 exceeded*", "*GET /example: 2 statements*"])
@@ -0,0 +1,115 @@
+"""Read routing against two SQLite databases standing in for a primary and its replica.
+
+The replica is a copy of the primary taken after users register, so
+anything written afterwards is "replication lag": present on the primary,
+missing from the replica.
+"""
+import shutil
+import time
+import pytest
+from jose import jwt
+from sqlalchemy.orm import sessionmaker
+from app import database
+from app.config import settings
+from app.services.read_routing import ReadRouter, read_router
+from tests.conftest import register
+
+WINDOW = 0.5
+
+
+@pytest.fixture
+def replica(client, tmp_root, tmp_path, monkeypatch):
+    """Register two users, then start serving reads from a snapshot of the primary."""
+    headers, other = register(client), register(client)
+    path = tmp_path / "replica.db"
+    shutil.copyfile(f"{tmp_root}/test.db", path)
+    url = f"sqlite:///{path}"
+
+    # Every module holds the same router; give it a short window and fresh state
+    fresh = ReadRouter(WINDOW, 100)
+    for name in ("window", "recent_writers", "decisions"):
+        monkeypatch.setattr(read_router, name, getattr(fresh, name))
+    router = read_router
+    monkeypatch.setattr(database, "DATABASE_REPLICA_URL", url)
+    if settings.DATABASE_ASYNC:
+        engine = database._async_engine(url, "replica_async")
+        monkeypatch.setattr(
+            database, "AsyncReplicaSessionLocal",
+            database.async_sessionmaker(engine, autoflush=False, expire_on_commit=False), raising=False,
+        )
+        yield headers, other, router
+        engine.sync_engine.dispose()
+    else:
+        engine = database._sync_engine(url, "replica")
+        monkeypatch.setattr(
+            database, "ReplicaSessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine),
+            raising=False,
+        )
+        monkeypatch.setattr(database, "_replica_session_slots", database._session_slots(engine), raising=False)
+        yield headers, other, router
+        engine.dispose()
+
+
+def create_artifact(client, headers) -> int:
+    response = client.post("/api/artifacts/", json={"title": "Lagging", "content": "body\n"}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_writes_go_to_the_primary(client, replica):
+    headers, _, router = replica
+    create_artifact(client, headers)
+    assert router.decisions["primary", "write"] == 1
+    assert router.decisions["replica", "read"] == 0
+
+
+def test_reads_go_to_the_replica(client, replica):
+    headers, _, router = replica
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+    assert router.decisions["replica", "read"] == 1
+
+
+def test_writer_reads_own_writes_then_falls_back_to_replica(client, replica):
+    headers, _, router = replica
+    artifact_id = create_artifact(client, headers)
+
+    # Pinned to the primary: the replica has not seen the artifact yet
+    assert client.get(f"/api/artifacts/{artifact_id}", headers=headers).status_code == 200
+    assert router.decisions["primary", "recent_write"] == 1
+
+    # Once the window lapses reads go back to the replica, which still lags
+    time.sleep(WINDOW + 0.1)
+    assert client.get(f"/api/artifacts/{artifact_id}", headers=headers).status_code == 404
+    assert router.decisions["replica", "read"] == 1
+
+
+def test_other_users_are_not_pinned(client, replica):
+    headers, other, router = replica
+    create_artifact(client, headers)
+    assert client.get("/api/auth/me", headers=other).status_code == 200
+    assert router.decisions["replica", "read"] == 1
+
+
+def test_registration_pins_the_new_user(client, replica):
+    _, _, router = replica
+    # Registered after the snapshot, so only the primary knows this user
+    headers = register(client)
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+    assert router.decisions["primary", "recent_write"] == 1
+
+
+def test_forged_tokens_neither_pin_nor_read_pinned(client, replica):
+    headers, _, router = replica
+    user_id = jwt.get_unverified_claims(headers["Authorization"][7:])["sub"]
+    forged = {"Authorization": f"Bearer {jwt.encode({'sub': user_id}, 'not-the-secret', algorithm='HS256')}"}
+
+    # A rejected write starts no window for the user named in the forged claim
+    response = client.post("/api/artifacts/", json={"title": "Forged", "content": "x"}, headers=forged)
+    assert response.status_code == 401
+    assert router.recent_writers.get(user_id) is None
+
+    # And a forged read of a pinned user is not routed like theirs
+    create_artifact(client, headers)
+    assert client.get("/api/auth/me", headers=forged).status_code == 401
+    assert router.decisions["primary", "recent_write"] == 0
+    assert router.decisions["replica", "read"] == 1
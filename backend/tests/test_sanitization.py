@@ -0,0 +1,130 @@
+"""Custom patterns cannot stall a worker: risky shapes are rejected, and scans are bounded."""
+import asyncio
+import sys
+import pytest
+from app.database import SessionLocal
+from app.models import SanitizationPattern
+from app.services import sanitization
+from app.services.sanitization import scanner, validate_pattern
+from tests.conftest import asgi_client, register
+
+SLOW = [
+    r"(?:a+)+b",
+    r"([a-z]+)*@",
+    r"(a|a)+b",
+    r"(?:ab|a.)+x",
+    r"\d+\d+",
+    r".*.*=",
+    r"(\w+\s?)+$",
+]
+
+FINE = [
+    r"ACME-\d{4}",
+    r"\bproj-[a-z0-9]+\b",
+    r"(?:\d{1,3}\.){3}\d{1,3}",
+    r"(?:foo|bar)+",
+    r"(a|ab)*c",
+    r"(?i:acme\s+corp)",
+    pytest.param(
+        r"(?:x+)++y", marks=pytest.mark.skipif(sys.version_info < (3, 11), reason="possessive quantifiers need 3.11"),
+    ),
+]
+
+
+@pytest.mark.parametrize("pattern", SLOW)
+def test_backtracking_patterns_rejected(pattern):
+    assert validate_pattern("custom", pattern) is not None
+
+
+@pytest.mark.parametrize("pattern", FINE)
+def test_linear_patterns_accepted(pattern):
+    assert validate_pattern("custom", pattern) is None
+
+
+def test_api_rejects_nested_quantifiers(client, auth):
+    response = client.post(
+        "/api/sanitization/patterns",
+        json={"category": "custom", "name": "bad", "pattern": "(?:a+)+b"},
+        headers=auth,
+    )
+    assert response.status_code == 400
+    assert "Nested quantifiers" in response.json()["detail"]
+
+
+def scan(client, auth, content: str):
+    response = client.post("/api/artifacts/", json={"title": "Scan me", "content": content}, headers=auth)
+    return client.post("/api/sanitization/scan", json={"artifact_id": response.json()["id"]}, headers=auth)
+
+
+def test_custom_patterns_scanned_out_of_process(client, auth):
+    response = client.post(
+        "/api/sanitization/patterns",
+        json={"category": "custom", "name": "ticket", "pattern": r"TICKET-\d+"},
+        headers=auth,
+    )
+    assert response.status_code == 200, response.text
+    offloaded = scanner.offloaded
+
+    response = scan(client, auth, "See TICKET-42\n")
+    assert response.status_code == 200, response.text
+    assert response.json()["counts"] == {"custom": 1}
+    assert scanner.offloaded == offloaded + 1
+
+
+def add_unvalidated_pattern(client, auth, pattern: str) -> int:
+    """Save ``pattern`` as if before validation existed. Returns the organization id."""
+    organization_id = client.get("/api/auth/me", headers=auth).json()["organization_id"]
+    with SessionLocal() as db:
+        db.add(SanitizationPattern(organization_id=organization_id, category="custom", name="old", pattern=pattern))
+        db.commit()
+    return organization_id
+
+
+def test_runaway_scan_times_out_and_worker_is_replaced(client, auth, monkeypatch):
+    organization_id = add_unvalidated_pattern(client, auth, "(?:a+)+b")
+    monkeypatch.setattr(scanner, "timeout", 1.0)
+    timeouts = scanner.timeouts
+
+    response = scan(client, auth, "a" * 40)
+    assert response.status_code == 422
+    assert response.json()["detail"] == sanitization.TIMED_OUT
+    assert scanner.timeouts == timeouts + 1
+
+    # The stuck worker is gone and the next scan gets a fresh pool
+    with SessionLocal() as db:
+        db.query(SanitizationPattern).filter(SanitizationPattern.organization_id == organization_id).delete()
+        db.commit()
+    assert scan(client, auth, "nothing to see\n").status_code == 200
+
+
+def test_runaway_scan_does_not_fail_other_scans(client, auth, monkeypatch):
+    innocent = register(client)
+    add_unvalidated_pattern(client, auth, "(?:a+)+b")
+    add_unvalidated_pattern(client, innocent, r"TICKET-\d+")
+    runaway_id = client.post("/api/artifacts/", json={"title": "Slow", "content": "a" * 40}, headers=auth).json()["id"]
+    innocent_id = client.post(
+        "/api/artifacts/", json={"title": "Fine", "content": "See TICKET-7\n"}, headers=innocent,
+    ).json()["id"]
+    # One worker, so the innocent scan is still queued when the runaway's worker is killed
+    scanner.shutdown()
+    monkeypatch.setattr(scanner, "workers", 1)
+    monkeypatch.setattr(scanner, "timeout", 1.0)
+    retries = scanner.retries
+
+    async def scan_both():
+        async with asgi_client() as async_client:
+            runaway = asyncio.ensure_future(async_client.post(
+                "/api/sanitization/scan", json={"artifact_id": runaway_id}, headers=auth,
+            ))
+            await asyncio.sleep(0.3)
+            fine = await async_client.post("/api/sanitization/scan", json={"artifact_id": innocent_id}, headers=innocent)
+            return await runaway, fine
+
+    try:
+        runaway, fine = asyncio.run(scan_both())
+    finally:
+        scanner.shutdown()
+    assert runaway.status_code == 422
+    assert fine.status_code == 200, fine.text
+    assert fine.json()["counts"] == {"custom": 1}
+    assert scanner.retries == retries + 1
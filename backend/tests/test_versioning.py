@@ -0,0 +1,144 @@
+"""Version chains always start at a snapshot, and the cache only holds committed versions."""
+import asyncio
+import pytest
+from sqlalchemy import delete
+from app.database import SessionLocal
+from app.models import ArtifactVersion
+from app.routes import artifacts as artifact_routes
+from app.services import versioning
+from app.services.versioning import version_cache
+from tests.conftest import asgi_client
+
+
+def create_artifact(client, auth, content="first\n") -> int:
+    response = client.post("/api/artifacts/", json={"title": "Runbook", "content": content}, headers=auth)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_new_versions_cached_after_commit(client, auth):
+    artifact_id = create_artifact(client, auth)
+    assert version_cache.get((artifact_id, 1)) == "first\n"
+
+    response = client.put(f"/api/artifacts/{artifact_id}", json={"content": "second\n"}, headers=auth)
+    assert response.status_code == 200, response.text
+    assert version_cache.get((artifact_id, 2)) == "second\n"
+
+
+def test_rolled_back_version_not_cached(client, auth, monkeypatch):
+    artifact_id = create_artifact(client, auth)
+
+    async def fail(db, artifact):
+        raise RuntimeError("index unavailable")
+
+    monkeypatch.setattr(artifact_routes.search_index, "index_artifact", fail)
+    with pytest.raises(RuntimeError):
+        client.put(f"/api/artifacts/{artifact_id}", json={"content": "never committed\n"}, headers=auth)
+    assert version_cache.get((artifact_id, 2)) is None
+
+    monkeypatch.undo()
+    response = client.get(f"/api/artifacts/{artifact_id}/versions/1", headers=auth)
+    assert response.json()["content"] == "first\n"
+    assert version_cache.get((artifact_id, 2)) is None
+
+
+def test_deleted_artifact_ids_not_reused(client, auth):
+    first = create_artifact(client, auth)
+    second = create_artifact(client, auth)
+    assert client.delete(f"/api/artifacts/{second}", headers=auth).status_code == 200
+    assert create_artifact(client, auth) > second > first
+
+
+def import_artifact(client, auth, content: str) -> int:
+    source = create_artifact(client, auth, content)
+    template = client.post("/api/templates/promote", headers=auth, json={
+        "artifact_id": source, "sanitization_checklist": {},
+    })
+    assert template.status_code == 200, template.text
+    imported = client.post("/api/templates/import", headers=auth, json={"template_id": template.json()["id"]})
+    assert imported.status_code == 200, imported.text
+    return imported.json()["id"]
+
+
+def edit_twice(client, auth, artifact_id: int, base: str) -> list:
+    contents = [base, base + "second line\n", base + "second line\nthird line\n"]
+    for content in contents[1:]:
+        response = client.put(f"/api/artifacts/{artifact_id}", json={"content": content}, headers=auth)
+        assert response.status_code == 200, response.text
+    return contents
+
+
+def test_imported_artifact_starts_with_a_snapshot(client, auth):
+    base = "".join(f"imported line {number}\n" for number in range(50))
+    artifact_id = import_artifact(client, auth, base)
+    contents = edit_twice(client, auth, artifact_id, base)
+    version_cache.clear()
+
+    for number, content in enumerate(contents, start=1):
+        response = client.get(f"/api/artifacts/{artifact_id}/versions/{number}", headers=auth)
+        assert response.status_code == 200, response.text
+        assert response.json()["content"] == content
+
+
+def test_artifact_without_version_rows_snapshots_its_next_version(client, auth):
+    base = "".join(f"legacy line {number}\n" for number in range(50))
+    artifact_id = import_artifact(client, auth, base)
+    # As imported before imports wrote a first version
+    with SessionLocal() as db:
+        db.execute(delete(ArtifactVersion).where(ArtifactVersion.artifact_id == artifact_id))
+        db.commit()
+    contents = edit_twice(client, auth, artifact_id, base)
+    version_cache.clear()
+
+    response = client.get(f"/api/artifacts/{artifact_id}/versions/2", headers=auth)
+    assert response.status_code == 200, response.text
+    assert response.json()["content"] == contents[1]
+    response = client.get(f"/api/artifacts/{artifact_id}/versions/3", headers=auth)
+    assert response.json()["content"] == contents[2]
+    assert client.get(f"/api/artifacts/{artifact_id}/versions/1", headers=auth).status_code == 404
+
+
+def test_concurrent_edits_never_fail_with_500(client, auth):
+    artifact_id = create_artifact(client, auth)
+    contents = [f"edit {number}\n" for number in range(8)]
+
+    async def edit_all():
+        async with asgi_client() as async_client:
+            return await asyncio.gather(*(
+                async_client.put(f"/api/artifacts/{artifact_id}", json={"content": content}, headers=auth)
+                for content in contents
+            ))
+
+    statuses = [response.status_code for response in asyncio.run(edit_all())]
+    assert set(statuses) <= {200, 409}, statuses
+    assert 200 in statuses
+
+    # Every accepted edit got its own version, in a chain that reads back
+    head = client.get(f"/api/artifacts/{artifact_id}", headers=auth).json()
+    assert head["version"] == 1 + statuses.count(200)
+    version_cache.clear()
+    versions = client.get(f"/api/artifacts/{artifact_id}/versions", headers=auth).json()
+    assert [version["version_number"] for version in versions] == list(range(head["version"], 0, -1))
+    assert versions[0]["content"] == head["content"]
+    assert {version["content"] for version in versions[:-1]} <= set(contents)
+
+
+def test_large_edits_diffed_off_the_event_loop(client, auth, monkeypatch):
+    offloaded = []
+
+    async def record(function, *args):
+        offloaded.append(function)
+        return function(*args)
+
+    monkeypatch.setattr(versioning, "run_in_threadpool", record)
+    base = "".join(f"line {number}\n" for number in range(versioning.THREADPOOL_BYTES // 10))
+    artifact_id = create_artifact(client, auth, "small\n")
+    assert client.put(f"/api/artifacts/{artifact_id}", json={"content": "small edit\n"}, headers=auth).status_code == 200
+    assert offloaded == []
+
+    assert client.put(f"/api/artifacts/{artifact_id}", json={"content": base}, headers=auth).status_code == 200
+    response = client.put(f"/api/artifacts/{artifact_id}", json={"content": base + "appended\n"}, headers=auth)
+    assert response.status_code == 200
+    assert offloaded == [versioning.build_version] * 2
+    version_cache.clear()
+    assert client.get(f"/api/artifacts/{artifact_id}/versions/4", headers=auth).json()["content"] == base + "appended\n"
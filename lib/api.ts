@@ -1,9 +1,12 @@
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
+const MAX_PAGE_SIZE = 1000; // Largest `limit` the cursor-paged lists accept
+const MAX_GALLERY_PAGE_SIZE = 200;
 
 export interface ApiResponse<T> {
   data?: T;
   error?: string;
   status: number;
+  headers?: Headers;
 }
 
 export interface AuthTokens {
@@ -76,6 +79,7 @@ async function apiCall<T>(
     return {
       data,
       status: response.status,
+      headers: response.headers,
     };
   } catch (error) {
     return {
@@ -85,6 +89,37 @@ async function apiCall<T>(
   }
 }
 
+const withParams = (endpoint: string, params: Record<string, string>) =>
+  `${endpoint}${endpoint.includes('?') ? '&' : '?'}${new URLSearchParams(params)}`;
+
+// List endpoints return one page at a time; follow X-Next-Cursor to the last one
+async function apiCallAllPages<T>(endpoint: string): Promise<ApiResponse<T[]>> {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  for (;;) {
+    const params: Record<string, string> = { limit: String(MAX_PAGE_SIZE) };
+    if (cursor) params.cursor = cursor;
+    const page = await apiCall<T[]>(withParams(endpoint, params), { method: 'GET' });
+    if (page.error || !page.data) return page;
+    items.push(...page.data);
+    cursor = page.headers?.get('X-Next-Cursor') ?? null;
+    if (!cursor) return { data: items, status: page.status };
+  }
+}
+
+// The gallery pages by offset and reports its size in X-Total-Count
+async function apiCallAllOffsets<T>(endpoint: string): Promise<ApiResponse<T[]>> {
+  const items: T[] = [];
+  for (;;) {
+    const params = { limit: String(MAX_GALLERY_PAGE_SIZE), offset: String(items.length) };
+    const page = await apiCall<T[]>(withParams(endpoint, params), { method: 'GET' });
+    if (page.error || !page.data) return page;
+    items.push(...page.data);
+    const total = Number(page.headers?.get('X-Total-Count') ?? items.length);
+    if (page.data.length === 0 || items.length >= total) return { data: items, status: page.status };
+  }
+}
+
 // Auth APIs
 export const auth = {
   register: async (email: string, password: string, fullName: string, organizationName: string) => {
@@ -123,13 +158,37 @@ export const auth = {
 // Artifact APIs
 export const artifacts = {
   list: async () => {
-    return apiCall('/api/artifacts', { method: 'GET' });
+    return apiCallAllPages('/api/artifacts?view=summary');
   },
 
   get: async (id: number) => {
     return apiCall(`/api/artifacts/${id}`, { method: 'GET' });
   },
 
+  // Raw body; `get` leaves content null for very large artifacts
+  content: async (id: number) => {
+    const accessToken = getAccessToken();
+    const response = await fetch(`${API_BASE_URL}/api/artifacts/${id}/content`, {
+      headers: accessToken ? { Authorization: `Bearer ${accessToken}` } : {},
+    });
+    return response.ok ? response.text() : null;
+  },
+
+  // Server-side diff between two versions, one {op, text} object per NDJSON line
+  diff: async (id: number, from: number, to: number, mode: 'line' | 'word' = 'line') => {
+    const accessToken = getAccessToken();
+    const query = new URLSearchParams({ from: String(from), to: String(to), mode });
+    const response = await fetch(`${API_BASE_URL}/api/artifacts/${id}/diff?${query}`, {
+      headers: accessToken ? { Authorization: `Bearer ${accessToken}` } : {},
+    });
+    if (!response.ok) return null;
+    const body = await response.text();
+    return body
+      .split('\n')
+      .filter(Boolean)
+      .map((line) => JSON.parse(line) as { op: 'equal' | 'delete' | 'insert'; text: string });
+  },
+
   create: async (title: string, description: string, content: string, projectId?: number) => {
     return apiCall('/api/artifacts', {
       method: 'POST',
@@ -162,7 +221,7 @@ export const artifacts = {
 // SOP APIs
 export const sops = {
   list: async () => {
-    return apiCall('/api/sops', { method: 'GET' });
+    return apiCallAllPages('/api/sops');
   },
 
   get: async (id: number) => {
@@ -189,11 +248,15 @@ export const sops = {
 // Template APIs
 export const templates = {
   list: async () => {
-    return apiCall('/api/templates', { method: 'GET' });
+    return apiCallAllPages('/api/templates');
   },
 
-  gallery: async () => {
-    return apiCall('/api/templates/gallery', { method: 'GET' });
+  gallery: async (category?: string, sort: 'recent' | 'popular' = 'recent') => {
+    const params = new URLSearchParams();
+    if (category) params.set('category', category);
+    if (sort !== 'recent') params.set('sort', sort);
+    const query = params.toString() ? `?${params}` : '';
+    return apiCallAllOffsets(`/api/templates/gallery${query}`);
   },
 
   promote: async (artifactId: number, sanitizationChecklist: Record<string, boolean>) => {
@@ -228,3 +291,69 @@ export const templates = {
     });
   },
 };
+
+// Search APIs
+export const search = {
+  query: async (q: string, options: { type?: 'artifact' | 'template' | 'sop'; limit?: number; offset?: number } = {}) => {
+    const params = new URLSearchParams({ q });
+    if (options.type) params.set('type', options.type);
+    if (options.limit) params.set('limit', String(options.limit));
+    if (options.offset) params.set('offset', String(options.offset));
+    return apiCall(`/api/search?${params.toString()}`, { method: 'GET' });
+  },
+};
+
+// Change feed APIs
+export interface ChangeEvent {
+  seq: number;
+  type: 'artifact' | 'sop' | 'template';
+  id: number | null;
+  action: 'created' | 'updated' | 'deleted' | 'imported';
+  version: number | null;
+}
+
+export const changes = {
+  // Read server-sent events with fetch, since EventSource cannot send the bearer token.
+  // `onReset` means the server could not replay what was missed: refetch everything.
+  // Resolves when the stream ends; call again with the returned id to resume.
+  subscribe: async (
+    onChange: (change: ChangeEvent) => void,
+    onReset: () => void,
+    options: { lastEventId?: string; signal?: AbortSignal } = {},
+  ) => {
+    const accessToken = getAccessToken();
+    const headers: Record<string, string> = {};
+    if (accessToken) headers.Authorization = `Bearer ${accessToken}`;
+    if (options.lastEventId) headers['Last-Event-ID'] = options.lastEventId;
+    let lastEventId = options.lastEventId;
+
+    const response = await fetch(`${API_BASE_URL}/api/changes/`, { headers, signal: options.signal });
+    if (!response.ok || !response.body) return lastEventId;
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = '';
+    try {
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += value;
+        let end;
+        while ((end = buffer.indexOf('\n\n')) !== -1) {
+          const fields: Record<string, string> = {};
+          for (const line of buffer.slice(0, end).split('\n')) {
+            if (!line || line.startsWith(':')) continue;
+            const colon = line.indexOf(':');
+            fields[line.slice(0, colon)] = line.slice(colon + 1).trimStart();
+          }
+          buffer = buffer.slice(end + 2);
+          if (fields.id) lastEventId = fields.id;
+          if (fields.event === 'change') onChange(JSON.parse(fields.data) as ChangeEvent);
+          else if (fields.event === 'reset') onReset();
+        }
+      }
+    } catch (error) {
+      if (!options.signal?.aborted) throw error;
+    }
+    return lastEventId;
+  },
+};